@@ -0,0 +1,37 @@
+"""Serve seat charts over HTTP for use from a browser or other tools."""
+
+from __future__ import annotations
+
+import argparse
+
+from seat_chart_generator.service import ChartService, make_server
+from students import STUDENTS, COMMITTEES
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument(
+        "--max-queue", type=int, default=64, help="jobs running or waiting before 503"
+    )
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    service = ChartService(
+        STUDENTS, COMMITTEES, workers=args.workers, max_queue=args.max_queue
+    )
+    server = make_server(service, args.host, args.port, args.verbose)
+    print(f"http://{args.host}:{args.port}/ で待ち受けています (Ctrl+C で終了)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
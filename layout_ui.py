@@ -1,34 +1,100 @@
 from __future__ import annotations
 
+import json
 import tkinter as tk
-from tkinter import filedialog
-from typing import List
+from dataclasses import replace
+from pathlib import Path
+from tkinter import filedialog, messagebox, simpledialog
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from seat_chart_generator.layout import load_layout, save_layout
+from seat_chart_generator.canvas_grid import SeatGrid
+from seat_chart_generator.latency import LatencyMonitor
+from seat_chart_generator.layout import (
+    DEFAULT_SEAT_ROWS,
+    load_layout_csv,
+    number_layout,
+    parse_template,
+)
+from seat_chart_generator.room import (
+    ACCESSIBLE,
+    BROKEN,
+    DEFAULT_PITCH,
+    RoomLayout,
+    SeatInfo,
+    load_room,
+    save_room,
+)
+from seat_chart_generator.view import SeatView
 
 STATE_SEQUENCE = ["seat", "empty"]
 STATE_LABELS = {
     "seat": "座席",
     "empty": "",
 }
+STATE_VIEWS = {
+    "seat": SeatView(STATE_LABELS["seat"], "black", "white", "solid", 1, "center", "center"),
+    "empty": SeatView(STATE_LABELS["empty"], "black", "", "groove", 1, "center", "center"),
+}
+# Seats are labelled with their ID; attributes are shown by colour.
+ATTRIBUTE_COLOURS = {BROKEN: "#c8c8c8", ACCESSIBLE: "#d6ecff"}
+LAYOUT_PATH = "seat_layout.json"
+MAX_GRID_SIZE = 500
+TEMPLATE_HELP = (
+    "種類 行数 1行の席数 [通路の間隔] を入力してください\n"
+    "種類: grid（教室）, lecture（講義室）, exam（試験・1席おき）\n"
+    "例: lecture 12 24 4"
+)
+
+
+# Handlers timed when latency measurement is on (see LatencyMonitor).
+LATENCY_HANDLERS = (
+    "_click",
+    "_build_grid",
+    "_resize_grid",
+    "_set_selection",
+    "fill_selection",
+    "toggle_selection",
+    "insert_aisle",
+    "apply_template",
+    "import_csv",
+    "save",
+)
 
 
 class LayoutEditor:
-    def __init__(self, root: tk.Tk) -> None:
+    def __init__(self, root: tk.Tk, latency: LatencyMonitor | None = None) -> None:
         self.root = root
+        self.latency = latency if latency is not None else LatencyMonitor.from_env(root)
+        if self.latency is not None:
+            self.latency.instrument(self, LATENCY_HANDLERS)
         self.layout_states: List[List[str]] = []
-        self.buttons: List[List[tk.Button]] = []
+        # Seat ID of every position; kept while a seat is toggled to empty
+        # so that it gets its ID back.
+        self.layout_ids: List[List[Optional[int]]] = []
+        self.seat_meta: Dict[int, SeatInfo] = {}
+        self.room_name = ""
+        self.pitch = DEFAULT_PITCH
+        self.next_id = 1
         self.row_var = tk.IntVar()
         self.col_var = tk.IntVar()
-        self.grid_frame: tk.Frame | None = None
+        self.grid_view: SeatGrid | None = None
         self._build_ui()
 
+    def _initial_room(self) -> RoomLayout:
+        path = Path(LAYOUT_PATH)
+        if not path.is_file():
+            return RoomLayout.from_rows(DEFAULT_SEAT_ROWS)
+        try:
+            return load_room(path)
+        except ValueError:
+            # Legacy file with repeated numbers: renumber its seats.
+            with path.open("r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            return RoomLayout.from_rows(number_layout([[isinstance(c, int) for c in row] for row in data]))
+
     def _build_ui(self) -> None:
-        current = load_layout()
-        rows = len(current)
-        cols = max(len(r) for r in current) if current else 1
-        self.row_var.set(rows)
-        self.col_var.set(cols)
+        room = self._initial_room()
+        cols = max(room.cols, 1)
 
         control = tk.Frame(self.root)
         control.grid(row=0, column=0, columnspan=cols, sticky="w", padx=5, pady=5)
@@ -36,7 +102,7 @@ class LayoutEditor:
         tk.Spinbox(
             control,
             from_=1,
-            to=20,
+            to=MAX_GRID_SIZE,
             textvariable=self.row_var,
             width=5,
             command=self._resize_grid,
@@ -45,90 +111,325 @@ class LayoutEditor:
         tk.Spinbox(
             control,
             from_=1,
-            to=20,
+            to=MAX_GRID_SIZE,
             textvariable=self.col_var,
             width=5,
             command=self._resize_grid,
-        ).grid(row=0, column=3)
+        ).grid(row=0, column=3, padx=(0, 10))
+        tk.Button(control, text="CSV読込", command=self.import_csv).grid(row=0, column=4)
+        tk.Button(control, text="テンプレート", command=self.apply_template).grid(row=0, column=5)
+
+        # Bulk operations act on the rectangle dragged on the grid.
+        edit = tk.Frame(self.root)
+        edit.grid(row=2, column=0, sticky="w", padx=5, pady=(5, 0))
+        buttons = [
+            ("行を選択", self.select_rows),
+            ("列を選択", self.select_columns),
+            ("全選択", self.select_all),
+            ("座席にする", lambda: self.fill_selection("seat")),
+            ("空席にする", lambda: self.fill_selection("empty")),
+            ("反転", self.toggle_selection),
+            ("通路を挿入（列）", lambda: self.insert_aisle(column=True)),
+            ("通路を挿入（行）", lambda: self.insert_aisle(column=False)),
+            ("ゾーン...", self.set_zone),
+            ("車椅子可", lambda: self.toggle_attribute(ACCESSIBLE)),
+            ("故障", lambda: self.toggle_attribute(BROKEN)),
+        ]
+        for i, (text, command) in enumerate(buttons):
+            tk.Button(edit, text=text, command=command).grid(row=0, column=i, padx=2)
+        self.root.bind("<Escape>", lambda e: self._set_selection(None))
+
+        self.grid_view = SeatGrid(
+            self.root,
+            on_click=lambda key, e: self._click(*key),
+            on_select=self._set_selection,
+            cell_width=56,
+            cell_height=32,
+            width=640,
+            height=480,
+        )
+        self.grid_view.grid(row=1, column=0, sticky="nsew")
+        self.root.grid_rowconfigure(1, weight=1)
+        self.root.grid_columnconfigure(0, weight=1)
 
-        self.grid_frame = tk.Frame(self.root)
-        self.grid_frame.grid(row=1, column=0)
+        self.load_room(room)
 
-        self._load_initial_states(current)
+        tk.Button(self.root, text="保存", command=self.save).grid(row=3, column=0, pady=5)
+
+    def load_room(self, room: RoomLayout) -> None:
+        """Replace the whole grid; cells already on the canvas are restyled
+        in place."""
+        self.row_var.set(room.rows)
+        self.col_var.set(room.cols)
+        self.layout_ids = room.seat_rows
+        self.layout_states = [
+            ["seat" if seat is not None else "empty" for seat in row] for row in self.layout_ids
+        ]
+        self.seat_meta = dict(room.seats)
+        self.room_name = room.name
+        self.pitch = room.pitch
+        self.next_id = max(room.seats, default=0) + 1
         self._build_grid()
 
-        tk.Button(self.root, text="保存", command=self.save).grid(row=2, column=0, pady=5)
-
-    def _load_initial_states(self, current: List[List[object]]) -> None:
-        self.layout_states.clear()
-        for r in range(self.row_var.get()):
-            state_row: List[str] = []
-            for c in range(self.col_var.get()):
-                state = "seat"
-                if r < len(current) and c < len(current[r]):
-                    cell = current[r][c]
-                    if cell is None:
-                        state = "empty"
-                state_row.append(state)
-            self.layout_states.append(state_row)
+    def load(self, layout: List[List[Optional[int]]]) -> None:
+        """Replace the grid with a version 1 layout (seat numbers become IDs)."""
+        self.load_room(RoomLayout.from_rows(layout))
+
+    def _new_id(self) -> int:
+        self.next_id += 1
+        return self.next_id - 1
+
+    def _view(self, r: int, c: int) -> SeatView:
+        if self.layout_states[r][c] != "seat":
+            return STATE_VIEWS["empty"]
+        seat_id = self.layout_ids[r][c]
+        info = self.seat_meta.get(seat_id)
+        bg = "white"
+        for attribute in info.attributes if info else ():
+            bg = ATTRIBUTE_COLOURS.get(attribute, bg)
+        text = str(seat_id) if seat_id is not None else STATE_LABELS["seat"]
+        if info and info.zone:
+            text = f"{text} {info.zone[:4]}"
+        return SeatView(text, "black", bg, "solid", 1, "center", "center")
 
     def _build_grid(self) -> None:
-        if not self.grid_frame:
+        if not self.grid_view:
             return
-        for widget in self.grid_frame.winfo_children():
-            widget.destroy()
-        self.buttons = []
-        for r, row in enumerate(self.layout_states):
-            btn_row: List[tk.Button] = []
-            for c, state in enumerate(row):
-                btn = tk.Button(self.grid_frame, text=STATE_LABELS[state], width=6)
-                btn.grid(row=r, column=c, padx=2, pady=2)
-                btn.configure(command=lambda rr=r, cc=c: self._cycle_state(rr, cc))
-                btn_row.append(btn)
-            self.buttons.append(btn_row)
+        self.grid_view.update_views(
+            {
+                (r, c): self._view(r, c)
+                for r, row in enumerate(self.layout_states)
+                for c in range(len(row))
+            }
+        )
+        self.grid_view.set_cells(
+            {(r, c): (r, c) for r, row in enumerate(self.layout_states) for c in range(len(row))}
+        )
 
     def _resize_grid(self) -> None:
         rows = self.row_var.get()
         cols = self.col_var.get()
         new_states: List[List[str]] = []
+        new_ids: List[List[Optional[int]]] = []
+        added = []
         for r in range(rows):
             row: List[str] = []
+            id_row: List[Optional[int]] = []
             for c in range(cols):
                 if r < len(self.layout_states) and c < len(self.layout_states[r]):
                     row.append(self.layout_states[r][c])
+                    id_row.append(self.layout_ids[r][c])
                 else:
                     row.append("seat")
+                    id_row.append(self._new_id())
+                    added.append((r, c))
             new_states.append(row)
+            new_ids.append(id_row)
         self.layout_states = new_states
-        self._build_grid()
+        self.layout_ids = new_ids
+        if not self.grid_view:
+            return
+        # Cells that stay keep their canvas items; only new ones get a view.
+        self.grid_view.update_views({(r, c): self._view(r, c) for r, c in added})
+        self.grid_view.set_cells({(r, c): (r, c) for r in range(rows) for c in range(cols)})
+
+    def _click(self, r: int, c: int) -> None:
+        self._set_selection(None)
+        self._cycle_state(r, c)
+
+    def _set_states(self, cells: Iterable[Tuple[int, int]], state: Optional[str] = None) -> None:
+        """Set ``cells`` to ``state`` (toggle them when ``None``) and restyle
+        only the cells that changed."""
+        changed: Dict[Tuple[int, int], SeatView] = {}
+        for r, c in cells:
+            old = self.layout_states[r][c]
+            new = state or STATE_SEQUENCE[(STATE_SEQUENCE.index(old) + 1) % len(STATE_SEQUENCE)]
+            if new != old:
+                self.layout_states[r][c] = new
+                if new == "seat" and self.layout_ids[r][c] is None:
+                    self.layout_ids[r][c] = self._new_id()
+                changed[(r, c)] = self._view(r, c)
+        if self.grid_view:
+            self.grid_view.update_views(changed)
+
+    def _seat_info(self, r: int, c: int) -> SeatInfo:
+        """Metadata of the seat at ``(r, c)`` for its current position.
+
+        Coordinates are kept while the seat stays where it was and derived
+        from the grid once it has moved.
+        """
+        seat_id = self.layout_ids[r][c]
+        info = self.seat_meta.get(seat_id)
+        if info is not None and (info.row, info.col) == (r, c):
+            return info
+        x, y = c * self.pitch[0], r * self.pitch[1]
+        if info is None:
+            return SeatInfo(seat_id, r, c, x=x, y=y)
+        return replace(info, row=r, col=c, x=x, y=y)
+
+    def _selected_seats(self) -> List[Tuple[int, int]]:
+        return [(r, c) for r, c in self._selected_cells() if self.layout_states[r][c] == "seat"]
+
+    def _update_meta(self, cells: Iterable[Tuple[int, int]], **changes: object) -> None:
+        views: Dict[Tuple[int, int], SeatView] = {}
+        for r, c in cells:
+            self.seat_meta[self.layout_ids[r][c]] = replace(self._seat_info(r, c), **changes)
+            views[(r, c)] = self._view(r, c)
+        if self.grid_view:
+            self.grid_view.update_views(views)
+
+    # -- selection ----------------------------------------------------------
+
+    def _set_selection(
+        self,
+        start: Optional[Tuple[int, int]],
+        end: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        if self.grid_view:
+            self.grid_view.set_selection(start, end)
+
+    def _selection(self) -> Optional[Tuple[int, int, int, int]]:
+        selection = self.grid_view.selection if self.grid_view else None
+        if selection is None:
+            messagebox.showinfo("選択", "ドラッグして範囲を選択してください")
+        return selection
+
+    def _selected_cells(self) -> List[Tuple[int, int]]:
+        selection = self._selection()
+        if selection is None:
+            return []
+        r0, c0, r1, c1 = selection
+        return [(r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+    def select_rows(self) -> None:
+        selection = self._selection()
+        if selection is not None:
+            self._set_selection((selection[0], 0), (selection[2], self.col_var.get() - 1))
+
+    def select_columns(self) -> None:
+        selection = self._selection()
+        if selection is not None:
+            self._set_selection((0, selection[1]), (self.row_var.get() - 1, selection[3]))
+
+    def select_all(self) -> None:
+        self._set_selection((0, 0), (self.row_var.get() - 1, self.col_var.get() - 1))
+
+    def fill_selection(self, state: str) -> None:
+        self._set_states(self._selected_cells(), state)
+
+    def toggle_selection(self) -> None:
+        self._set_states(self._selected_cells())
+
+    def set_zone(self) -> None:
+        seats = self._selected_seats()
+        if not seats:
+            return
+        zone = simpledialog.askstring(
+            "ゾーン", "ゾーン名（front, window, doorなど。空欄で解除）", parent=self.root
+        )
+        if zone is not None:
+            self._update_meta(seats, zone=zone.strip() or None)
+
+    def toggle_attribute(self, attribute: str) -> None:
+        """Add ``attribute`` to the selected seats, or remove it if all of
+        them already have it."""
+        seats = self._selected_seats()
+        infos = [self._seat_info(r, c) for r, c in seats]
+        remove = bool(infos) and all(attribute in info.attributes for info in infos)
+        for (r, c), info in zip(seats, infos):
+            attributes = set(info.attributes)
+            if remove:
+                attributes.discard(attribute)
+            else:
+                attributes.add(attribute)
+            self._update_meta([(r, c)], attributes=tuple(sorted(attributes)))
+
+    def insert_aisle(self, column: bool = True) -> None:
+        """Insert an empty column (or row) in front of the selection."""
+        selection = self._selection()
+        if selection is None:
+            return
+        r0, c0, r1, c1 = selection
+        if column:
+            if self.col_var.get() >= MAX_GRID_SIZE:
+                return
+            for row, id_row in zip(self.layout_states, self.layout_ids):
+                row.insert(c0, "empty")
+                id_row.insert(c0, None)
+            self.col_var.set(self.col_var.get() + 1)
+            moved = [(r, c) for r in range(self.row_var.get()) for c in range(c0, self.col_var.get())]
+            start, end = (r0, c0 + 1), (r1, c1 + 1)
+        else:
+            if self.row_var.get() >= MAX_GRID_SIZE:
+                return
+            self.layout_states.insert(r0, ["empty"] * self.col_var.get())
+            self.layout_ids.insert(r0, [None] * self.col_var.get())
+            self.row_var.set(self.row_var.get() + 1)
+            moved = [(r, c) for r in range(r0, self.row_var.get()) for c in range(self.col_var.get())]
+            start, end = (r0 + 1, c0), (r1 + 1, c1)
+        if not self.grid_view:
+            return
+        # Keys are positions, so only cells at or behind the aisle change.
+        self.grid_view.update_views({(r, c): self._view(r, c) for r, c in moved})
+        self.grid_view.set_cells(
+            {(r, c): (r, c) for r in range(self.row_var.get()) for c in range(self.col_var.get())}
+        )
+        self._set_selection(start, end)
+
+    # -- import -------------------------------------------------------------
+
+    def import_csv(self) -> None:
+        path = filedialog.askopenfilename(filetypes=[("CSV", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            layout = load_layout_csv(path)
+        except (OSError, UnicodeDecodeError) as exc:
+            messagebox.showerror("エラー", f"CSVを読み込めません: {exc}")
+            return
+        if not layout or len(layout) > MAX_GRID_SIZE or max(len(r) for r in layout) > MAX_GRID_SIZE:
+            messagebox.showerror("エラー", f"行数・列数は1〜{MAX_GRID_SIZE}にしてください")
+            return
+        self._set_selection(None)
+        self.load(layout)
+
+    def apply_template(self) -> None:
+        spec = simpledialog.askstring("テンプレート", TEMPLATE_HELP, parent=self.root)
+        if not spec:
+            return
+        try:
+            layout = parse_template(spec)
+        except ValueError as exc:
+            messagebox.showerror("エラー", str(exc))
+            return
+        if len(layout) > MAX_GRID_SIZE or len(layout[0]) > MAX_GRID_SIZE:
+            messagebox.showerror("エラー", f"行数・列数は1〜{MAX_GRID_SIZE}にしてください")
+            return
+        self._set_selection(None)
+        self.load(layout)
 
     def _cycle_state(self, r: int, c: int) -> None:
-        state = self.layout_states[r][c]
-        idx = STATE_SEQUENCE.index(state)
-        new_state = STATE_SEQUENCE[(idx + 1) % len(STATE_SEQUENCE)]
-        self.layout_states[r][c] = new_state
-        self.buttons[r][c].config(text=STATE_LABELS[new_state])
+        self._set_states([(r, c)])
+
+    def room(self) -> RoomLayout:
+        """The edited room; seats keep their IDs and metadata."""
+        seats = {}
+        for r, row in enumerate(self.layout_states):
+            for c, state in enumerate(row):
+                if state == "seat":
+                    info = self._seat_info(r, c)
+                    seats[info.id] = info
+        return RoomLayout(self.row_var.get(), self.col_var.get(), seats, self.room_name, self.pitch)
 
     def save(self) -> None:
         path = filedialog.asksaveasfilename(
             defaultextension=".json",
             filetypes=[("JSON", "*.json")],
-            initialfile="seat_layout.json",
+            initialfile=LAYOUT_PATH,
         )
         if not path:
             return
-        layout: List[List[object]] = []
-        seat_num = 1
-        for row in self.layout_states:
-            layout_row = []
-            for state in row:
-                if state == "seat":
-                    layout_row.append(seat_num)
-                    seat_num += 1
-                else:
-                    layout_row.append(None)
-            layout.append(layout_row)
-        save_layout(layout, path)
+        save_room(self.room(), path)
 
 
 def main() -> None:
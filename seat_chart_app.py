@@ -2,92 +2,469 @@
 
 from __future__ import annotations
 
-import os
 import re
-import tempfile
 import tkinter as tk
-from tkinter import filedialog, messagebox, simpledialog
-from typing import Dict, List, Tuple
-
-from reportlab.lib import colors
+from tkinter import filedialog, messagebox, simpledialog, ttk
+from typing import Dict, Iterable, List, Set, Tuple
 
 from seat_chart_generator import (
-    create_seat_chart,
+    ClassroomState,
+    ValidationError,
     simple_shuffle,
-    Student,
+)
+from seat_chart_generator.canvas_grid import SeatGrid
+from seat_chart_generator.diff import diff_assignments, write_moves
+from seat_chart_generator.export import CANCELLED, DONE, ExportQueue
+from seat_chart_generator.history import History
+from seat_chart_generator.latency import LatencyMonitor
+from seat_chart_generator.preview import PreviewRenderer, PreviewWorker
+from seat_chart_generator.session import (
+    SessionJournal,
+    layout_fingerprint,
+    load_session,
+    set_aside,
 )
 from seat_chart_generator.layout import load_layout, generate_layout
+from seat_chart_generator.pattern import PATTERN_LABELS, mismatches, pattern_shuffle
+from seat_chart_generator.picker import StudentPicker
+from seat_chart_generator import transform
+from seat_chart_generator.validate import Conflict, errors, validate_students
+from seat_chart_generator.view import SeatView, build_views, diff_views
 from students import STUDENTS, COMMITTEES
 
+# Layouts with more cells than this are shown on a single canvas instead of
+# one label widget per seat.
+GRID_WIDGET_LIMIT = 400
+CONTROL_COLUMNS = 6
+# Every edit is journaled here so a closed or crashed window can resume.
+SESSION_PATH = "seat_session.json"
+# Resolution of the chart preview and the pause after the last edit before
+# it is rendered again.
+PREVIEW_DPI = 50
+PREVIEW_DELAY_MS = 150
+MAX_CONFLICTS_SHOWN = 15
+RANDOM_PATTERN = "ランダム"
+# Handlers timed when latency measurement is on (see LatencyMonitor).
+LATENCY_HANDLERS = (
+    "_select_student",
+    "_assign_to_seat",
+    "_apply_choice",
+    "shuffle",
+    "save",
+    "_build_grid",
+    "_refresh",
+    "undo",
+    "redo",
+    "transform",
+)
+
 
 class SeatApp:
-    def __init__(self, root: tk.Tk) -> None:
+    def __init__(
+        self,
+        root: tk.Tk,
+        session_path: str | None = SESSION_PATH,
+        latency: LatencyMonitor | None = None,
+    ) -> None:
         self.root = root
-        try:
-            self.layout = load_layout()
-        except Exception:
-            self.layout = generate_layout(10, 5)
+        # Opt-in timing of the handlers; installed before any widget keeps
+        # a reference to them.
+        self.latency = latency if latency is not None else LatencyMonitor.from_env(root)
+        if self.latency is not None:
+            self.latency.instrument(self, LATENCY_HANDLERS)
+        layout = self._current_layout()
+        session, session_path = self._resume_session(session_path)
+        if session is not None and not self._keep_session(session, layout):
+            session = None
+        if session is not None:
+            self.state, meta = session
+        else:
+            self.state = ClassroomState(layout, STUDENTS)
+            meta = {}
+        # The layout file this session is based on (or was confirmed with).
+        meta["layout"] = layout_fingerprint(layout)
         self.students_sorted = sorted(STUDENTS, key=lambda d: d["serial"])
-        self.student_data = {d["name_kanji"]: d for d in self.students_sorted}
         self.labels: Dict[int, tk.Label] = {}
-        self.fixed_seats: set[int] = set()
-        self.empty_seats: Dict[int, Tuple[str, str]] = {}
-        try:
-            shuffled = simple_shuffle(STUDENTS, self.layout)
-        except ValueError:
-            shuffled = []
-        self.assignments: Dict[int, Student] = {s.seat_number: s for s in shuffled}
-        self.total_seats = sum(
-            1 for row in self.layout for seat in row if isinstance(seat, int)
-        )
+        self.views: Dict[int, SeatView] = {}
+        self._spare_labels: List[Tuple[tk.Label, SeatView | None]] = []
+        self.seat_grid: SeatGrid | None = None
+        self._canvas_mode = False
+        self.picker: StudentPicker | None = None
+        if session is None:
+            try:
+                self.state.apply_shuffle(simple_shuffle(STUDENTS, state=self.state))
+            except ValueError:
+                pass
         self.required_students = sum(1 for s in STUDENTS if s.get("status") == "在籍")
         self.count_var = tk.StringVar()
         # Default background colour for labels (platform dependent)
         tmp_lbl = tk.Label(self.root)
         self.default_bg = tmp_lbl.cget("bg")
         tmp_lbl.destroy()
-        self.title_var = tk.StringVar(value="席替え座席表")
+        self.title_var = tk.StringVar(value=meta.get("title", "席替え座席表"))
+        self.status_var = tk.StringVar()
+        self.pattern_var = tk.StringVar(value=RANDOM_PATTERN)
+        self.exports = ExportQueue()
+        self._export_polling = False
+        self.history = History(self.state)
+        # Seating before the last Shuffle, the base of the move list.
+        self.moves_base = dict(self.state.assignments)
+        self.preview_var = tk.BooleanVar(value=True)
+        self.preview_worker = PreviewWorker(PreviewRenderer(PREVIEW_DPI))
+        if self.preview_worker.renderer.notice:
+            self.status_var.set(self.preview_worker.renderer.notice)
+        self._preview_after: str | None = None
+        self._preview_polling = False
+        self._preview_image: tk.PhotoImage | None = None
         self._build_ui()
+        self.state.subscribe(self._on_state_change)
+        self.journal: SessionJournal | None = None
+        if session_path:
+            self.journal = SessionJournal(session_path)
+            self.journal.attach(self.state, {**meta, "title": self.title_var.get()})
+            self.title_var.trace_add(
+                "write", lambda *a: self.journal.set_meta(title=self.title_var.get())
+            )
+            self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.title_var.trace_add("write", lambda *a: self._schedule_preview())
+        self._schedule_preview()
+
+    @staticmethod
+    def _resume_session(path: str | None):
+        """Return the saved session (or ``None``) and the path to journal to.
 
-    def _format_student(self, student: Student) -> str:
-        """Return multiline string with student details."""
-        return (
-            f"{student.serial}\n"
-            f"{student.student_id}\n"
-            f"{student.name_kanji}\n"
-            f"{student.name_kana}"
+        An unreadable session is renamed aside before a new one starts;
+        when that fails the new session is not journaled at all.
+        """
+        if not path:
+            return None, None
+        try:
+            return load_session(path, STUDENTS), path
+        except FileNotFoundError:
+            return None, path
+        except (OSError, ValueError, KeyError) as exc:
+            try:
+                broken = set_aside(path)
+            except OSError as move_exc:
+                messagebox.showerror(
+                    "前回のセッション",
+                    f"前回のセッション({path})を読み込めません: {exc}\n"
+                    f"ファイルを退避できないため、今回の編集は保存されません: {move_exc}",
+                )
+                return None, None
+            messagebox.showerror(
+                "前回のセッション",
+                f"前回のセッション({path})を読み込めません: {exc}\n"
+                f"{broken} に退避して新しいセッションを始めます。",
+            )
+            return None, path
+
+    @staticmethod
+    def _current_layout() -> List[List[object]]:
+        try:
+            return load_layout()
+        except Exception:
+            return generate_layout(10, 5)
+
+    @staticmethod
+    def _keep_session(session, layout: List[List[object]]) -> bool:
+        """Resume unless the layout file changed since the session began
+        and the user prefers to start over with it."""
+        state, meta = session
+        started_with = meta.get("layout")
+        if started_with is None:
+            # Sessions without a fingerprint: compare the layouts themselves.
+            changed = [list(r) for r in state.seat_rows] != [list(r) for r in layout]
+        else:
+            changed = started_with != layout_fingerprint(layout)
+        if not changed:
+            return True
+        return messagebox.askyesno(
+            "前回のセッション",
+            "前回のセッションを始めた後に座席配置(seat_layout.json)が変更されています。\n"
+            "前回の続きから再開しますか？\n"
+            "「いいえ」を選ぶと新しい座席配置で新しいセッションを始めます。",
         )
 
+    def new_session(self) -> None:
+        """Start over with the current layout file and a fresh shuffle."""
+        if not messagebox.askyesno(
+            "新しいセッション",
+            "固定席・空席・テキストをすべて破棄し、seat_layout.jsonの配置で"
+            "新しいセッションを始めますか？",
+        ):
+            return
+        layout = self._current_layout()
+        self.state.reset(layout)
+        try:
+            self.state.apply_shuffle(simple_shuffle(STUDENTS, state=self.state))
+        except ValueError:
+            pass
+        self.moves_base = dict(self.state.assignments)
+        if self.journal is not None:
+            self.journal.set_meta(layout=layout_fingerprint(layout))
+        self._record("新しいセッション")
+        self.status_var.set("新しいセッションを始めました")
+
+    def close(self) -> None:
+        if self.journal is not None:
+            self.journal.detach()
+        self.root.destroy()
+
+    @property
+    def layout(self) -> List[List[object]]:
+        return self.state.seat_rows
+
+    def _on_state_change(self, seats: Set[int]) -> None:
+        if self.layout is not self._grid_layout:
+            # Undo/redo across a change of rows or columns.
+            self._build_grid()
+        else:
+            self._refresh(seats)
+        self._update_counts()
+        self._schedule_preview()
+
+    def _record(self, label: str) -> None:
+        self.history.record(label)
+        self._update_history_buttons()
+
+    def _update_history_buttons(self) -> None:
+        self.undo_button.config(state=tk.NORMAL if self.history.can_undo() else tk.DISABLED)
+        self.redo_button.config(state=tk.NORMAL if self.history.can_redo() else tk.DISABLED)
+
+    def undo(self) -> None:
+        self.history.undo()
+        self._update_history_buttons()
+
+    def redo(self) -> None:
+        self.history.redo()
+        self._update_history_buttons()
+
+    def _schedule_preview(self) -> None:
+        """Render the preview once edits pause for ``PREVIEW_DELAY_MS``."""
+        if self._preview_after is not None:
+            self.root.after_cancel(self._preview_after)
+            self._preview_after = None
+        if self.preview_var.get():
+            self._preview_after = self.root.after(PREVIEW_DELAY_MS, self._submit_preview)
+
+    def _submit_preview(self) -> None:
+        self._preview_after = None
+        # The worker only gets copies, editing continues meanwhile.
+        self.preview_worker.submit(
+            assignments=dict(self.state.assignments),
+            seat_rows=self.layout,
+            committees=COMMITTEES,
+            title=self.title_var.get(),
+            fixed_seat_numbers=set(self.state.fixed),
+            empty_seat_texts=dict(self.state.empty),
+        )
+        if not self._preview_polling:
+            self._preview_polling = True
+            self.root.after(30, self._poll_preview)
+
+    def _poll_preview(self) -> None:
+        try:
+            result = self.preview_worker.poll()
+        except Exception as exc:
+            self._preview_polling = False
+            self.status_var.set(f"プレビューを作成できません: {exc}")
+            return
+        if result is None:
+            self.root.after(30, self._poll_preview)
+            return
+        self._preview_polling = False
+        self._preview_image = tk.PhotoImage(data=result.data)
+        self.preview_label.config(image=self._preview_image)
+
+    def toggle_preview(self) -> None:
+        if self.preview_var.get():
+            self._place_preview()
+            self._schedule_preview()
+        else:
+            self.preview_frame.grid_remove()
+
+    def export_history(self) -> None:
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json")],
+            initialfile="seat_history.json",
+        )
+        if path:
+            self.history.export(path)
+
+    def export_moves(self) -> None:
+        """Save who moves where since the last Shuffle as CSV or PDF."""
+        diff = diff_assignments(self.moves_base, self.state.assignments)
+        if not diff:
+            messagebox.showinfo("移動リスト", "移動する生徒はいません")
+            return
+        safe_title = re.sub(r'[\\/:*?"<>|]', "_", self.title_var.get()) or "seat_chart"
+        path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("PDF", "*.pdf")],
+            initialfile=f"{safe_title}_移動リスト.csv",
+        )
+        if not path:
+            return
+        try:
+            write_moves(diff, path, f"{self.title_var.get()} 移動リスト")
+        except OSError as exc:
+            messagebox.showerror("Error", f"移動リストを保存できません: {exc}")
+            return
+        self.status_var.set(f"移動リストを保存しました ({len(diff.moves)}人): {path}")
+
     def _build_ui(self) -> None:
+        self._build_controls()
+        self._build_grid()
+        self._update_counts()
+        self._update_export_status()
+        self._update_history_buttons()
+
+    def _build_grid(self) -> None:
+        self._grid_layout = self.layout
+        rows = len(self.layout)
         cols = max(len(r) for r in self.layout)
+        if rows * cols > GRID_WIDGET_LIMIT:
+            self._build_canvas_grid()
+        else:
+            self._build_label_grid()
+
+    def _build_canvas_grid(self) -> None:
+        """Show the seats on a single virtualized canvas for large halls."""
+        for seat, lbl in self.labels.items():
+            lbl.grid_remove()
+            self._spare_labels.append((lbl, self.views.get(seat)))
+        self.labels = {}
+        self.views = {}
+        if self.seat_grid is None:
+            self.seat_grid = SeatGrid(
+                self.root, on_click=lambda seat, e: self._select_student(seat)
+            )
+        self.seat_grid.grid(row=0, column=0, columnspan=CONTROL_COLUMNS, sticky="nsew")
+        self.root.grid_rowconfigure(0, weight=1)
+        self.seat_grid.set_cells(
+            {
+                seat: (r, c)
+                for r, row in enumerate(self.layout)
+                for c, seat in enumerate(row)
+                if isinstance(seat, int)
+            }
+        )
+        self._canvas_mode = True
+        self._place_controls(1, CONTROL_COLUMNS)
+        self._refresh()
+
+    def _build_label_grid(self) -> None:
+        """Place one label per seat, reusing label widgets where possible.
+
+        Labels of the previous layout are handed to the new seats in grid
+        order together with their last applied view, so only options that
+        actually differ are reconfigured by :meth:`_refresh`.
+        """
+        if self._canvas_mode:
+            self.seat_grid.grid_remove()
+            self.root.grid_rowconfigure(0, weight=0)
+            self._canvas_mode = False
+            self.views = {}
+        old_views = self.views
+        reusable = [(lbl, old_views.get(seat)) for seat, lbl in self.labels.items()]
+        reusable.reverse()
+        reusable.extend(self._spare_labels)
+        self._spare_labels = []
+        self.labels = {}
+        self.views = {}
         for r, row in enumerate(self.layout):
             for c, seat in enumerate(row):
                 if seat is None or not isinstance(seat, int):
                     continue
-                student = self.assignments.get(seat)
-                text = self._format_student(student) if student else ""
-                colour = "red" if student and student.color == colors.red else "black"
-                lbl = tk.Label(self.root, text=text, width=12, fg=colour, justify="center")
+                if reusable:
+                    lbl, view = reusable.pop()
+                    if view is not None:
+                        self.views[seat] = view
+                else:
+                    lbl = tk.Label(self.root, width=12)
                 lbl.grid(row=r, column=c, padx=2, pady=2)
                 lbl.bind("<Button-1>", lambda e, s=seat: self._select_student(s))
                 self.labels[seat] = lbl
-                self._style_label(seat)
-        title_row = len(self.layout)
-        tk.Label(self.root, text="タイトル").grid(row=title_row, column=0, sticky="w")
-        tk.Entry(self.root, textvariable=self.title_var, width=20).grid(
-            row=title_row, column=1, columnspan=max(1, cols - 1), sticky="we"
+        for lbl, view in reusable:
+            lbl.grid_remove()
+            self._spare_labels.append((lbl, view))
+        self._place_controls(len(self.layout), max(len(r) for r in self.layout))
+        self._refresh()
+
+    def _build_controls(self) -> None:
+        self.title_label = tk.Label(self.root, text="タイトル")
+        self.title_entry = tk.Entry(self.root, textvariable=self.title_var, width=20)
+        self.buttons = [
+            tk.Button(self.root, text="Shuffle", command=self.shuffle),
+            tk.Button(self.root, text="Save", command=self.save),
+            tk.Button(self.root, text="すべて削除", command=self.clear_all),
+            tk.Button(self.root, text="縦変更", command=self.change_rows),
+            tk.Button(self.root, text="横変更", command=self.change_cols),
+        ]
+        self.count_label = tk.Label(self.root, textvariable=self.count_var)
+        self.edit_bar = tk.Frame(self.root)
+        self.undo_button = tk.Button(self.edit_bar, text="元に戻す", command=self.undo)
+        self.undo_button.pack(side=tk.LEFT, padx=2)
+        self.redo_button = tk.Button(self.edit_bar, text="やり直し", command=self.redo)
+        self.redo_button.pack(side=tk.LEFT, padx=2)
+        tk.Button(self.edit_bar, text="新しいセッション", command=self.new_session).pack(
+            side=tk.LEFT, padx=2
         )
-        btn_row = title_row + 1
-        tk.Button(self.root, text="Shuffle", command=self.shuffle).grid(
-            row=btn_row, column=0, pady=5
+        tk.Button(self.edit_bar, text="履歴を保存", command=self.export_history).pack(
+            side=tk.LEFT, padx=2
         )
-        tk.Button(self.root, text="Save", command=self.save).grid(row=btn_row, column=1, pady=5)
-        tk.Button(self.root, text="すべて削除", command=self.clear_all).grid(
-            row=btn_row, column=2, pady=5
+        tk.Button(self.edit_bar, text="移動リスト", command=self.export_moves).pack(
+            side=tk.LEFT, padx=2
         )
-        tk.Button(self.root, text="縦変更", command=self.change_rows).grid(row=btn_row, column=3, pady=5)
-        tk.Button(self.root, text="横変更", command=self.change_cols).grid(row=btn_row, column=4, pady=5)
-        self.count_label = tk.Label(self.root, textvariable=self.count_var)
+        moves = tk.Menubutton(self.edit_bar, text="一括移動", relief="raised")
+        moves_menu = tk.Menu(moves, tearoff=False)
+        for label, command in (
+            ("1行後ろへ", lambda: self.transform("1行後ろへ", transform.rotate_rows, 1)),
+            ("1行前へ", lambda: self.transform("1行前へ", transform.rotate_rows, -1)),
+            ("1列右へ", lambda: self.transform("1列右へ", transform.shift_columns, 1)),
+            ("1列左へ", lambda: self.transform("1列左へ", transform.shift_columns, -1)),
+            ("左右反転", lambda: self.transform("左右反転", transform.mirror, True)),
+            ("前後反転", lambda: self.transform("前後反転", transform.mirror, False)),
+            ("180°回転", lambda: self.transform("180°回転", transform.rotate_180)),
+            ("ブロックを入れ替え...", self.swap_blocks),
+        ):
+            moves_menu.add_command(label=label, command=command)
+        moves.config(menu=moves_menu)
+        moves.pack(side=tk.LEFT, padx=2)
+        tk.Label(self.edit_bar, text="並び").pack(side=tk.LEFT, padx=(8, 0))
+        tk.OptionMenu(
+            self.edit_bar, self.pattern_var, RANDOM_PATTERN, *PATTERN_LABELS.values()
+        ).pack(side=tk.LEFT, padx=2)
+        tk.Checkbutton(
+            self.edit_bar,
+            text="プレビュー",
+            variable=self.preview_var,
+            command=self.toggle_preview,
+        ).pack(side=tk.LEFT, padx=8)
+        self.preview_frame = tk.Frame(self.root, bd=1, relief="sunken", bg="white")
+        self.preview_label = tk.Label(self.preview_frame, bg="white")
+        self.preview_label.pack()
+        self.root.bind("<Control-z>", lambda e: self.undo())
+        self.root.bind("<Control-y>", lambda e: self.redo())
+        self.status_frame = tk.Frame(self.root)
+        self.progress = ttk.Progressbar(self.status_frame, mode="indeterminate", length=120)
+        self.progress.pack(side=tk.LEFT, padx=5)
+        tk.Label(self.status_frame, textvariable=self.status_var, anchor="w").pack(side=tk.LEFT)
+        self.cancel_button = tk.Button(
+            self.status_frame, text="キャンセル", command=self.exports.cancel, state=tk.DISABLED
+        )
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+
+    def _place_controls(self, title_row: int, cols: int) -> None:
+        self.title_label.grid(row=title_row, column=0, sticky="w")
+        self.title_entry.grid(
+            row=title_row, column=1, columnspan=max(1, cols - 1), sticky="we"
+        )
+        btn_row = title_row + 1
+        for column, button in enumerate(self.buttons):
+            button.grid(row=btn_row, column=column, pady=5)
         self.count_label.grid(
             row=btn_row,
             column=5,
@@ -95,36 +472,40 @@ class SeatApp:
             pady=5,
             sticky="w",
         )
-        self._update_counts()
+        self.edit_bar.grid(row=btn_row + 1, column=0, columnspan=max(1, cols), sticky="w")
+        self.status_frame.grid(
+            row=btn_row + 2, column=0, columnspan=max(1, cols), sticky="we"
+        )
+        self._preview_cell = (btn_row + 3, cols)
+        if self.preview_var.get():
+            self._place_preview()
 
-    def _select_student(self, seat: int) -> None:
-        top = tk.Toplevel(self.root)
-        top.title(f"Seat {seat}")
-        listbox = tk.Listbox(top, height=15)
-        options = []
-        if seat in self.empty_seats:
-            options.append("空席を解除")
+    def _place_preview(self) -> None:
+        """Show the preview to the right of the seats and controls."""
+        rows, column = self._preview_cell
+        self.preview_frame.grid(
+            row=0, column=max(column, CONTROL_COLUMNS), rowspan=rows, sticky="n", padx=5
+        )
+
+    def _refresh(self, seats: Iterable[int] | None = None) -> None:
+        """Bring the labels of ``seats`` (default: all) up to date."""
+        targets = self.labels.keys() if seats is None else seats
+        new = build_views(
+            targets, self.state.assignments, self.state.fixed, self.state.empty, self.default_bg
+        )
+        changes = diff_views(self.views, new)
+        if self._canvas_mode:
+            self.seat_grid.update_views({seat: new[seat] for seat in changes})
         else:
-            options.append("空席にする")
-        options.append("テキスト")
-        options.extend(d["name_kanji"] for d in self.students_sorted)
-        options.extend(["教卓", "補助机"])
-        for name in options:
-            listbox.insert(tk.END, name)
-        listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar = tk.Scrollbar(top, command=listbox.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        listbox.config(yscrollcommand=scrollbar.set)
-
-        def choose() -> None:
-            if not listbox.curselection():
-                return
-            name = listbox.get(listbox.curselection())
-            top.destroy()
-            self._assign_to_seat(seat, name)
+            for seat, options in changes.items():
+                self.labels[seat].config(**options)
+        self.views.update(new)
 
-        listbox.bind("<Double-Button-1>", lambda e: choose())
-        tk.Button(top, text="OK", command=choose).pack()
+    def _select_student(self, seat: int) -> None:
+        # One picker for the whole session; its search index is built once.
+        if self.picker is None:
+            self.picker = StudentPicker(self.root, self.students_sorted, self._assign_to_seat)
+        self.picker.open(seat, self.state.seat_of, seat in self.state.empty)
 
     def _ask_multiline(self, title: str) -> str | None:
         dialog = tk.Toplevel(self.root)
@@ -150,27 +531,18 @@ class SeatApp:
         return result[0] if result else None
 
     def _assign_to_seat(self, seat: int, name: str) -> None:
+        self._apply_choice(seat, name)
+        self._record(f"{seat}: {name}")
+
+    def _apply_choice(self, seat: int, name: str) -> None:
         if name == "空席にする":
-            if seat in self.assignments:
-                del self.assignments[seat]
-            self.empty_seats[seat] = ("", "black")
-            self.fixed_seats.add(seat)
-            self.labels[seat].config(text="", fg="black")
-            self._style_label(seat)
-            self._update_counts()
+            self.state.set_text(seat)
             return
         if name == "空席を解除":
-            if seat in self.assignments:
-                del self.assignments[seat]
-            self.fixed_seats.discard(seat)
-            self.empty_seats.pop(seat, None)
-            self.labels[seat].config(text="", fg="black")
-            self._style_label(seat)
-            self._update_counts()
+            self.state.release(seat)
             return
         if name == "テキスト":
-            if seat in self.assignments:
-                del self.assignments[seat]
+            self.state.vacate(seat)
             text = self._ask_multiline("テキストを入力してください")
             if text is None:
                 return
@@ -179,51 +551,12 @@ class SeatApp:
             )
             if not colour:
                 colour = "black"
-            self.empty_seats[seat] = (text, colour)
-            self.fixed_seats.add(seat)
-            self.labels[seat].config(text=text, fg=colour, justify="left", anchor="w")
-            self._style_label(seat)
-            self._update_counts()
+            self.state.set_text(seat, text, colour)
             return
         if name in ("教卓", "補助机"):
-            if seat in self.assignments:
-                del self.assignments[seat]
-            self.empty_seats[seat] = (name, "black")
-            self.fixed_seats.add(seat)
-            self.labels[seat].config(text=name, fg="black")
-            self._style_label(seat)
-            self._update_counts()
+            self.state.set_text(seat, name)
             return
-
-        data = self.student_data[name]
-        prev_seat = None
-        for s, stu in list(self.assignments.items()):
-            if stu.name_kanji == name:
-                prev_seat = s
-                del self.assignments[s]
-                self.labels[s].config(text="", fg="black")
-                self.fixed_seats.discard(s)
-                self.empty_seats.pop(s, None)
-                self._style_label(s)
-                break
-        if seat in self.assignments:
-            del self.assignments[seat]
-        student = Student(
-            seat_number=seat,
-            serial=data["serial"],
-            student_id=data["student_id"],
-            name_kanji=data["name_kanji"],
-            name_kana=data["name_kana"],
-            gender=data.get("gender", "M"),
-            color=colors.red if data.get("status") == "休学" else None,
-        )
-        self.assignments[seat] = student
-        colour = "red" if student.color == colors.red else "black"
-        self.labels[seat].config(text=self._format_student(student), fg=colour, justify="center", anchor="center")
-        self.fixed_seats.add(seat)
-        self.empty_seats.pop(seat, None)
-        self._style_label(seat)
-        self._update_counts()
+        self.state.place_name(seat, name)
 
     def change_rows(self) -> None:
         current = len(self.layout)
@@ -248,49 +581,71 @@ class SeatApp:
         self._reset_layout(new_layout)
 
     def _reset_layout(self, new_layout: List[List[object]]) -> None:
-        self.layout = new_layout
-        self.labels.clear()
-        self.fixed_seats.clear()
-        self.empty_seats.clear()
-        self.assignments.clear()
-        self.total_seats = sum(
-            1 for row in self.layout for seat in row if isinstance(seat, int)
+        self.state.reset(new_layout)
+        self._record("レイアウト変更")
+
+    def transform(self, label: str, operation, *args: object) -> None:
+        """Apply a bulk move from :mod:`seat_chart_generator.transform`.
+
+        Pinned students, empty seats and texts stay where they are.
+        """
+        moves = operation(self.layout, *args, fixed=self.state.fixed)
+        self.state.move_students(moves)
+        self._record(label)
+
+    def swap_blocks(self) -> None:
+        text = simpledialog.askstring(
+            "ブロックを入れ替え",
+            "1つ目の左上(行,列) 2つ目の左上(行,列) 大きさ(行x列)\n例: 1,1 1,4 2x2",
         )
-        for widget in self.root.winfo_children():
-            widget.destroy()
-        self._build_ui()
+        if not text:
+            return
+        try:
+            first, second, size = text.split()
+            r1, c1 = (int(v) - 1 for v in first.split(","))
+            r2, c2 = (int(v) - 1 for v in second.split(","))
+            h, w = (int(v) for v in size.lower().replace("×", "x").split("x"))
+            moves = transform.swap_blocks(
+                self.layout, (r1, c1, h, w), (r2, c2, h, w), self.state.fixed
+            )
+        except ValueError as exc:
+            messagebox.showerror("Error", f"入れ替えできません: {exc}")
+            return
+        self.state.move_students(moves)
+        self._record("ブロックを入れ替え")
 
     def shuffle(self) -> None:
-        fixed = {stu.name_kanji: seat for seat, stu in self.assignments.items() if seat in self.fixed_seats}
+        pattern = self.pattern_var.get()
         try:
-            shuffled = simple_shuffle(
-                STUDENTS, self.layout, fixed=fixed, empty_seats=list(self.empty_seats.keys())
-            )
+            if pattern == RANDOM_PATTERN:
+                shuffled = simple_shuffle(STUDENTS, state=self.state, validate=True)
+            else:
+                shuffled = pattern_shuffle(
+                    STUDENTS, pattern=pattern, state=self.state, validate=True
+                )
+        except ValidationError as exc:
+            self._show_conflicts("席替えできません", exc.conflicts)
+            return
         except ValueError as exc:
             messagebox.showerror("Error", str(exc))
             return
-        self.assignments = {s.seat_number: s for s in shuffled}
-        self.fixed_seats = set(fixed.values()) | set(self.empty_seats.keys())
-        for seat, lbl in self.labels.items():
-            student = self.assignments.get(seat)
-            if student:
-                text = self._format_student(student)
-                colour = "red" if student.color == colors.red else "black"
-                lbl.config(justify="center", anchor="center")
-            elif seat in self.empty_seats:
-                text, colour = self.empty_seats[seat]
-                lbl.config(
-                    justify="left" if text and text not in ("教卓", "補助机") else "center",
-                    anchor="w" if text and text not in ("教卓", "補助机") else "center",
-                )
+        self.moves_base = dict(self.state.assignments)
+        self.state.apply_shuffle(shuffled)
+        self._record("Shuffle")
+        if pattern == RANDOM_PATTERN:
+            self.status_var.set("")
+        else:
+            missed = mismatches(shuffled, self.state.seat_rows, pattern)
+            if missed:
+                self.status_var.set(f"{pattern}: {missed}人は並びどおりにできませんでした")
             else:
-                text = ""
-                colour = "black"
-            lbl.config(text=text, fg=colour)
-            self._style_label(seat)
-        self._update_counts()
+                self.status_var.set(f"{pattern}の並びで席替えしました")
 
     def save(self) -> None:
+        conflicts = errors(validate_students(self.state.students(), self.layout))
+        if conflicts:
+            self._show_conflicts("保存できません", conflicts)
+            return
         safe_title = re.sub(r'[\\/:*?"<>|]', "_", self.title_var.get()) or "seat_chart"
         path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
@@ -299,93 +654,63 @@ class SeatApp:
         )
         if not path:
             return
-        base, ext = os.path.splitext(path)
-        if ext.lower() == ".png":
-            tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
-            tmp.close()
-            create_seat_chart(
-                list(self.assignments.values()),
-                seat_rows=self.layout,
-                committees=COMMITTEES,
-                title=self.title_var.get(),
-                output_path=tmp.name,
-                image_path=path,
-                fixed_seat_numbers=list(self.fixed_seats),
-                empty_seat_texts=self.empty_seats,
-            )
-            os.remove(tmp.name)
-            messagebox.showinfo("Saved", f"PNG を保存しました: {path}")
+        # The export runs on a worker thread; the queue copies the current
+        # state so editing can continue while it runs.
+        self.exports.submit(
+            path,
+            students=self.state.students(),
+            seat_rows=[list(row) for row in self.layout],
+            committees=COMMITTEES,
+            title=self.title_var.get(),
+            fixed_seat_numbers=self.state.fixed,
+            empty_seat_texts=self.state.empty,
+        )
+        self._update_export_status()
+        if not self._export_polling:
+            self._export_polling = True
+            self.root.after(100, self._poll_exports)
+
+    def _poll_exports(self) -> None:
+        for job in self.exports.poll():
+            kind = "PNG" if job.is_png else "PDF"
+            if job.status == DONE:
+                self.status_var.set(f"{kind} を保存しました: {job.path}")
+            elif job.status == CANCELLED:
+                self.status_var.set(f"キャンセルしました: {job.path}")
+            else:
+                messagebox.showerror("Error", f"{kind} の保存に失敗しました: {job.error}")
+        self._update_export_status()
+        if self.exports.pending():
+            self.root.after(100, self._poll_exports)
         else:
-            create_seat_chart(
-                list(self.assignments.values()),
-                seat_rows=self.layout,
-                committees=COMMITTEES,
-                title=self.title_var.get(),
-                output_path=path,
-                image_path=None,
-                fixed_seat_numbers=list(self.fixed_seats),
-                empty_seat_texts=self.empty_seats,
-            )
-            messagebox.showinfo("Saved", f"PDF を保存しました: {path}")
+            self._export_polling = False
+
+    def _update_export_status(self) -> None:
+        pending = self.exports.pending()
+        if pending:
+            current = self.exports.current()
+            name = current.path if current else ""
+            self.status_var.set(f"保存中 ({pending}件): {name}")
+            self.progress.start(10)
+            self.cancel_button.config(state=tk.NORMAL)
+        else:
+            self.progress.stop()
+            self.cancel_button.config(state=tk.DISABLED)
 
     def clear_all(self) -> None:
-        self.assignments.clear()
-        self.fixed_seats.clear()
-        self.empty_seats.clear()
-        for seat, lbl in self.labels.items():
-            lbl.config(text="", fg="black")
-            self._style_label(seat)
-        self._update_counts()
+        self.state.clear_all()
+        self._record("すべて削除")
 
-    def _style_label(self, seat: int) -> None:
-        lbl = self.labels[seat]
-        student = self.assignments.get(seat)
-        if seat in self.empty_seats:
-            text, _ = self.empty_seats[seat]
-            if text in ("教卓", "補助机"):
-                lbl.config(
-                    bg="white",
-                    relief="solid",
-                    borderwidth=2,
-                    anchor="center",
-                    justify="center",
-                )
-            elif text:
-                lbl.config(
-                    bg=self.default_bg,
-                    relief="flat",
-                    borderwidth=0,
-                    anchor="w",
-                    justify="left",
-                )
-            else:  # pure empty seat
-                lbl.config(
-                    bg=self.default_bg,
-                    relief="flat",
-                    borderwidth=0,
-                    anchor="center",
-                    justify="center",
-                )
-        elif student and student.color == colors.red:
-            lbl.config(
-                bg=self.default_bg,
-                relief="flat",
-                borderwidth=0,
-                anchor="center",
-                justify="center",
-            )
-        else:
-            bw = 4 if seat in self.fixed_seats else 2
-            lbl.config(
-                bg="white",
-                relief="solid",
-                borderwidth=bw,
-                anchor="center",
-                justify="center",
-            )
+    def _show_conflicts(self, message: str, conflicts: List[Conflict]) -> None:
+        lines = [str(c) for c in conflicts[:MAX_CONFLICTS_SHOWN]]
+        if len(conflicts) > MAX_CONFLICTS_SHOWN:
+            lines.append(f"ほか{len(conflicts) - MAX_CONFLICTS_SHOWN}件")
+        messagebox.showerror("Error", f"{message}:\n" + "\n".join(lines))
 
     def _update_counts(self) -> None:
-        seats_available = self.total_seats - len(self.empty_seats)
+        # Runs after every edit, so only the seat count is checked here; the
+        # full validation runs on Shuffle and Save.
+        seats_available = self.state.total_seats - len(self.state.empty)
         text = f"席数: {seats_available} / 人数: {self.required_students}"
         if seats_available < self.required_students:
             text += " - 席が足りません"
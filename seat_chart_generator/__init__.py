@@ -1,9 +1,29 @@
 """Seat chart generation package."""
 
+from .errors import RasterError, RenderError, SeatChartError, ValidationError
 from .models import Student
-from .layout import DEFAULT_SEAT_ROWS, generate_layout, load_layout, save_layout
+from .layout import (
+    DEFAULT_SEAT_ROWS,
+    generate_layout,
+    load_layout,
+    load_layout_csv,
+    save_layout,
+    template_layout,
+)
+from .room import RoomLayout, SeatInfo, load_room, save_room
+from .geometry import build_chart_geometry
 from .pdf import create_seat_chart
+from .documents import RosterIndex, create_class_charts
+from .optimize import OptimizationReport, OutputOptions
+from .raster import create_seat_chart_images
+from .rasterize import rasterize_pdfs
+from .render import ChartRenderer
 from .shuffle import simple_shuffle
+from .pattern import pattern_shuffle
+from .rotation import plan_rotation
+from .state import ClassroomState
+from .stream import stream_seat_charts
+from .validate import validate_request
 
 __all__ = [
     "Student",
@@ -11,6 +31,29 @@ __all__ = [
     "generate_layout",
     "load_layout",
     "save_layout",
+    "load_layout_csv",
+    "template_layout",
+    "RoomLayout",
+    "SeatInfo",
+    "load_room",
+    "save_room",
+    "build_chart_geometry",
     "create_seat_chart",
+    "create_class_charts",
+    "RosterIndex",
+    "OutputOptions",
+    "OptimizationReport",
+    "create_seat_chart_images",
+    "rasterize_pdfs",
+    "ChartRenderer",
     "simple_shuffle",
+    "pattern_shuffle",
+    "plan_rotation",
+    "ClassroomState",
+    "stream_seat_charts",
+    "SeatChartError",
+    "RenderError",
+    "RasterError",
+    "ValidationError",
+    "validate_request",
 ]
@@ -2,11 +2,53 @@
 
 from __future__ import annotations
 
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from .models import Student
 
 
+def plan_reserved_seats(
+    students: List[Student],
+    seat_rows: List[List[int]],
+    reserved_students: Iterable[str] = (),
+    reserved_seat_numbers: Optional[List[int]] = None,
+) -> Tuple[List[Tuple[int, Student]], List[Tuple[int, Student]]]:
+    """Work out where :func:`assign_students_to_seats` moves students with
+    priority requests, without changing anything.
+
+    Students named in ``reserved_students`` and students already marked
+    ``special_needs`` go to the reserved seats in order of their current
+    seat.  Returns the ``(seat, student)`` moves that happen and the ones
+    that are blocked because someone else holds the seat.
+    """
+    reserved_students_set = {name.strip() for name in reserved_students}
+    seats_available: List[int] = [n for row in seat_rows for n in row if isinstance(n, int)]
+
+    if reserved_seat_numbers:
+        layout_seats = set(seats_available)
+        reserved_queue: List[int] = [n for n in reserved_seat_numbers if n in layout_seats]
+    else:
+        reserved_queue = list(seats_available)
+
+    special_students: List[Student] = [
+        s for s in students if s.special_needs or s.name_kanji in reserved_students_set
+    ]
+    special_students.sort(key=lambda s: s.seat_number)
+    holders: Dict[int, Student] = {s.seat_number: s for s in students}
+
+    moves: List[Tuple[int, Student]] = []
+    blocked: List[Tuple[int, Student]] = []
+    for seat, student in zip(reserved_queue, special_students):
+        if holders.get(seat) is None or holders[seat] is student:
+            if holders.get(student.seat_number) is student:
+                del holders[student.seat_number]
+            holders[seat] = student
+            moves.append((seat, student))
+        else:
+            blocked.append((seat, student))
+    return moves, blocked
+
+
 def assign_students_to_seats(
     students: List[Student],
     seat_rows: List[List[int]],
@@ -19,30 +61,12 @@ def assign_students_to_seats(
         if s.name_kanji in reserved_students_set:
             s.special_needs = True
 
-    seats_available: List[int] = [n for row in seat_rows for n in row if isinstance(n, int)]
-
-    if reserved_seat_numbers:
-        reserved_queue: List[int] = [n for n in reserved_seat_numbers if n in seats_available]
-    else:
-        reserved_queue = []
-        for row in seat_rows:
-            for seat in row:
-                if seat in seats_available:
-                    reserved_queue.append(seat)
-            if reserved_queue:
-                pass
-
-    special_students: List[Student] = [s for s in students if s.special_needs]
+    moves, _ = plan_reserved_seats(students, seat_rows, (), reserved_seat_numbers)
     assignments: Dict[int, Student] = {s.seat_number: s for s in students}
-
-    if special_students:
-        reserved_queue = reserved_queue[: len(special_students)] if reserved_queue else []
-        special_students.sort(key=lambda s: s.seat_number)
-        for seat, student in zip(reserved_queue, special_students):
-            if assignments.get(seat) is None or assignments[seat] is student:
-                if assignments.get(student.seat_number) is student:
-                    del assignments[student.seat_number]
-                student.seat_number = seat
-                assignments[seat] = student
+    for seat, student in moves:
+        if assignments.get(student.seat_number) is student:
+            del assignments[student.seat_number]
+        student.seat_number = seat
+        assignments[seat] = student
 
     return assignments
@@ -0,0 +1,357 @@
+"""Virtualized seat grid drawn on a single ``tk.Canvas``.
+
+One widget per seat does not scale to exam halls with thousands of seats.
+:class:`SeatGrid` draws every cell as a rectangle and a text item on one
+canvas, but only for the cells inside the visible viewport; cells are
+created and deleted as the user scrolls or zooms.  Cells are identified by
+arbitrary hashable keys (seat numbers in the shuffler, ``(row, col)`` in the
+layout editor) and styled with :class:`~.view.SeatView` tuples.
+"""
+
+from __future__ import annotations
+
+import tkinter as tk
+from tkinter import font as tkfont
+from typing import Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+from .view import SeatView
+
+MIN_ZOOM = 0.2
+MAX_ZOOM = 3.0
+# Below this zoom level texts are not drawn at all; they would be
+# unreadable and cost most of the drawing time.
+TEXT_ZOOM = 0.45
+
+
+class SeatGrid(tk.Frame):
+    """Scrollable, zoomable grid of seat cells.
+
+    ``on_click`` is called with the key of the clicked cell and the event.
+    With ``on_select`` a drag with the left button selects a rectangle of
+    positions: the callback receives the two corner ``(row, col)``
+    positions when the button is released, and plain clicks are reported
+    on release instead of on press.
+    """
+
+    def __init__(
+        self,
+        master: tk.Misc,
+        on_click: Optional[Callable[[Hashable, tk.Event], None]] = None,
+        cell_width: int = 96,
+        cell_height: int = 72,
+        gap: int = 4,
+        width: int = 900,
+        height: int = 600,
+        font_size: int = 9,
+        on_select: Optional[Callable[[Tuple[int, int], Tuple[int, int]], None]] = None,
+    ) -> None:
+        super().__init__(master)
+        self.on_click = on_click
+        self.on_select = on_select
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.gap = gap
+        self.font_size = font_size
+        self.zoom = 1.0
+        try:
+            self.font_family = tkfont.nametofont("TkDefaultFont").actual("family")
+        except (tk.TclError, RuntimeError):
+            self.font_family = "TkDefaultFont"
+        self.rows = 0
+        self.cols = 0
+        self.positions: Dict[Hashable, Tuple[int, int]] = {}
+        self.cells: Dict[Tuple[int, int], Hashable] = {}
+        self.views: Dict[Hashable, SeatView] = {}
+        # key -> ((row, col), (rectangle id, text id)) of cells on the canvas
+        self._drawn: Dict[Hashable, Tuple[Tuple[int, int], Tuple[int, int]]] = {}
+        self._redraw_pending = False
+        # Drag selection: anchor position, whether the pointer left the
+        # anchor cell, and the highlighted (row0, col0, row1, col1) box.
+        self._press: Optional[Tuple[int, int]] = None
+        self._dragging = False
+        self.selection: Optional[Tuple[int, int, int, int]] = None
+
+        self.canvas = tk.Canvas(self, width=width, height=height, highlightthickness=0)
+        self.xbar = tk.Scrollbar(self, orient=tk.HORIZONTAL, command=self._xview)
+        self.ybar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._yview)
+        self.canvas.config(xscrollcommand=self.xbar.set, yscrollcommand=self.ybar.set)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        self.ybar.grid(row=0, column=1, sticky="ns")
+        self.xbar.grid(row=1, column=0, sticky="we")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.canvas.bind("<Configure>", lambda e: self.schedule_redraw())
+        self.canvas.bind("<Button-1>", self._click)
+        self.canvas.bind("<B1-Motion>", self._drag)
+        self.canvas.bind("<ButtonRelease-1>", self._release)
+        self.canvas.bind("<MouseWheel>", self._wheel)
+        self.canvas.bind("<Shift-MouseWheel>", self._wheel_x)
+        self.canvas.bind("<Control-MouseWheel>", self._wheel_zoom)
+        self.canvas.bind("<Button-4>", lambda e: self._scroll(-1))
+        self.canvas.bind("<Button-5>", lambda e: self._scroll(1))
+        self.canvas.bind("<Control-Button-4>", lambda e: self.set_zoom(self.zoom * 1.1))
+        self.canvas.bind("<Control-Button-5>", lambda e: self.set_zoom(self.zoom / 1.1))
+
+    # -- geometry -----------------------------------------------------------
+
+    @property
+    def pitch_x(self) -> float:
+        return (self.cell_width + self.gap) * self.zoom
+
+    @property
+    def pitch_y(self) -> float:
+        return (self.cell_height + self.gap) * self.zoom
+
+    def cell_box(self, row: int, col: int) -> Tuple[float, float, float, float]:
+        x0 = col * self.pitch_x + self.gap * self.zoom
+        y0 = row * self.pitch_y + self.gap * self.zoom
+        return x0, y0, x0 + self.cell_width * self.zoom, y0 + self.cell_height * self.zoom
+
+    def cell_at(self, x: float, y: float) -> Optional[Hashable]:
+        """Return the key of the cell under widget coordinates ``x``/``y``."""
+        position = self.position_at(x, y)
+        return self.cells.get(position) if position is not None else None
+
+    def position_at(self, x: float, y: float, clamp: bool = False) -> Optional[Tuple[int, int]]:
+        """Return ``(row, col)`` under widget coordinates.
+
+        Points in the gaps between cells return ``None`` unless ``clamp`` is
+        set, in which case the nearest position inside the grid is returned.
+        """
+        cx = self.canvas.canvasx(x)
+        cy = self.canvas.canvasy(y)
+        col = int(cx // self.pitch_x)
+        row = int(cy // self.pitch_y)
+        if clamp:
+            return min(max(row, 0), self.rows - 1), min(max(col, 0), self.cols - 1)
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return None
+        x0, y0, x1, y1 = self.cell_box(row, col)
+        if not (x0 <= cx <= x1 and y0 <= cy <= y1):
+            return None
+        return row, col
+
+    def visible_range(self) -> Tuple[int, int, int, int]:
+        """Return ``(row0, row1, col0, col1)`` of the cells in view."""
+        left = self.canvas.canvasx(0)
+        top = self.canvas.canvasy(0)
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        col0 = max(int(left // self.pitch_x), 0)
+        row0 = max(int(top // self.pitch_y), 0)
+        col1 = min(int((left + width) // self.pitch_x) + 1, self.cols)
+        row1 = min(int((top + height) // self.pitch_y) + 1, self.rows)
+        return row0, row1, col0, col1
+
+    # -- content ------------------------------------------------------------
+
+    def set_cells(self, positions: Mapping[Hashable, Tuple[int, int]]) -> None:
+        """Set which key lives at which ``(row, col)`` position.
+
+        Cells whose key and position are unchanged keep their canvas items.
+        """
+        self.positions = dict(positions)
+        self.cells = {pos: key for key, pos in self.positions.items()}
+        self.rows = max((r for r, _ in self.positions.values()), default=-1) + 1
+        self.cols = max((c for _, c in self.positions.values()), default=-1) + 1
+        for key in [k for k in self.views if k not in self.positions]:
+            del self.views[key]
+        if self.selection is not None:
+            row0, col0, row1, col1 = self.selection
+            if row0 >= self.rows or col0 >= self.cols:
+                self.selection = None
+            else:
+                self.selection = (row0, col0, min(row1, self.rows - 1), min(col1, self.cols - 1))
+            self._draw_selection()
+        self._update_scrollregion()
+        self.redraw()
+
+    def update_views(self, views: Mapping[Hashable, SeatView]) -> None:
+        """Store new views; only cells currently drawn are touched."""
+        for key, view in views.items():
+            self.views[key] = view
+            drawn = self._drawn.get(key)
+            if drawn is not None:
+                self._style(drawn[0], drawn[1], view)
+
+    # -- zoom and scrolling -------------------------------------------------
+
+    def set_zoom(self, zoom: float) -> None:
+        zoom = min(max(zoom, MIN_ZOOM), MAX_ZOOM)
+        if abs(zoom - self.zoom) < 1e-3:
+            return
+        xfrac = self.canvas.xview()[0]
+        yfrac = self.canvas.yview()[0]
+        self.zoom = zoom
+        self.canvas.delete("all")
+        self._drawn.clear()
+        self._update_scrollregion()
+        self.canvas.xview_moveto(xfrac)
+        self.canvas.yview_moveto(yfrac)
+        self.redraw()
+        self._draw_selection()
+
+    def _update_scrollregion(self) -> None:
+        width = self.cols * self.pitch_x + self.gap * self.zoom
+        height = self.rows * self.pitch_y + self.gap * self.zoom
+        self.canvas.config(scrollregion=(0, 0, width, height))
+
+    def _xview(self, *args: object) -> None:
+        self.canvas.xview(*args)
+        self.schedule_redraw()
+
+    def _yview(self, *args: object) -> None:
+        self.canvas.yview(*args)
+        self.schedule_redraw()
+
+    def _scroll(self, steps: int, horizontal: bool = False) -> None:
+        if horizontal:
+            self.canvas.xview_scroll(steps, "units")
+        else:
+            self.canvas.yview_scroll(steps, "units")
+        self.schedule_redraw()
+
+    def _wheel(self, event: tk.Event) -> None:
+        self._scroll(-1 if event.delta > 0 else 1)
+
+    def _wheel_x(self, event: tk.Event) -> None:
+        self._scroll(-1 if event.delta > 0 else 1, horizontal=True)
+
+    def _wheel_zoom(self, event: tk.Event) -> None:
+        self.set_zoom(self.zoom * (1.1 if event.delta > 0 else 1 / 1.1))
+
+    def _click(self, event: tk.Event) -> None:
+        if self.on_select is not None:
+            self._press = self.position_at(event.x, event.y, clamp=True) if self.rows else None
+            self._dragging = False
+            return
+        key = self.cell_at(event.x, event.y)
+        if key is not None and self.on_click is not None:
+            self.on_click(key, event)
+
+    def _drag(self, event: tk.Event) -> None:
+        if self._press is None:
+            return
+        position = self.position_at(event.x, event.y, clamp=True)
+        if position != self._press:
+            self._dragging = True
+        if self._dragging:
+            self.set_selection(self._press, position)
+
+    def _release(self, event: tk.Event) -> None:
+        start, self._press = self._press, None
+        if start is None:
+            return
+        if self._dragging:
+            self._dragging = False
+            self.on_select(*self.selection_corners())
+            return
+        key = self.cell_at(event.x, event.y)
+        if key is not None and self.on_click is not None:
+            self.on_click(key, event)
+
+    # -- selection ----------------------------------------------------------
+
+    def set_selection(
+        self,
+        start: Optional[Tuple[int, int]],
+        end: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """Highlight the rectangle spanned by two positions (``None`` clears)."""
+        if start is None:
+            self.selection = None
+        else:
+            end = end or start
+            self.selection = (
+                min(start[0], end[0]),
+                min(start[1], end[1]),
+                max(start[0], end[0]),
+                max(start[1], end[1]),
+            )
+        self._draw_selection()
+
+    def selection_corners(self) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        row0, col0, row1, col1 = self.selection
+        return (row0, col0), (row1, col1)
+
+    def _draw_selection(self) -> None:
+        self.canvas.delete("selection")
+        if self.selection is None:
+            return
+        row0, col0, row1, col1 = self.selection
+        x0, y0, _, _ = self.cell_box(row0, col0)
+        _, _, x1, y1 = self.cell_box(row1, col1)
+        pad = self.gap * self.zoom / 2.0
+        self.canvas.create_rectangle(
+            x0 - pad, y0 - pad, x1 + pad, y1 + pad,
+            outline="#1e6fd9", width=2, dash=(4, 2), tags="selection",
+        )
+
+    # -- drawing ------------------------------------------------------------
+
+    def schedule_redraw(self) -> None:
+        """Coalesce redraw requests from scroll and resize events."""
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self.redraw)
+
+    def redraw(self) -> None:
+        """Draw cells entering the viewport and drop cells leaving it."""
+        self._redraw_pending = False
+        row0, row1, col0, col1 = self.visible_range()
+        visible: Dict[Hashable, Tuple[int, int]] = {}
+        for row in range(row0, row1):
+            for col in range(col0, col1):
+                key = self.cells.get((row, col))
+                if key is not None:
+                    visible[key] = (row, col)
+        for key in [k for k, (pos, _) in self._drawn.items() if visible.get(k) != pos]:
+            # Left the viewport or moved to another position.
+            self.canvas.delete(*self._drawn.pop(key)[1])
+        for key, position in visible.items():
+            if key not in self._drawn:
+                self._drawn[key] = (position, self._create(position, self.views.get(key)))
+        if self.selection is not None:
+            self.canvas.tag_raise("selection")
+
+    def _create(self, position: Tuple[int, int], view: Optional[SeatView]) -> Tuple[int, int]:
+        x0, y0, x1, y1 = self.cell_box(*position)
+        items = (
+            self.canvas.create_rectangle(x0, y0, x1, y1, outline="", fill=""),
+            self.canvas.create_text(x0, y0),
+        )
+        if view is not None:
+            self._style(position, items, view)
+        return items
+
+    def _style(self, position: Tuple[int, int], items: Tuple[int, int], view: SeatView) -> None:
+        rect, text = items
+        x0, y0, x1, y1 = self.cell_box(*position)
+        if view.relief == "solid":
+            outline = "black"
+        elif view.relief == "flat":
+            outline = ""
+        else:
+            outline = "#b0b0b0"
+        self.canvas.itemconfig(
+            rect,
+            fill=view.bg,
+            outline=outline,
+            width=max(1, int(view.borderwidth * self.zoom)) if outline else 1,
+        )
+        if view.anchor == "w":
+            tx, anchor = x0 + 3 * self.zoom, "w"
+        else:
+            tx, anchor = (x0 + x1) / 2.0, "center"
+        show = bool(view.text) and self.zoom >= TEXT_ZOOM
+        self.canvas.coords(text, tx, (y0 + y1) / 2.0)
+        self.canvas.itemconfig(
+            text,
+            text=view.text if show else "",
+            fill=view.fg,
+            anchor=anchor,
+            justify=view.justify,
+            width=max(1, int(x1 - x0)),
+            font=(self.font_family, max(1, int(round(self.font_size * self.zoom)))),
+        )
@@ -0,0 +1,374 @@
+"""Differences between two seatings.
+
+:func:`diff_assignments` compares two ``{seat: Student}`` maps in one pass
+and returns a :class:`PlanDiff` with the move list ("05 山田: 12 → 33"),
+its decomposition into cycles (students who swap among themselves) and
+chains (moves ending at a seat that was free), and the affected seats.
+Students are matched by student ID, or by name when they have none.
+
+Seat keys are plain seat numbers for one class and ``(room, seat)`` tuples
+for multi-room plans; :meth:`PlanDiff.pages` maps the affected seats to the
+rooms (pages) that must be printed again.
+
+:class:`MoveWriter` writes a move list room by room for plans too large to
+hold in memory, keeping only counts and the moves between rooms that still
+wait for their other half.
+"""
+
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .models import Student
+
+SeatKey = Hashable
+
+
+def student_key(student: Student) -> str:
+    return student.student_id or student.name_kanji
+
+
+def default_page(seat: SeatKey) -> Hashable:
+    """Room of a ``(room, seat)`` key, page 1 for a plain seat number."""
+    return seat[0] if isinstance(seat, tuple) else 1
+
+
+def format_seat(seat: Optional[SeatKey]) -> str:
+    if seat is None:
+        return "-"
+    if isinstance(seat, tuple):
+        room, number = seat
+        return f"第{room}室 {number}"
+    return str(seat)
+
+
+@dataclass(frozen=True)
+class Move:
+    """One student changing seats.
+
+    ``source`` is ``None`` for a student who was not seated before and
+    ``target`` is ``None`` for one who is no longer seated.
+    """
+
+    key: str
+    student: Student
+    source: Optional[SeatKey]
+    target: Optional[SeatKey]
+
+
+@dataclass
+class PlanDiff:
+    moves: List[Move] = field(default_factory=list)
+    # Seats in move order: the student of each seat moves to the next one;
+    # in a cycle the last one moves to the first.
+    cycles: List[List[SeatKey]] = field(default_factory=list)
+    chains: List[List[SeatKey]] = field(default_factory=list)
+    unchanged: int = 0
+
+    @classmethod
+    def from_moves(cls, moves: Iterable[Move], unchanged: int = 0) -> "PlanDiff":
+        """Build a diff from raw moves.
+
+        A departure and an arrival of the same student (as produced when
+        rooms are compared one at a time) are merged into one move.
+        """
+        merged: Dict[str, Move] = {}
+        for move in moves:
+            other = merged.get(move.key)
+            if other is None:
+                merged[move.key] = move
+                continue
+            source = other.source if other.source is not None else move.source
+            target = other.target if other.target is not None else move.target
+            student = other.student if other.target is not None else move.student
+            if source == target:
+                del merged[move.key]
+                unchanged += 1
+            else:
+                merged[move.key] = Move(move.key, student, source, target)
+        ordered = sorted(merged.values(), key=lambda m: (m.student.serial, m.key))
+        diff = cls(ordered, unchanged=unchanged)
+        diff._decompose()
+        return diff
+
+    def _decompose(self) -> None:
+        following = {
+            m.source: m.target for m in self.moves if m.source is not None and m.target is not None
+        }
+        targets = set(following.values())
+        seen: Set[SeatKey] = set()
+        for start in following:
+            if start in targets:
+                continue
+            chain = [start]
+            seat = start
+            while seat in following:
+                seen.add(seat)
+                seat = following[seat]
+                chain.append(seat)
+            self.chains.append(chain)
+        for start in following:
+            if start in seen:
+                continue
+            cycle = []
+            seat = start
+            while seat not in seen:
+                seen.add(seat)
+                cycle.append(seat)
+                seat = following[seat]
+            self.cycles.append(cycle)
+
+    def __bool__(self) -> bool:
+        return bool(self.moves)
+
+    @property
+    def swaps(self) -> List[List[SeatKey]]:
+        """Pairs of students who simply trade seats."""
+        return [cycle for cycle in self.cycles if len(cycle) == 2]
+
+    @property
+    def affected_seats(self) -> Set[SeatKey]:
+        seats = {m.source for m in self.moves} | {m.target for m in self.moves}
+        seats.discard(None)
+        return seats
+
+    def pages(self, page_of: Optional[Callable[[SeatKey], Hashable]] = None) -> Set[Hashable]:
+        """Return the pages to reprint.
+
+        By default ``(room, seat)`` keys map to their room and plain seat
+        numbers to page 1.
+        """
+        page_of = page_of or default_page
+        return {page_of(seat) for seat in self.affected_seats}
+
+    def group_of(self) -> Dict[SeatKey, int]:
+        """Map each seat in a cycle or chain to its 1-based group number."""
+        groups: Dict[SeatKey, int] = {}
+        for number, seats in enumerate(self.cycles + self.chains, start=1):
+            for seat in seats:
+                groups.setdefault(seat, number)
+        return groups
+
+
+def diff_assignments(
+    old: Mapping[SeatKey, Student],
+    new: Mapping[SeatKey, Student],
+) -> PlanDiff:
+    """Compare two seatings in time linear in the number of students."""
+    old_seat = {student_key(s): seat for seat, s in old.items()}
+    moves: List[Move] = []
+    unchanged = 0
+    for seat, student in new.items():
+        key = student_key(student)
+        source = old_seat.pop(key, None)
+        if source == seat:
+            unchanged += 1
+        else:
+            moves.append(Move(key, student, source, seat))
+    for key, seat in old_seat.items():
+        moves.append(Move(key, old[seat], seat, None))
+    return PlanDiff.from_moves(moves, unchanged)
+
+
+CSV_HEADER = ["番号", "学籍番号", "氏名", "移動前", "移動後", "グループ"]
+
+
+def _row(move: Move, group: Any) -> List[Any]:
+    return [
+        move.student.serial,
+        move.student.student_id,
+        move.student.name_kanji,
+        format_seat(move.source),
+        format_seat(move.target),
+        group,
+    ]
+
+
+def write_moves_csv(diff: PlanDiff, path: str | Path) -> None:
+    """Write the move list as CSV (UTF-8 with BOM for spreadsheets).
+
+    Students with the same group number swap among themselves or follow
+    each other into a free seat.
+    """
+    groups = diff.group_of()
+    with Path(path).open("w", encoding="utf-8-sig", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(CSV_HEADER)
+        for move in diff.moves:
+            group = groups.get(move.source if move.source is not None else move.target, "")
+            writer.writerow(_row(move, group))
+
+
+class _PdfLines:
+    """Lines of text on A4 pages, starting a new page when one is full."""
+
+    def __init__(self, path: str | Path, title: str) -> None:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import mm
+        from reportlab.pdfgen import canvas
+
+        from .geometry import ensure_font
+
+        ensure_font()
+        self.mm = mm
+        self.width, self.height = A4
+        self.margin, self.line = 15 * mm, 6 * mm
+        self.canvas = canvas.Canvas(str(path), pagesize=A4)
+        self.canvas.setTitle(title)
+        self.y = self.height - self.margin
+
+    def write(self, *cells: Tuple[float, str], size: float = 10) -> None:
+        from .geometry import FONT_NAME
+
+        if self.y < self.margin:
+            self.canvas.showPage()
+            self.y = self.height - self.margin
+        self.canvas.setFont(FONT_NAME, size)
+        for x, text in cells:
+            self.canvas.drawString(self.margin + x, self.y, text)
+        self.y -= self.line * max(1.0, size / 10)
+
+    def gap(self) -> None:
+        self.y -= self.line / 2
+
+    def move(self, move: Move, group: Any = "") -> None:
+        mm = self.mm
+        cells = [
+            (0, f"{move.student.serial:>3}"),
+            (12 * mm, move.student.name_kanji),
+            (60 * mm, f"{format_seat(move.source)} → {format_seat(move.target)}"),
+        ]
+        if group != "":
+            cells.append((120 * mm, f"({group})"))
+        self.write(*cells)
+
+    def save(self) -> None:
+        self.canvas.save()
+
+
+def _summary(moved: int, unchanged: int, affected: Iterable[Hashable]) -> str:
+    summary = f"移動 {moved}人 / そのまま {unchanged}人"
+    rooms = sorted(room for room in affected if room is not None)
+    if rooms:
+        summary += " / 変更のあった部屋: " + "、".join(f"第{room}室" for room in rooms)
+    return summary
+
+
+def write_moves_pdf(diff: PlanDiff, path: str | Path, title: str = "移動リスト") -> None:
+    """Write the move list, the swap groups and the affected rooms as PDF."""
+    pdf = _PdfLines(path, title)
+    pdf.write((0, title), size=16)
+    rooms = {seat[0] for seat in diff.affected_seats if isinstance(seat, tuple)}
+    pdf.write((0, _summary(len(diff.moves), diff.unchanged, rooms)))
+    pdf.gap()
+    for move in diff.moves:
+        pdf.move(move)
+    groups = diff.cycles + diff.chains
+    if groups:
+        pdf.gap()
+        pdf.write((0, "入れ替えのグループ"), size=12)
+        for number, seats in enumerate(groups, start=1):
+            text = " → ".join(format_seat(seat) for seat in seats)
+            if number <= len(diff.cycles):
+                text += f" → {format_seat(seats[0])}"
+            pdf.write((0, f"{number}: {text}"))
+    pdf.save()
+
+
+@dataclass
+class MoveCounts:
+    """Totals of a move list written by :class:`MoveWriter`."""
+
+    moved: int = 0
+    unchanged: int = 0
+    pages: Set[Hashable] = field(default_factory=set)
+
+
+class MoveWriter:
+    """Write a move list one room diff at a time.
+
+    Each :meth:`add` takes the :class:`PlanDiff` of one room and writes its
+    moves at once.  A student who changes rooms shows up as a departure in
+    one room and an arrival in another; the first half waits in memory
+    until the second one arrives and both are written as one move.  Group
+    numbers (see :meth:`PlanDiff.group_of`) are those within each room.
+    Without ``path`` only :attr:`counts` are kept.  A PDF gets its summary
+    at the end, as the totals are only known then.
+    """
+
+    def __init__(self, path: str | Path | None = None, title: str = "移動リスト") -> None:
+        self.counts = MoveCounts()
+        self._pending: Dict[str, Move] = {}
+        self._groups = 0
+        self._fh = None
+        self._csv = None
+        self._pdf: Optional[_PdfLines] = None
+        if path is not None and Path(path).suffix.lower() == ".pdf":
+            self._pdf = _PdfLines(path, title)
+            self._pdf.write((0, title), size=16)
+        elif path is not None:
+            self._fh = Path(path).open("w", encoding="utf-8-sig", newline="")
+            self._csv = csv.writer(self._fh)
+            self._csv.writerow(CSV_HEADER)
+
+    def __enter__(self) -> "MoveWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def add(self, diff: PlanDiff) -> None:
+        groups = diff.group_of()
+        self.counts.unchanged += diff.unchanged
+        for move in diff.moves:
+            if move.source is not None and move.target is not None:
+                group = groups.get(move.source, "")
+                self._write(move, group if group == "" else group + self._groups)
+                continue
+            other = self._pending.pop(move.key, None)
+            if other is None:
+                self._pending[move.key] = move
+                continue
+            merged = PlanDiff.from_moves([other, move])
+            self.counts.unchanged += merged.unchanged
+            for joined in merged.moves:
+                self._write(joined, "")
+        self._groups += len(diff.cycles) + len(diff.chains)
+
+    def _write(self, move: Move, group: Any) -> None:
+        self.counts.moved += 1
+        for seat in (move.source, move.target):
+            if seat is not None:
+                self.counts.pages.add(default_page(seat))
+        if self._csv is not None:
+            self._csv.writerow(_row(move, group))
+        elif self._pdf is not None:
+            self._pdf.move(move, group)
+
+    def close(self) -> MoveCounts:
+        """Write the moves still unpaired (students who joined or left the
+        plan) and finish the file."""
+        pending, self._pending = self._pending, {}
+        for move in sorted(pending.values(), key=lambda m: (m.student.serial, m.key)):
+            self._write(move, "")
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = self._csv = None
+        if self._pdf is not None:
+            counts = self.counts
+            self._pdf.gap()
+            self._pdf.write((0, _summary(counts.moved, counts.unchanged, counts.pages)))
+            self._pdf.save()
+            self._pdf = None
+        return self.counts
+
+
+def write_moves(diff: PlanDiff, path: str | Path, title: str = "移動リスト") -> None:
+    """Write the move list as PDF or CSV depending on the file suffix."""
+    if Path(path).suffix.lower() == ".pdf":
+        write_moves_pdf(diff, path, title)
+    else:
+        write_moves_csv(diff, path)
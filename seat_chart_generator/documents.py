@@ -0,0 +1,335 @@
+"""Class lists, committee rosters and attendance sheets.
+
+These companion documents are laid out as :class:`~.geometry.ChartGeometry`
+pages made of the same drawing items as the seat chart, so they share its
+font registration and text width cache and are written as extra pages of
+the chart PDF in the same pass (see ``documents`` of
+:func:`~.pdf.create_seat_chart`).
+
+Students are resolved through a :class:`RosterIndex`, which maps names,
+student IDs, serial numbers and kana to roster records in one dictionary
+lookup.  Committee members may therefore be given by any of them.
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+
+from .geometry import (
+    FONT_NAME,
+    ChartGeometry,
+    LineItem,
+    RectItem,
+    TextItem,
+    ensure_font,
+    fit_font_size,
+    text_width,
+)
+from .models import Student
+
+if TYPE_CHECKING:
+    from .optimize import OptimizationReport
+
+DOCUMENTS = ("class_list", "committees", "attendance")
+DOCUMENT_TITLES = {
+    "class_list": "名簿",
+    "committees": "委員会名簿",
+    "attendance": "出席簿",
+}
+# Empty date columns of the attendance sheet.
+ATTENDANCE_DAYS = 12
+
+Record = Mapping[str, Any]
+Column = Tuple[str, float, str]  # header, width, alignment
+
+
+def _record(student: Student) -> Dict[str, Any]:
+    return {
+        "serial": student.serial,
+        "student_id": student.student_id,
+        "name_kanji": student.name_kanji,
+        "name_kana": student.name_kana,
+        "gender": student.gender,
+        "status": "休学" if student.color == colors.red else "在籍",
+    }
+
+
+class RosterIndex:
+    """Roster records indexed by name, student ID, serial number and kana.
+
+    ``assignments`` (``{seat: Student}``, e.g. the assignments of a chart
+    geometry) adds the seat of every seated student.  Records may be roster
+    mappings or :class:`~.models.Student` objects.
+    """
+
+    def __init__(
+        self,
+        records: Iterable[Record | Student],
+        assignments: Optional[Mapping[int, Student]] = None,
+    ) -> None:
+        self.records: List[Record] = []
+        self._keys: Dict[str, Record] = {}
+        by_kind: List[Dict[str, Record]] = [{}, {}, {}, {}]
+        for record in records:
+            if isinstance(record, Student):
+                record = _record(record)
+            self.records.append(record)
+            keys = (
+                str(record["name_kanji"]).strip(),
+                str(record.get("student_id", "")).strip(),
+                str(record.get("serial", "")).strip(),
+                str(record.get("name_kana", "")).strip(),
+            )
+            for index, key in zip(by_kind, keys):
+                if key:
+                    index.setdefault(key, record)
+        # Earlier kinds win, so a name is never shadowed by a serial number.
+        for index in reversed(by_kind):
+            self._keys.update(index)
+        self.records.sort(key=lambda r: int(r.get("serial", 0)))
+        self._seats: Dict[str, int] = {}
+        self.add_seats(assignments or {})
+
+    def add_seats(self, assignments: Mapping[int, Student]) -> None:
+        """Record the seats of ``{seat: Student}``, e.g. a chart's
+        assignments after reserved seats were applied."""
+        for seat, student in assignments.items():
+            self._seats[student.name_kanji] = seat
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def lookup(self, ref: str | int) -> Optional[Record]:
+        """Return the record for a name, student ID, serial number or kana."""
+        return self._keys.get(str(ref).strip())
+
+    def resolve(self, refs: Iterable[str | int]) -> Tuple[List[Record], List[str]]:
+        """Return the records of ``refs`` and the references not found."""
+        found: List[Record] = []
+        missing: List[str] = []
+        for ref in refs:
+            record = self.lookup(ref)
+            if record is None:
+                missing.append(str(ref))
+            else:
+                found.append(record)
+        return found, missing
+
+    def display_name(self, ref: str | int) -> str:
+        record = self.lookup(ref)
+        return str(record["name_kanji"]) if record is not None else str(ref)
+
+    def seat_of(self, record: Record) -> Optional[int]:
+        return self._seats.get(str(record["name_kanji"]).strip())
+
+
+def resolve_committees(
+    committees: Iterable[Tuple[str, Sequence[str | int]]],
+    index: RosterIndex,
+) -> List[Tuple[str, List[str]]]:
+    """Replace member references by display names for the chart table;
+    unknown references are kept as written."""
+    return [(name, [index.display_name(m) for m in members]) for name, members in committees]
+
+
+def table_pages(
+    title: str,
+    columns: Sequence[Column],
+    rows: Sequence[Sequence[str]],
+    font_name: str = FONT_NAME,
+) -> List[ChartGeometry]:
+    """Lay out a ruled table over as many A4 pages as needed.
+
+    Column widths are fractions of the printable width; alignment is
+    ``"center"`` or ``"left"``.
+    """
+    ensure_font(font_name)
+    page_width, page_height = A4
+    margin = 15 * mm
+    # Small enough for a class of 45 on one page.
+    line_height = 5.5 * mm
+    font_size = 9
+    title_font_size = 16
+    available = page_width - 2 * margin
+    top = page_height - margin - title_font_size - 8 * mm
+    per_page = max(1, int((top - margin) // line_height) - 1)
+    widths = [fraction * available for _, fraction, _ in columns]
+    text_y = (line_height - font_size) / 2.0 + 1
+
+    pages: List[ChartGeometry] = []
+    chunks = [rows[i : i + per_page] for i in range(0, len(rows), per_page)] or [[]]
+    for number, chunk in enumerate(chunks, start=1):
+        page = ChartGeometry(page_width, page_height, font_name=font_name)
+        heading = title if len(chunks) == 1 else f"{title} ({number}/{len(chunks)})"
+        heading_width = text_width(heading, font_name, title_font_size)
+        page.items.append(
+            TextItem(margin, page_height - margin - title_font_size, heading, title_font_size, align="left")
+        )
+        page.items.append(
+            LineItem(
+                margin,
+                page_height - margin - title_font_size - 2,
+                margin + heading_width,
+                page_height - margin - title_font_size - 2,
+            )
+        )
+        y = top - line_height
+        for cells in [[c[0] for c in columns]] + list(chunk):
+            x = margin
+            for (_, _, align), width, text in zip(columns, widths, cells):
+                page.items.append(RectItem(x, y, width, line_height))
+                if text:
+                    limit = width - 2 * mm
+                    size = fit_font_size(text, font_name, font_size, limit)
+                    tx = x + width / 2.0 if align == "center" else x + 1 * mm
+                    page.items.append(TextItem(tx, y + text_y, text, size, align=align, max_width=limit))
+                x += width
+            y -= line_height
+        pages.append(page)
+    return pages
+
+
+def _seat_text(index: RosterIndex, record: Record) -> str:
+    seat = index.seat_of(record)
+    return "" if seat is None else str(seat)
+
+
+def class_list_pages(
+    index: RosterIndex,
+    title: str = "名簿",
+    font_name: str = FONT_NAME,
+) -> List[ChartGeometry]:
+    columns = [
+        ("番号", 0.08, "center"),
+        ("学籍番号", 0.14, "center"),
+        ("氏名", 0.24, "left"),
+        ("ふりがな", 0.26, "left"),
+        ("性別", 0.08, "center"),
+        ("席", 0.08, "center"),
+        ("状況", 0.12, "center"),
+    ]
+    genders = {"M": "男", "F": "女"}
+    rows = [
+        [
+            str(r.get("serial", "")),
+            str(r.get("student_id", "")),
+            str(r["name_kanji"]),
+            str(r.get("name_kana", "")),
+            genders.get(str(r.get("gender", "")).upper(), ""),
+            _seat_text(index, r),
+            str(r.get("status", "在籍")),
+        ]
+        for r in index.records
+    ]
+    return table_pages(title, columns, rows, font_name)
+
+
+def committee_pages(
+    committees: Iterable[Tuple[str, Sequence[str | int]]],
+    index: RosterIndex,
+    title: str = "委員会名簿",
+    font_name: str = FONT_NAME,
+) -> List[ChartGeometry]:
+    columns = [
+        ("委員会", 0.3, "left"),
+        ("番号", 0.1, "center"),
+        ("学籍番号", 0.16, "center"),
+        ("氏名", 0.32, "left"),
+        ("席", 0.12, "center"),
+    ]
+    rows: List[List[str]] = []
+    for name, members in committees:
+        for position, ref in enumerate(members or [""]):
+            record = index.lookup(ref) if ref else None
+            label = name if position == 0 else ""
+            if record is None:
+                rows.append([label, "", "", str(ref), ""])
+            else:
+                rows.append(
+                    [
+                        label,
+                        str(record.get("serial", "")),
+                        str(record.get("student_id", "")),
+                        str(record["name_kanji"]),
+                        _seat_text(index, record),
+                    ]
+                )
+    return table_pages(title, columns, rows, font_name)
+
+
+def attendance_pages(
+    index: RosterIndex,
+    title: str = "出席簿",
+    days: int = ATTENDANCE_DAYS,
+    font_name: str = FONT_NAME,
+) -> List[ChartGeometry]:
+    """Attendance sheet with ``days`` empty date columns; students on
+    leave are listed with their status instead of boxes to fill."""
+    day_width = 0.64 / days
+    columns = [("番号", 0.08, "center"), ("氏名", 0.28, "left")]
+    columns += [("", day_width, "center")] * days
+    rows = []
+    for r in index.records:
+        status = str(r.get("status", "在籍"))
+        marks = [status] + [""] * (days - 1) if status != "在籍" else [""] * days
+        rows.append([str(r.get("serial", "")), str(r["name_kanji"])] + marks)
+    return table_pages(title, columns, rows, font_name)
+
+
+def document_pages(
+    documents: Iterable[str],
+    index: RosterIndex,
+    committees: Optional[Iterable[Tuple[str, Sequence[str | int]]]] = None,
+    title: str = "座席表",
+    font_name: str = FONT_NAME,
+) -> List[ChartGeometry]:
+    """Pages of the named ``documents`` (see :data:`DOCUMENTS`), titled
+    after the chart."""
+    pages: List[ChartGeometry] = []
+    for kind in documents:
+        if kind not in DOCUMENT_TITLES:
+            raise ValueError(f"unknown document: {kind}")
+        heading = f"{title} {DOCUMENT_TITLES[kind]}"
+        if kind == "class_list":
+            pages += class_list_pages(index, heading, font_name)
+        elif kind == "committees":
+            pages += committee_pages(committees or [], index, heading, font_name)
+        else:
+            pages += attendance_pages(index, heading, font_name=font_name)
+    return pages
+
+
+def create_class_charts(
+    classes: Mapping[str, Mapping[str, Any]],
+    output_dir: str | Path = ".",
+    documents: Sequence[str] = DOCUMENTS,
+    report: Optional["OptimizationReport"] = None,
+    **common: Any,
+) -> List[str]:
+    """Write one PDF per class with the seat chart and its documents.
+
+    ``classes`` maps a class name to the :func:`~.pdf.create_seat_chart`
+    arguments of that class (``students``, ``roster``, ``committees`` ...);
+    ``common`` applies to every class.  The class name is the default
+    title and file name.  With ``optimize`` in the arguments the savings
+    of every class are added to ``report``.
+    """
+    from .pdf import create_seat_chart
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, args in classes.items():
+        args = {"title": name, "documents": documents, **common, **args}
+        path = output_dir / (re.sub(r'[\\/:*?"<>|]', "_", name) + ".pdf")
+        saved = create_seat_chart(output_path=str(path), **args)
+        if report is not None and saved is not None:
+            report.extend(saved)
+        paths.append(str(path))
+    return paths
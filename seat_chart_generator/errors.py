@@ -0,0 +1,54 @@
+"""Exceptions raised by the seat chart API."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from .validate import Conflict
+
+
+class SeatChartError(Exception):
+    """Base class of all errors raised by :mod:`seat_chart_generator`."""
+
+
+class RenderError(SeatChartError):
+    """A chart could not be produced.
+
+    ``stage`` names the step that failed: ``"layout"`` while computing the
+    geometry, ``"pdf"`` while writing the PDF or ``"png"`` for the image.
+    The original exception is available as ``__cause__``.
+    """
+
+    def __init__(self, message: str, stage: str, backend: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.stage = stage
+        self.backend = backend
+
+    def __reduce__(self):
+        return (type(self), (str(self), self.stage, self.backend))
+
+
+class RasterError(RenderError):
+    """The PNG image of a chart could not be produced."""
+
+    def __init__(self, message: str, backend: Optional[str] = None) -> None:
+        super().__init__(message, "png", backend)
+
+    def __reduce__(self):
+        return (type(self), (str(self), self.backend))
+
+
+class ValidationError(SeatChartError, ValueError):
+    """A seating request has conflicts; all of them are in ``conflicts``.
+
+    Also a :class:`ValueError`, which is what :func:`simple_shuffle` raised
+    for a lack of seats before validation existed.
+    """
+
+    def __init__(self, conflicts: List["Conflict"]) -> None:
+        super().__init__("\n".join(str(c) for c in conflicts))
+        self.conflicts = conflicts
+
+    def __reduce__(self):
+        return (type(self), (self.conflicts,))
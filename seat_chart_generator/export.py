@@ -0,0 +1,174 @@
+"""Background export queue for seat charts.
+
+Exports run one after another on a worker thread so that a GUI stays
+responsive.  The queue never calls back into the GUI itself: the owner polls
+:meth:`ExportQueue.poll` from its own thread (for Tk via ``after()``) and
+receives the jobs that finished since the last poll.
+"""
+
+from __future__ import annotations
+
+import io
+import itertools
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterator, List, Optional
+
+from .pdf import create_seat_chart
+from .render import ChartRenderer
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+@contextmanager
+def _replacing(path: str) -> Iterator[str]:
+    """Yield a temporary path next to ``path`` that replaces it once the
+    block succeeds, so a failed export never leaves a truncated file."""
+    tmp = f"{path}.tmp"
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+@dataclass
+class ExportJob:
+    """A single chart export.
+
+    ``chart_args`` are keyword arguments for :func:`create_seat_chart`
+    without ``output_path``/``image_path``.  ``path`` ending in ``.png``
+    produces an image, anything else a PDF.
+    """
+
+    job_id: int
+    path: str
+    chart_args: Dict[str, Any]
+    status: str = QUEUED
+    error: Optional[BaseException] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def is_png(self) -> bool:
+        return self.path.lower().endswith(".png")
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+
+class ExportCancelled(Exception):
+    """Raised inside the worker when a running job was cancelled."""
+
+
+class ExportQueue:
+    """Run chart exports in order on a daemon worker thread."""
+
+    def __init__(self, zoom: float = 4.0) -> None:
+        self.zoom = zoom
+        self._ids = itertools.count(1)
+        self._jobs: "queue.Queue[ExportJob]" = queue.Queue()
+        self._finished: "queue.Queue[ExportJob]" = queue.Queue()
+        self._active: List[ExportJob] = []
+        self._lock = threading.Lock()
+        self._renderer: Optional[ChartRenderer] = None
+        self._thread = threading.Thread(target=self._run, name="seat-chart-export", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: str, **chart_args: Any) -> ExportJob:
+        """Queue an export.  Student objects are copied so later edits in
+        the caller do not leak into a running export."""
+        if "students" in chart_args:
+            chart_args["students"] = [replace(s) for s in chart_args["students"]]
+        for key in ("fixed_seat_numbers", "reserved_students"):
+            if key in chart_args:
+                chart_args[key] = list(chart_args[key])
+        if chart_args.get("empty_seat_texts") is not None:
+            chart_args["empty_seat_texts"] = dict(chart_args["empty_seat_texts"])
+        job = ExportJob(next(self._ids), path, chart_args)
+        with self._lock:
+            self._active.append(job)
+        self._jobs.put(job)
+        return job
+
+    def cancel(self, job: ExportJob | None = None) -> None:
+        """Cancel ``job`` or, without argument, every unfinished job.
+
+        Queued jobs are skipped; a running job stops at the next stage
+        boundary (after the PDF, before rasterizing).
+        """
+        with self._lock:
+            targets = [job] if job is not None else list(self._active)
+        for target in targets:
+            target.cancel_event.set()
+
+    def pending(self) -> int:
+        """Number of queued or running jobs."""
+        with self._lock:
+            return len(self._active)
+
+    def current(self) -> Optional[ExportJob]:
+        with self._lock:
+            for job in self._active:
+                if job.status == RUNNING:
+                    return job
+        return None
+
+    def poll(self) -> List[ExportJob]:
+        """Return jobs finished since the previous call (never blocks)."""
+        finished: List[ExportJob] = []
+        while True:
+            try:
+                finished.append(self._finished.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job.cancelled:
+                job.status = CANCELLED
+            else:
+                job.status = RUNNING
+                try:
+                    self._export(job)
+                    job.status = DONE
+                except ExportCancelled:
+                    job.status = CANCELLED
+                except Exception as exc:  # reported to the GUI via poll()
+                    job.error = exc
+                    job.status = FAILED
+            with self._lock:
+                self._active.remove(job)
+            self._finished.put(job)
+
+    def _check(self, job: ExportJob) -> None:
+        if job.cancelled:
+            raise ExportCancelled()
+
+    def _export(self, job: ExportJob) -> None:
+        if not job.is_png:
+            with _replacing(job.path) as tmp:
+                create_seat_chart(output_path=tmp, image_path=None, **job.chart_args)
+            return
+        if self._renderer is None:
+            self._renderer = ChartRenderer(image_dpi=self.zoom * 72.0)
+        # The PDF is only an intermediate step here and stays in memory.
+        args = dict(job.chart_args)
+        title = args.pop("title", "座席表")
+        geometry = self._renderer.geometry(title=title, **args)
+        pdf = io.BytesIO()
+        self._renderer.write_pdf(geometry, pdf, title)
+        self._check(job)
+        with _replacing(job.path) as tmp:
+            with open(tmp, "wb") as fh:
+                self._renderer.write_png(geometry, fh, pdf.getbuffer())
@@ -0,0 +1,586 @@
+"""Backend independent geometry of a seat chart page.
+
+The layout maths used to live inside :func:`create_seat_chart`.  It is now
+computed once into a :class:`ChartGeometry` made of simple drawing items so
+that the PDF and raster backends draw exactly the same chart.  Coordinates
+are in PDF points with the origin at the bottom left of the page.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from reportlab.lib import colors
+from reportlab.lib.colors import HexColor, toColor
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+
+from .assignment import assign_students_to_seats
+from .validate import check, validate_students
+from .models import Student
+
+FONT_NAME = "HeiseiKakuGo-W5"
+
+
+@dataclass(frozen=True)
+class TextItem:
+    """A single line of text.
+
+    ``x`` is the horizontal centre for ``align="center"`` and the left edge
+    for ``align="left"``; ``y`` is the baseline.  ``font_size`` is already
+    fitted to ``max_width`` using the PDF font metrics.
+    """
+
+    x: float
+    y: float
+    text: str
+    font_size: float
+    colour: colors.Color = colors.black
+    align: str = "center"
+    max_width: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class RectItem:
+    """A stroked rectangle, optionally filled with white."""
+
+    x: float
+    y: float
+    width: float
+    height: float
+    fill: bool = False
+
+
+@dataclass(frozen=True)
+class LineItem:
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+
+
+Item = Union[TextItem, RectItem, LineItem]
+
+
+@dataclass(frozen=True)
+class SeatSlot:
+    """Position of a seat box on the page."""
+
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+@dataclass
+class ChartGeometry:
+    """Everything needed to draw one seat chart page.
+
+    ``seat_items`` holds the drawing items of each seat relative to the
+    origin of its :class:`SeatSlot`; ``items`` holds the remaining page
+    elements (committee table, exam notice and title) in page coordinates.
+    ``assignments`` are the students the chart was laid out for.
+    """
+
+    page_width: float
+    page_height: float
+    slots: Dict[int, SeatSlot] = field(default_factory=dict)
+    seat_items: Dict[int, List[Item]] = field(default_factory=dict)
+    items: List[Item] = field(default_factory=list)
+    font_name: str = FONT_NAME
+    assignments: Dict[int, Student] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ChartView:
+    """A way of presenting the same chart.
+
+    ``rotated`` turns the seat grid by 180° (the teacher's view from the
+    front of the room); ``compact`` shows only the names of students.
+    """
+
+    name: str = "student"
+    rotated: bool = False
+    compact: bool = False
+
+
+STUDENT_VIEW = ChartView("student")
+TEACHER_VIEW = ChartView("teacher", rotated=True)
+COMPACT_VIEW = ChartView("compact", compact=True)
+VIEWS = {view.name: view for view in (STUDENT_VIEW, TEACHER_VIEW, COMPACT_VIEW)}
+
+
+def ensure_font(font_name: str = FONT_NAME) -> None:
+    """Register the CID font once per process."""
+    try:
+        pdfmetrics.getFont(font_name)
+    except KeyError:
+        pdfmetrics.registerFont(UnicodeCIDFont(font_name))
+
+
+@lru_cache(maxsize=8192)
+def text_width(text: str, font_name: str, font_size: float) -> float:
+    """Return the PDF width of ``text``; cached as names repeat a lot."""
+    return pdfmetrics.stringWidth(text, font_name, font_size)
+
+
+def fit_font_size(
+    text: str, font_name: str, font_size: float, max_width: Optional[float]
+) -> float:
+    if max_width is not None:
+        width = text_width(text, font_name, font_size)
+        if width > max_width:
+            font_size *= max_width / width
+    return font_size
+
+
+def parse_colour(value: str) -> colors.Color:
+    try:
+        if value.startswith("#"):
+            return HexColor(value)
+        return toColor(value)
+    except Exception:
+        return colors.black
+
+
+def _text(
+    x: float,
+    y: float,
+    text: str,
+    font_size: float,
+    colour: colors.Color = colors.black,
+    max_width: Optional[float] = None,
+    font_name: str = FONT_NAME,
+) -> TextItem:
+    return TextItem(
+        x,
+        y,
+        text,
+        fit_font_size(text, font_name, font_size, max_width),
+        colour,
+        "center",
+        max_width,
+    )
+
+
+def student_items(
+    student: Student,
+    seat_width: float,
+    seat_height: float,
+    framed: bool,
+    text_colour: colors.Color,
+    font_name: str = FONT_NAME,
+) -> List[Item]:
+    """Return the items for a student's seat relative to the slot origin."""
+    items: List[Item] = []
+    if framed:
+        items.append(RectItem(0, 0, seat_width, seat_height, fill=True))
+        if student.gender == "F":
+            inner = 1.5
+            items.append(
+                RectItem(inner, inner, seat_width - 2 * inner, seat_height - 2 * inner)
+            )
+    top_margin = seat_height * 0.05
+    line_gap = seat_height * 0.04
+    serial_font_size = seat_height * 0.18
+    id_font_size = seat_height * 0.18
+    name_font_size = seat_height * 0.34
+    kana_font_size = seat_height * 0.18
+    centre = seat_width / 2.0
+
+    # Serial number is drawn above the desk to provide more space inside
+    items.append(
+        _text(
+            centre,
+            seat_height + serial_font_size * 0.1,
+            str(student.serial),
+            serial_font_size,
+            text_colour,
+            seat_width - 4 * mm,
+            font_name,
+        )
+    )
+    current_y = seat_height - top_margin
+    current_y -= id_font_size
+    items.append(
+        _text(centre, current_y, student.student_id, id_font_size, text_colour, seat_width - 4 * mm, font_name)
+    )
+    current_y -= line_gap
+    current_y -= name_font_size
+    items.append(
+        _text(centre, current_y, student.name_kanji, name_font_size, text_colour, seat_width - 6 * mm, font_name)
+    )
+    current_y -= line_gap
+    current_y -= kana_font_size
+    items.append(
+        _text(centre, current_y, student.name_kana, kana_font_size, text_colour, seat_width - 6 * mm, font_name)
+    )
+    return items
+
+
+def compact_student_items(
+    student: Student,
+    seat_width: float,
+    seat_height: float,
+    framed: bool,
+    text_colour: colors.Color,
+    font_name: str = FONT_NAME,
+) -> List[Item]:
+    """Return name-only items for a student's seat."""
+    items: List[Item] = [
+        item
+        for item in student_items(student, seat_width, seat_height, framed, text_colour, font_name)
+        if isinstance(item, RectItem)
+    ]
+    font_size = seat_height * 0.4
+    items.append(
+        _text(
+            seat_width / 2.0,
+            (seat_height - font_size * 0.8) / 2.0,
+            student.name_kanji,
+            font_size,
+            text_colour,
+            seat_width - 4 * mm,
+            font_name,
+        )
+    )
+    return items
+
+
+def _student_style(student: Student) -> Tuple[bool, colors.Color]:
+    """Return whether a student's seat is framed and its text colour."""
+    if student.color == colors.red:
+        return False, student.color
+    text_colour = colors.red if student.special_needs else colors.black
+    if student.color is not None:
+        text_colour = student.color
+    return True, text_colour
+
+
+def text_seat_items(
+    text: str,
+    colour: str,
+    seat_width: float,
+    seat_height: float,
+    font_name: str = FONT_NAME,
+) -> List[Item]:
+    """Return the items for a seat showing free text (e.g. 教卓)."""
+    items: List[Item] = []
+    if text in ("教卓", "補助机"):
+        items.append(RectItem(0, 0, seat_width, seat_height, fill=True))
+    lines = text.splitlines()
+    font_size = seat_height * 0.35
+    line_height = font_size * 1.2
+    total_height = line_height * len(lines)
+    start_y = (seat_height + total_height) / 2.0 - line_height
+    text_colour = parse_colour(colour)
+    for idx, line in enumerate(lines):
+        items.append(
+            _text(
+                seat_width / 2.0,
+                start_y - idx * line_height,
+                line,
+                font_size,
+                text_colour,
+                seat_width - 4 * mm,
+                font_name,
+            )
+        )
+    return items
+
+
+def _seat_items(
+    student: Optional[Student],
+    fixed: bool,
+    empty_text: Optional[Tuple[str, str]],
+    slot: SeatSlot,
+    font_name: str,
+) -> Optional[List[Item]]:
+    """Items of one seat; ``None`` for a seat drawn blank."""
+    if student is None:
+        text, colour = empty_text or ("", "black")
+        if not fixed or not text:
+            return None
+        return text_seat_items(text, colour, slot.width, slot.height, font_name)
+    framed, text_colour = _student_style(student)
+    return student_items(student, slot.width, slot.height, framed, text_colour, font_name)
+
+
+def layout_chart(
+    assignments: Dict[int, Student],
+    seat_rows: List[List[Optional[int]]],
+    committees: Optional[List[Tuple[str, List[str]]]] = None,
+    title: str = "座席表",
+    exam_notice: Optional[str] = None,
+    fixed_seat_numbers: Iterable[int] = (),
+    empty_seat_texts: Optional[Dict[int, Tuple[str, str]]] = None,
+    font_name: str = FONT_NAME,
+) -> ChartGeometry:
+    """Compute the geometry for already assigned seats."""
+    ensure_font(font_name)
+    empty_seat_texts = empty_seat_texts or {}
+
+    page_width, page_height = A4
+    geometry = ChartGeometry(
+        page_width, page_height, font_name=font_name, assignments=dict(assignments)
+    )
+
+    margin_top = 35 * mm
+    margin_side = 15 * mm
+
+    committee_line_height = 7 * mm
+    committees_height = committee_line_height * len(committees or [])
+    margin_bottom = 15 * mm
+    committee_gap = 5 * mm if committees else 0
+    grid_top = page_height - margin_top
+    grid_bottom = margin_bottom + committees_height + committee_gap
+    grid_height = grid_top - grid_bottom
+
+    seat_rows_filtered = [row for row in seat_rows if any(isinstance(s, int) for s in row)]
+    num_rows = len(seat_rows_filtered)
+
+    max_seats_in_row = max(len([s for s in row if isinstance(s, int)]) for row in seat_rows)
+    available_width = page_width - 2 * margin_side
+    seat_width = 38 * mm
+    gap_h = 6 * mm
+    total_width = max_seats_in_row * seat_width + (max_seats_in_row - 1) * gap_h
+    if total_width > available_width:
+        scale = available_width / total_width
+        seat_width *= scale
+        gap_h *= scale
+
+    seat_height_base = 22 * mm
+    gap_ratio = 5.0 / 22.0
+    denom = num_rows + gap_ratio * (num_rows - 1)
+    seat_height_fitted = grid_height / denom
+    seat_height = seat_height_fitted if seat_height_base > seat_height_fitted else seat_height_base
+    gap_v = seat_height * gap_ratio
+
+    total_rows_height = num_rows * seat_height + (num_rows - 1) * gap_v
+    y_start = grid_top - (grid_height - total_rows_height) / 2.0 - seat_height
+
+    first_row_top: float | None = None
+    last_row_y = None
+    row_index = 0
+    fixed_seats = set(fixed_seat_numbers)
+    for row in seat_rows:
+        seats_in_row = [s for s in row if isinstance(s, int)]
+        if not seats_in_row:
+            continue
+        num_seats = len(seats_in_row)
+        row_width = num_seats * seat_width + (num_seats - 1) * gap_h
+        x_start = margin_side + (available_width - row_width) / 2.0
+        y = y_start - (seat_height + gap_v) * row_index
+        for seat_num in seats_in_row:
+            slot = geometry.slots[seat_num] = SeatSlot(x_start, y, seat_width, seat_height)
+            x_start += seat_width + gap_h
+            seat_items = _seat_items(
+                assignments.get(seat_num),
+                seat_num in fixed_seats,
+                empty_seat_texts.get(seat_num),
+                slot,
+                font_name,
+            )
+            if seat_items is not None:
+                geometry.seat_items[seat_num] = seat_items
+        if first_row_top is None:
+            first_row_top = y + seat_height
+        last_row_y = y
+        row_index += 1
+
+    items = geometry.items
+    if committees:
+        col1_width = available_width * 0.3
+        col23_width = (available_width - col1_width) / 2.0
+        committee_font_size = 10
+        text_y = (committee_line_height - committee_font_size) / 2.0
+        y = margin_bottom
+        for name, members in reversed(committees):
+            main = members[0] if members else ""
+            sub = members[1] if len(members) > 1 else "／"
+            x = margin_side
+            for width, text in ((col1_width, name), (col23_width, main), (col23_width, sub)):
+                items.append(RectItem(x, y, width, committee_line_height))
+                items.append(TextItem(x + width / 2.0, y + text_y, text, committee_font_size))
+                x += width
+            y += committee_line_height
+
+    if exam_notice and last_row_y is not None:
+        lines = exam_notice.split("\n")
+        notice_font_size = 12
+        notice_width = max(text_width(line, font_name, notice_font_size) for line in lines)
+        x_pos = page_width - margin_side - notice_width
+        y_pos = (last_row_y - seat_height) - 15 * mm
+        for i, line in enumerate(lines):
+            items.append(
+                TextItem(
+                    x_pos,
+                    y_pos + notice_font_size * 1.2 * (len(lines) - i - 1),
+                    line,
+                    notice_font_size,
+                    colors.blue,
+                    "left",
+                )
+            )
+
+    if first_row_top is not None:
+        title_y = first_row_top + 10 * mm
+    else:
+        title_y = page_height - 20 * mm
+    title_font_size = 18
+    title_width = text_width(title, font_name, title_font_size)
+    title_x = (page_width - title_width) / 2.0
+    items.append(TextItem(title_x, title_y, title, title_font_size, colors.black, "left"))
+    underline_offset = 2
+    items.append(
+        LineItem(title_x, title_y - underline_offset, title_x + title_width, title_y - underline_offset)
+    )
+    return geometry
+
+
+def relayout_seats(
+    geometry: ChartGeometry,
+    seats: Iterable[int],
+    assignments: Dict[int, Student],
+    fixed_seat_numbers: Iterable[int] = (),
+    empty_seat_texts: Optional[Dict[int, Tuple[str, str]]] = None,
+) -> ChartGeometry:
+    """Return ``geometry`` with only the items of ``seats`` rebuilt.
+
+    ``geometry`` comes from :func:`layout_chart` for the same layout, title
+    and committees; the other arguments are the new seat contents as for
+    :func:`layout_chart`.  Slots, page items and the items of all other
+    seats are shared with ``geometry``.
+    """
+    fixed_seats = set(fixed_seat_numbers)
+    empty_seat_texts = empty_seat_texts or {}
+    seat_items = dict(geometry.seat_items)
+    for seat in seats:
+        slot = geometry.slots.get(seat)
+        if slot is None:
+            continue
+        items = _seat_items(
+            assignments.get(seat),
+            seat in fixed_seats,
+            empty_seat_texts.get(seat),
+            slot,
+            geometry.font_name,
+        )
+        if items is None:
+            seat_items.pop(seat, None)
+        else:
+            seat_items[seat] = items
+    return ChartGeometry(
+        geometry.page_width,
+        geometry.page_height,
+        geometry.slots,
+        seat_items,
+        geometry.items,
+        geometry.font_name,
+        dict(assignments),
+    )
+
+
+def view_geometry(geometry: ChartGeometry, view: ChartView) -> ChartGeometry:
+    """Derive ``view`` from a chart laid out with :func:`layout_chart`.
+
+    The result shares the page items and every unchanged seat item list
+    with ``geometry``; rotation only moves the seat slots (texts stay
+    upright) within the area the grid occupies.
+    """
+    if not view.rotated and not view.compact:
+        return geometry
+    slots = geometry.slots
+    if view.rotated and slots:
+        left = min(slot.x for slot in slots.values())
+        right = max(slot.x + slot.width for slot in slots.values())
+        bottom = min(slot.y for slot in slots.values())
+        top = max(slot.y + slot.height for slot in slots.values())
+        slots = {
+            seat: SeatSlot(
+                left + right - slot.x - slot.width,
+                bottom + top - slot.y - slot.height,
+                slot.width,
+                slot.height,
+            )
+            for seat, slot in slots.items()
+        }
+    seat_items = geometry.seat_items
+    if view.compact:
+        seat_items = dict(seat_items)
+        for seat, student in geometry.assignments.items():
+            if seat in seat_items:
+                slot = geometry.slots[seat]
+                framed, text_colour = _student_style(student)
+                seat_items[seat] = compact_student_items(
+                    student, slot.width, slot.height, framed, text_colour, geometry.font_name
+                )
+    return ChartGeometry(
+        geometry.page_width,
+        geometry.page_height,
+        slots,
+        seat_items,
+        geometry.items,
+        geometry.font_name,
+        geometry.assignments,
+    )
+
+
+def resolve_views(views: Iterable[Union[str, ChartView]]) -> List[ChartView]:
+    """Accept view names (``"student"``, ``"teacher"``, ``"compact"``) or
+    :class:`ChartView` objects."""
+    resolved = []
+    for view in views:
+        if isinstance(view, str):
+            if view not in VIEWS:
+                raise ValueError(f"unknown view: {view}")
+            view = VIEWS[view]
+        resolved.append(view)
+    return resolved
+
+
+def build_chart_geometry(
+    students: List[Student],
+    seat_rows: List[List[Optional[int]]] | None = None,
+    reserved_students: Iterable[str] = (),
+    reserved_seat_numbers: Optional[List[int]] = None,
+    committees: Optional[List[Tuple[str, List[str]]]] = None,
+    title: str = "座席表",
+    exam_notice: Optional[str] = None,
+    fixed_seat_numbers: Iterable[int] = (),
+    empty_seat_texts: Optional[Dict[int, Tuple[str, str]]] = None,
+    font_name: str = FONT_NAME,
+    validate: bool = False,
+) -> ChartGeometry:
+    """Assign ``students`` to seats and compute the chart geometry.
+
+    With ``validate`` a :class:`~.errors.ValidationError` is raised when
+    students share a seat, sit on a seat missing from ``seat_rows`` or a
+    reserved seat is held by someone else (see
+    :func:`~.validate.validate_students`).
+    """
+    if seat_rows is None:
+        from .layout import DEFAULT_SEAT_ROWS
+
+        seat_rows = DEFAULT_SEAT_ROWS
+
+    if validate:
+        check(validate_students(students, seat_rows, reserved_students, reserved_seat_numbers))
+    ensure_font(font_name)
+    assignments: Dict[int, Student] = assign_students_to_seats(
+        students, seat_rows, reserved_students, reserved_seat_numbers
+    )
+    return layout_chart(
+        assignments,
+        seat_rows,
+        committees=committees,
+        title=title,
+        exam_notice=exam_notice,
+        fixed_seat_numbers=fixed_seat_numbers,
+        empty_seat_texts=empty_seat_texts,
+        font_name=font_name,
+    )
@@ -0,0 +1,293 @@
+"""Undo/redo history built on persistent, structurally shared snapshots.
+
+:class:`PersistentMap` is an immutable hash trie.  Updating it copies only
+the nodes on the path to the changed keys, so consecutive snapshots of the
+seating share everything that did not change, and :meth:`PersistentMap.diff`
+skips shared subtrees entirely.  :class:`History` stores such snapshots of a
+:class:`~.state.ClassroomState` for undo and redo.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+# Marks a key to be removed in :meth:`PersistentMap.update`.
+DELETE = object()
+
+
+class _Leaf:
+    """Bucket of entries sharing one (masked) hash."""
+
+    __slots__ = ("hash", "items")
+
+    def __init__(self, h: int, items: Tuple[Tuple[Hashable, Any], ...]) -> None:
+        self.hash = h
+        self.items = items
+
+
+def _hash(key: Hashable) -> int:
+    return hash(key) & _HASH_MASK
+
+
+def _merge_leaf(leaf: Optional[_Leaf], h: int, entries: List[Tuple[int, Hashable, Any]]):
+    items = dict(leaf.items) if leaf is not None else {}
+    for _, key, value in entries:
+        if value is DELETE:
+            items.pop(key, None)
+        else:
+            items[key] = value
+    if not items:
+        return None
+    return _Leaf(h, tuple(items.items()))
+
+
+def _update(child, shift: int, entries: List[Tuple[int, Hashable, Any]]):
+    """Return a new version of ``child`` with ``entries`` applied."""
+    if child is None or isinstance(child, _Leaf):
+        hashes = {h for h, _, _ in entries}
+        if child is not None:
+            hashes.add(child.hash)
+        if len(hashes) == 1 or shift >= _HASH_BITS:
+            return _merge_leaf(child, next(iter(hashes)), entries)
+        if child is not None:
+            # Push the existing bucket one level down and retry.
+            slots: List[Any] = [None] * _WIDTH
+            slots[(child.hash >> shift) & _MASK] = child
+            child = tuple(slots)
+        else:
+            child = (None,) * _WIDTH
+    groups: Dict[int, List[Tuple[int, Hashable, Any]]] = {}
+    for entry in entries:
+        groups.setdefault((entry[0] >> shift) & _MASK, []).append(entry)
+    slots = list(child)
+    for index, group in groups.items():
+        slots[index] = _update(slots[index], shift + _BITS, group)
+    if all(slot is None for slot in slots):
+        return None
+    return tuple(slots)
+
+
+def _walk(node) -> Iterator[Tuple[Hashable, Any]]:
+    if node is None:
+        return
+    if isinstance(node, _Leaf):
+        yield from node.items
+        return
+    for child in node:
+        yield from _walk(child)
+
+
+def _diff(a, b) -> Iterator[Hashable]:
+    if a is b:
+        return
+    if a is None or b is None or isinstance(a, _Leaf) or isinstance(b, _Leaf):
+        left = dict(_walk(a))
+        right = dict(_walk(b))
+        for key in left.keys() | right.keys():
+            if key not in left or key not in right:
+                yield key
+            else:
+                old, new = left[key], right[key]
+                if old is not new and old != new:
+                    yield key
+        return
+    for child_a, child_b in zip(a, b):
+        yield from _diff(child_a, child_b)
+
+
+class PersistentMap:
+    """Immutable mapping with cheap updates and structural sharing."""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, root=None, size: int = 0) -> None:
+        self._root = root
+        self._size = size
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[Hashable, Any]]) -> "PersistentMap":
+        return cls().update(items)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, DELETE) is not DELETE
+
+    def __iter__(self) -> Iterator[Hashable]:
+        for key, _ in _walk(self._root):
+            yield key
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        h = _hash(key)
+        node = self._root
+        shift = 0
+        while node is not None:
+            if isinstance(node, _Leaf):
+                if node.hash == h:
+                    for k, v in node.items:
+                        if k == key:
+                            return v
+                return default
+            node = node[(h >> shift) & _MASK]
+            shift += _BITS
+        return default
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        return _walk(self._root)
+
+    def set(self, key: Hashable, value: Any) -> "PersistentMap":
+        return self.update([(key, value)])
+
+    def delete(self, key: Hashable) -> "PersistentMap":
+        return self.update([(key, DELETE)])
+
+    def update(self, items: Iterable[Tuple[Hashable, Any]]) -> "PersistentMap":
+        """Return a map with all ``items`` applied in one pass.
+
+        A value of :data:`DELETE` removes the key.  Every touched node is
+        copied once, however many of the keys fall below it.
+        """
+        entries = [(_hash(k), k, v) for k, v in items]
+        if not entries:
+            return self
+        size = self._size
+        for _, key, value in dict(((k, (h, k, v)) for h, k, v in entries)).values():
+            present = key in self
+            if value is DELETE:
+                size -= present
+            else:
+                size += not present
+        return PersistentMap(_update(self._root, 0, entries), size)
+
+    def diff(self, other: "PersistentMap") -> Iterator[Hashable]:
+        """Yield keys whose values differ, skipping shared subtrees."""
+        return _diff(self._root, other._root)
+
+
+class Snapshot:
+    """Immutable view of a classroom state at one point in time."""
+
+    __slots__ = ("cells", "seat_rows", "label")
+
+    def __init__(
+        self,
+        cells: PersistentMap,
+        seat_rows: List[List[Optional[int]]],
+        label: str = "",
+    ) -> None:
+        self.cells = cells
+        self.seat_rows = seat_rows
+        self.label = label
+
+
+class History:
+    """Undo/redo stack of :class:`Snapshot` objects for one state.
+
+    Call :meth:`record` after every user action.  Because snapshots share
+    structure, each entry costs memory proportional to what changed.
+    """
+
+    def __init__(self, state, limit: int = 1000) -> None:
+        self.state = state
+        self.limit = limit
+        self.entries: List[Snapshot] = [state.snapshot("開始")]
+        self.position = 0
+
+    def record(self, label: str = "") -> bool:
+        """Store the current state; returns ``False`` if nothing changed."""
+        snapshot = self.state.snapshot(label)
+        current = self.entries[self.position]
+        if snapshot.cells is current.cells and snapshot.seat_rows is current.seat_rows:
+            return False
+        del self.entries[self.position + 1 :]
+        self.entries.append(snapshot)
+        if len(self.entries) > self.limit:
+            del self.entries[0]
+        self.position = len(self.entries) - 1
+        return True
+
+    def can_undo(self) -> bool:
+        return self.position > 0
+
+    def can_redo(self) -> bool:
+        return self.position < len(self.entries) - 1
+
+    def undo(self) -> bool:
+        if not self.can_undo():
+            return False
+        self.position -= 1
+        self.state.restore(self.entries[self.position])
+        return True
+
+    def redo(self) -> bool:
+        if not self.can_redo():
+            return False
+        self.position += 1
+        self.state.restore(self.entries[self.position])
+        return True
+
+    def goto(self, position: int) -> None:
+        """Restore any recorded point directly."""
+        self.position = position
+        self.state.restore(self.entries[position])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialise the history; each entry only lists changed seats."""
+        from .state import cell_to_json
+
+        entries: List[Dict[str, Any]] = []
+        previous: Optional[Snapshot] = None
+        for snapshot in self.entries:
+            entry: Dict[str, Any] = {"label": snapshot.label}
+            if previous is None or snapshot.seat_rows is not previous.seat_rows:
+                entry["layout"] = snapshot.seat_rows
+                base = PersistentMap()
+            else:
+                base = previous.cells
+            entry["changes"] = {
+                str(seat): cell_to_json(snapshot.cells.get(seat))
+                for seat in base.diff(snapshot.cells)
+            }
+            entries.append(entry)
+            previous = snapshot
+        return {"version": 1, "position": self.position, "history": entries}
+
+    def export(self, path: str | Path) -> None:
+        """Write the history as a JSON session file."""
+        with Path(path).open("w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def load(cls, path: str | Path, state) -> "History":
+        """Rebuild a history exported with :meth:`export` into ``state``."""
+        from .state import cell_from_json
+
+        with Path(path).open("r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        history = cls.__new__(cls)
+        history.state = state
+        history.limit = max(1000, len(data["history"]))
+        history.entries = []
+        cells = PersistentMap()
+        seat_rows = state.seat_rows
+        for entry in data["history"]:
+            if "layout" in entry:
+                seat_rows = entry["layout"]
+                cells = PersistentMap()
+            cells = cells.update(
+                (int(seat), cell_from_json(value, state.roster, int(seat)))
+                for seat, value in entry["changes"].items()
+            )
+            history.entries.append(Snapshot(cells, seat_rows, entry.get("label", "")))
+        history.position = data.get("position", len(history.entries) - 1)
+        state.restore(history.entries[history.position])
+        return history
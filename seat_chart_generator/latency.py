@@ -0,0 +1,226 @@
+"""Opt-in latency measurements for the Tk applications.
+
+:class:`LatencyMonitor` wraps event handlers of an application object and
+records, for every call, the time spent in the handler and the time until
+Tk is idle again (which includes the redraw the handler caused).  A
+heartbeat scheduled every :data:`HEARTBEAT_MS` measures how late the event
+loop runs it, so stalls outside the wrapped handlers show up too.
+
+Timings go into :class:`Histogram` objects with fixed logarithmic buckets,
+so memory stays constant however long the application runs.  The monitor
+can show a small overlay window with the percentiles and/or append one JSON
+line per event to a log file, followed by a summary when the window closes.
+
+It is off unless asked for, either by passing a monitor to the application
+or with the ``SEAT_CHART_LATENCY`` environment variable: ``overlay``, a log
+file path, or both separated by a comma (``overlay,latency.jsonl``).
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO
+
+ENV_VAR = "SEAT_CHART_LATENCY"
+# Upper bounds of the histogram buckets in milliseconds; the last bucket
+# holds everything slower.
+BUCKETS_MS = (1, 2, 5, 10, 16, 33, 50, 100, 200, 500, 1000, 2000, 5000)
+HEARTBEAT_MS = 100
+OVERLAY_REFRESH_MS = 500
+LOOP = "event loop"
+IDLE_SUFFIX = " +idle"
+
+
+class Histogram:
+    """Counts of durations in :data:`BUCKETS_MS` plus count, sum and max."""
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms: float) -> None:
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the percentile (the maximum
+        for the open last bucket), ``None`` without data."""
+        if not self.count:
+            return None
+        rank = max(1, int(round(fraction * self.count + 0.5)))
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                if index < len(BUCKETS_MS):
+                    return min(float(BUCKETS_MS[index]), self.max_ms)
+                return self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(fraction: float) -> Optional[float]:
+            value = self.percentile(fraction)
+            return None if value is None else round(value, 2)
+
+        return {
+            "count": self.count,
+            "mean_ms": round(self.mean_ms, 2),
+            "p50_ms": ms(0.50),
+            "p95_ms": ms(0.95),
+            "p99_ms": ms(0.99),
+            "max_ms": round(self.max_ms, 2),
+            "buckets": dict(zip([*map(str, BUCKETS_MS), "inf"], self.buckets)),
+        }
+
+
+class LatencyMonitor:
+    """Time event handlers and the Tk event loop of one window."""
+
+    def __init__(
+        self,
+        root: Any,
+        log_path: Optional[str] = None,
+        overlay: bool = False,
+    ) -> None:
+        self.root = root
+        self.histograms: Dict[str, Histogram] = {}
+        self._log: Optional[TextIO] = open(log_path, "a", encoding="utf-8") if log_path else None
+        self._overlay = None
+        self._overlay_label = None
+        self._last = ""
+        self._depth = 0
+        self._closed = False
+        self._beat_due = time.perf_counter() + HEARTBEAT_MS / 1000
+        root.after(HEARTBEAT_MS, self._heartbeat)
+        root.bind("<Destroy>", self._on_destroy, add="+")
+        if overlay:
+            self._build_overlay()
+
+    @classmethod
+    def from_env(cls, root: Any) -> Optional["LatencyMonitor"]:
+        """Return a monitor configured by ``SEAT_CHART_LATENCY`` or ``None``."""
+        value = os.environ.get(ENV_VAR, "").strip()
+        if not value:
+            return None
+        parts = [part.strip() for part in value.split(",") if part.strip()]
+        log_path = next((part for part in parts if part != "overlay"), None)
+        return cls(root, log_path, overlay="overlay" in parts)
+
+    # -- measuring ---------------------------------------------------------
+
+    def instrument(self, target: Any, names: Iterable[str]) -> None:
+        """Replace the methods ``names`` of ``target`` by timed wrappers.
+
+        Call this before widgets are bound to the methods, as a button
+        keeps the method it was given.
+        """
+        for name in names:
+            setattr(target, name, self.wrap(name, getattr(target, name)))
+
+    def wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            self._depth += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._depth -= 1
+                self._handled(name, start)
+
+        return timed
+
+    def record(self, name: str, ms: float) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.record(ms)
+
+    def _handled(self, name: str, start: float) -> None:
+        ms = (time.perf_counter() - start) * 1000
+        self.record(name, ms)
+        if self._depth:
+            # Nested handler: the outer one measures the idle time.
+            self._write({"event": name, "ms": round(ms, 2)})
+            return
+        self._last = f"{name}: {ms:.0f} ms"
+
+        def idle() -> None:
+            idle_ms = (time.perf_counter() - start) * 1000
+            self.record(name + IDLE_SUFFIX, idle_ms)
+            self._last = f"{name}: {ms:.0f} ms（描画まで {idle_ms:.0f} ms）"
+            self._write({"event": name, "ms": round(ms, 2), "idle_ms": round(idle_ms, 2)})
+
+        self.root.after_idle(idle)
+
+    def _heartbeat(self) -> None:
+        if self._closed:
+            return
+        now = time.perf_counter()
+        self.record(LOOP, max(0.0, (now - self._beat_due) * 1000))
+        self._beat_due = now + HEARTBEAT_MS / 1000
+        self.root.after(HEARTBEAT_MS, self._heartbeat)
+
+    # -- reporting ---------------------------------------------------------
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {name: h.to_dict() for name, h in sorted(self.histograms.items())}
+
+    def lines(self) -> List[str]:
+        """One line per handler: count and p50/p95/max in milliseconds."""
+        rows = []
+        for name, h in sorted(self.histograms.items()):
+            rows.append(
+                f"{name:<28} {h.count:>5}回 p50 {h.percentile(0.5):>5.0f} "
+                f"p95 {h.percentile(0.95):>5.0f} max {h.max_ms:>6.0f} ms"
+            )
+        return rows
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        if self._log is not None:
+            entry = {"time": round(time.time(), 3), **entry}
+            self._log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._log.flush()
+
+    def _build_overlay(self) -> None:
+        import tkinter as tk
+
+        self._overlay = tk.Toplevel(self.root)
+        self._overlay.title("応答時間")
+        self._overlay_label = tk.Label(
+            self._overlay, justify="left", anchor="w", font=("TkFixedFont", 9)
+        )
+        self._overlay_label.pack(fill="both", expand=True, padx=4, pady=4)
+        self._refresh_overlay()
+
+    def _refresh_overlay(self) -> None:
+        if self._closed or self._overlay_label is None:
+            return
+        self._overlay_label.config(text="\n".join([self._last, *self.lines()]))
+        self.root.after(OVERLAY_REFRESH_MS, self._refresh_overlay)
+
+    def _on_destroy(self, event: Any) -> None:
+        if event.widget is self.root:
+            self.close()
+
+    def close(self) -> None:
+        """Stop measuring and append the summary to the log."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._log is not None:
+            self._write({"summary": self.summary()})
+            self._log.close()
+            self._log = None
@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
+import csv
 import json
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .room import RoomLayout, cached_seat_rows, update_cache
 
 # Default seat layout with a simple 10x5 grid (5 columns x 10 rows).
 # Numbers represent seat identifiers while ``None`` indicates that no seat
@@ -42,12 +45,21 @@ def load_layout(path: str | Path = "seat_layout.json") -> List[List[Optional[int
     """Load seat layout from JSON file or return default layout.
 
     Legacy entries marked with strings (such as former teacher desks) are
-    treated as empty positions.
+    treated as empty positions.  Version 2 files (see :mod:`.room`) are
+    returned as their grid of seat IDs with broken seats left empty; large
+    ones are read from their binary cache when it is up to date.
     """
     p = Path(path)
     if p.is_file():
+        rows = cached_seat_rows(p)
+        if rows is not None:
+            return rows
         with p.open("r", encoding="utf-8") as fh:
             data = json.load(fh)
+        if isinstance(data, dict):
+            room = RoomLayout.from_json(data)
+            update_cache(room, p)
+            return room.usable_rows()
         for r, row in enumerate(data):
             for c, cell in enumerate(row):
                 if not isinstance(cell, int) and cell is not None:
@@ -64,3 +76,108 @@ def save_layout(
     p = Path(path)
     with p.open("w", encoding="utf-8") as fh:
         json.dump(layout, fh, ensure_ascii=False, indent=2)
+
+
+# CSV cells that mean "no seat"; any other non-blank cell is a seat.
+NO_SEAT_MARKS = {"", "0", "-", "_", "x", "×", "通路", "空"}
+
+
+def number_layout(mask: Sequence[Sequence[bool]]) -> List[List[Optional[int]]]:
+    """Number the ``True`` cells of ``mask`` from left to right, top to
+    bottom."""
+    layout: List[List[Optional[int]]] = []
+    seat = 1
+    for row in mask:
+        layout_row: List[Optional[int]] = []
+        for present in row:
+            layout_row.append(seat if present else None)
+            seat += bool(present)
+        layout.append(layout_row)
+    return layout
+
+
+def load_layout_csv(path: str | Path) -> List[List[Optional[int]]]:
+    """Load a room grid drawn in a spreadsheet.
+
+    Each CSV cell is one position.  Blank cells and marks such as ``-`` or
+    ``通路`` are empty positions, everything else is a seat.  If every seat
+    cell holds a distinct number those numbers are kept, otherwise seats are
+    numbered in reading order.
+    """
+    with Path(path).open("r", encoding="utf-8-sig", newline="") as fh:
+        rows = [[cell.strip() for cell in row] for row in csv.reader(fh)]
+    while rows and not any(rows[-1]):
+        rows.pop()
+    width = max((len(row) for row in rows), default=0)
+    cells = [row + [""] * (width - len(row)) for row in rows]
+    seats = [cell for row in cells for cell in row if cell not in NO_SEAT_MARKS]
+    if seats and all(cell.isdigit() for cell in seats) and len(set(seats)) == len(seats):
+        return [[int(cell) if cell not in NO_SEAT_MARKS else None for cell in row] for row in cells]
+    return number_layout([[cell not in NO_SEAT_MARKS for cell in row] for row in cells])
+
+
+def insert_aisles(mask: List[List[bool]], every: int) -> List[List[bool]]:
+    """Return ``mask`` with an empty column after every ``every`` columns."""
+    if every <= 0:
+        return [list(row) for row in mask]
+    result: List[List[bool]] = []
+    for row in mask:
+        new_row: List[bool] = []
+        for c, present in enumerate(row):
+            if c and c % every == 0:
+                new_row.append(False)
+            new_row.append(present)
+        result.append(new_row)
+    return result
+
+
+def _grid_template(rows: int, cols: int, aisle: int = 0) -> List[List[bool]]:
+    return insert_aisles([[True] * cols for _ in range(rows)], aisle)
+
+
+def _exam_template(rows: int, cols: int, aisle: int = 0) -> List[List[bool]]:
+    checker = [[(r + c) % 2 == 0 for c in range(cols)] for r in range(rows)]
+    return insert_aisles(checker, aisle)
+
+
+# name -> builder(rows, seats per row, aisle every n seats)
+TEMPLATES = {
+    "grid": _grid_template,
+    "lecture": _grid_template,
+    "exam": _exam_template,
+}
+TEMPLATE_ALIASES: Dict[str, str] = {
+    "教室": "grid",
+    "講義室": "lecture",
+    "講堂": "lecture",
+    "試験": "exam",
+    "試験会場": "exam",
+}
+
+
+def template_layout(kind: str, rows: int, cols: int, aisle: int = 0) -> List[List[Optional[int]]]:
+    """Build a numbered layout from a parametric template.
+
+    ``cols`` counts seats per row without aisles; ``aisle`` inserts an empty
+    column after every ``aisle`` seats.  ``exam`` leaves every other seat
+    empty in a checkerboard pattern.
+    """
+    kind = TEMPLATE_ALIASES.get(kind, kind)
+    if kind not in TEMPLATES:
+        raise ValueError(f"unknown template: {kind}")
+    if rows <= 0 or cols <= 0 or aisle < 0:
+        raise ValueError("rows and columns must be positive")
+    return number_layout(TEMPLATES[kind](rows, cols, aisle))
+
+
+def parse_template(spec: str) -> List[List[Optional[int]]]:
+    """Build a layout from a spec such as ``"lecture 12 24 4"``.
+
+    The words are the template name, rows, seats per row and the optional
+    aisle interval; commas may be used instead of spaces.
+    """
+    words: Iterable[str] = spec.replace(",", " ").replace("、", " ").split()
+    kind, *numbers = list(words) or [""]
+    if len(numbers) not in (2, 3) or not all(n.isdigit() for n in numbers):
+        raise ValueError("format: <template> <rows> <seats per row> [aisle every]")
+    return template_layout(kind, *(int(n) for n in numbers))
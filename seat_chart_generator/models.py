@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Mapping, Optional
 from reportlab.lib import colors
 
 
@@ -24,3 +24,19 @@ class Student:
         self.name_kanji = str(self.name_kanji).strip()
         self.name_kana = str(self.name_kana).strip()
         self.gender = str(self.gender).strip().upper()
+
+    @classmethod
+    def from_record(cls, data: Mapping[str, Any], seat_number: int) -> "Student":
+        """Create a student from a roster entry such as ``students.STUDENTS``.
+
+        Students on leave ("休学") are drawn in red.
+        """
+        return cls(
+            seat_number=seat_number,
+            serial=data["serial"],
+            student_id=data["student_id"],
+            name_kanji=data["name_kanji"],
+            name_kana=data["name_kana"],
+            gender=data.get("gender", "M"),
+            color=colors.red if data.get("status") == "休学" else None,
+        )
@@ -0,0 +1,173 @@
+"""Smaller output files for archiving.
+
+The normal path writes the PDF and PNG files as fast as possible.  With
+``optimize=OutputOptions()`` :func:`~.pdf.create_seat_chart` runs an extra
+pass over the finished files:
+
+* the PDF is rewritten with PyMuPDF, which merges identical objects
+  (fonts and other resources repeated across pages), recompresses every
+  stream at maximum effort and packs small objects into object streams;
+* PNG images are reduced to a palette and, with ``png_max_bytes``,
+  downscaled until they fit;
+* instead of referring to the viewer's CID font, a subset of a TrueType
+  font (``font_path``) can be embedded so that archived charts look the
+  same everywhere.
+
+Each pass reports the bytes saved in an :class:`OptimizationReport`; a file
+that would grow is left as it was.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+# Smallest scale a PNG is reduced to when aiming for ``png_max_bytes``.
+MIN_PNG_SCALE = 0.25
+PNG_SCALE_STEP = 0.8
+
+
+@dataclass(frozen=True)
+class OutputOptions:
+    """What the optimization pass does.
+
+    ``compress`` recompresses streams and uses object streams, ``dedupe``
+    merges identical objects.  ``png_colours`` is the palette size (``None``
+    keeps full colour) and ``png_max_bytes`` an upper bound for each image.
+    ``font_path`` embeds a subset of that TrueType/OpenType font.
+    """
+
+    compress: bool = True
+    dedupe: bool = True
+    png_colours: Optional[int] = 256
+    png_max_bytes: Optional[int] = None
+    font_path: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class FileSaving:
+    path: str
+    before: int
+    after: int
+
+    @property
+    def saved(self) -> int:
+        return self.before - self.after
+
+
+@dataclass
+class OptimizationReport:
+    files: List[FileSaving] = field(default_factory=list)
+
+    @property
+    def before(self) -> int:
+        return sum(f.before for f in self.files)
+
+    @property
+    def after(self) -> int:
+        return sum(f.after for f in self.files)
+
+    @property
+    def saved(self) -> int:
+        return self.before - self.after
+
+    def extend(self, other: "OptimizationReport") -> None:
+        self.files.extend(other.files)
+
+    def summary(self) -> str:
+        ratio = self.saved / self.before * 100 if self.before else 0.0
+        return (
+            f"{len(self.files)}ファイル {self.before:,} → {self.after:,} バイト"
+            f"（{self.saved:,} バイト削減、{ratio:.0f}%）"
+        )
+
+
+@lru_cache(maxsize=None)
+def embedded_font(font_path: str) -> str:
+    """Register ``font_path`` with reportlab and return its font name.
+
+    reportlab embeds TrueType fonts as subsets holding only the glyphs that
+    are used.  The first face of a collection (``.ttc``) is used.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    name = f"Embedded-{Path(font_path).stem}"
+    pdfmetrics.registerFont(TTFont(name, font_path, subfontIndex=0))
+    return name
+
+
+def _replace(path: str, data: bytes, before: int) -> FileSaving:
+    if len(data) >= before:
+        return FileSaving(path, before, before)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+    return FileSaving(path, before, len(data))
+
+
+def optimize_pdf(path: str, options: OutputOptions = OutputOptions()) -> FileSaving:
+    """Rewrite a PDF in place according to ``options``."""
+    import fitz  # PyMuPDF
+
+    path = str(path)
+    before = os.path.getsize(path)
+    if not (options.compress or options.dedupe):
+        return FileSaving(path, before, before)
+    with fitz.open(path) as doc:
+        data = doc.tobytes(
+            garbage=4 if options.dedupe else 1,
+            clean=options.dedupe,
+            deflate=options.compress,
+            deflate_fonts=options.compress,
+            use_objstms=int(options.compress),
+            compression_effort=100 if options.compress else 0,
+        )
+    return _replace(path, data, before)
+
+
+def optimize_png(path: str, options: OutputOptions = OutputOptions()) -> FileSaving:
+    """Quantize and, if needed, downscale a PNG in place."""
+    from PIL import Image
+
+    path = str(path)
+    before = os.path.getsize(path)
+    with Image.open(path) as source:
+        rgb = source.convert("RGB")
+
+    def encode(img) -> bytes:
+        if options.png_colours:
+            img = img.quantize(colors=options.png_colours, method=Image.Quantize.MEDIANCUT)
+        buffer = io.BytesIO()
+        img.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue()
+
+    data = encode(rgb)
+    scale = 1.0
+    while options.png_max_bytes and len(data) > options.png_max_bytes:
+        scale *= PNG_SCALE_STEP
+        if scale < MIN_PNG_SCALE:
+            break
+        # Resample in full colour; a palette image would be resized blocky.
+        size = (max(1, int(rgb.width * scale)), max(1, int(rgb.height * scale)))
+        data = encode(rgb.resize(size, Image.Resampling.LANCZOS))
+    return _replace(path, data, before)
+
+
+def optimize_files(
+    pdf_paths: Iterable[str],
+    png_paths: Iterable[str],
+    options: OutputOptions = OutputOptions(),
+) -> OptimizationReport:
+    report = OptimizationReport()
+    for path in pdf_paths:
+        report.files.append(optimize_pdf(path, options))
+    for path in png_paths:
+        if os.path.exists(path):
+            report.files.append(optimize_png(path, options))
+    return report
@@ -0,0 +1,315 @@
+"""Shuffling towards a gender pattern over the layout grid.
+
+A pattern gives every grid position a label: ``"M"``, ``"F"`` or ``"*"``
+(anyone).  Named patterns are ``checkerboard`` (市松), ``columns``
+(alternating columns), ``rows`` (alternating rows) and ``balanced`` (each
+row gets its share of each gender); a custom pattern is a list of strings
+such as ``["MF*", "FM*"]`` (``男``/``女`` work too; any other character
+means anyone).
+
+Students of one gender are interchangeable, so the assignment is a
+transportation problem between gender classes and seat label classes.  A
+maximum flow on that small class graph gives the largest number of students
+on a seat whose label fits them; within each class students and seats are
+paired at random.  When the pattern can be met the result is a uniformly
+random assignment satisfying it, otherwise the closest one.  Everything
+apart from the flow is a single pass, so even very large rooms take
+milliseconds.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from collections import defaultdict, deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .models import Student
+from .roster import GENDER_ALIASES
+from .shuffle import split_request
+
+if TYPE_CHECKING:
+    from .state import ClassroomState
+
+ANY = "*"
+PATTERNS = ("checkerboard", "columns", "rows", "balanced")
+PATTERN_LABELS = {
+    "checkerboard": "市松",
+    "columns": "列交互",
+    "rows": "行交互",
+    "balanced": "行バランス",
+}
+PATTERN_ALIASES = {label: name for name, label in PATTERN_LABELS.items()}
+_SWAP = {"M": "F", "F": "M"}
+
+Pattern = str | Sequence[str]
+Position = Tuple[int, int]
+
+
+def _gender(data: Mapping[str, Any]) -> str:
+    return str(data.get("gender", "M")).strip().upper()
+
+
+def _label(char: str) -> str:
+    label = GENDER_ALIASES.get(char, char.upper())
+    return label if label in _SWAP else ANY
+
+
+def _resolve(pattern: Pattern) -> Pattern:
+    if isinstance(pattern, str):
+        return PATTERN_ALIASES.get(pattern.strip(), pattern.strip().lower())
+    return pattern
+
+
+def _named(pattern: str) -> Callable[[int, int], str]:
+    if pattern == "checkerboard":
+        return lambda r, c: "MF"[(r + c) % 2]
+    if pattern == "columns":
+        return lambda r, c: "MF"[c % 2]
+    if pattern == "rows":
+        return lambda r, c: "MF"[r % 2]
+    raise ValueError(f"unknown pattern: {pattern}")
+
+
+def _balanced(
+    positions: Dict[int, Position],
+    seats: Sequence[int],
+    counts: Mapping[str, int],
+    rng: random.Random,
+) -> Dict[int, str]:
+    """Spread each gender over the rows in proportion to the free seats of
+    the row, at random positions within the row."""
+    rows: Dict[int, List[int]] = defaultdict(list)
+    for seat in seats:
+        rows[positions[seat][0]].append(seat)
+    total = len(seats)
+    labels: Dict[int, str] = {}
+    done = {gender: 0 for gender in counts}
+    used = 0
+    for row in sorted(rows):
+        row_seats = rows[row]
+        used += len(row_seats)
+        row_labels: List[str] = []
+        for gender, count in counts.items():
+            # Cumulative rounding keeps the totals exact.
+            target = round(count * used / total) if total else 0
+            row_labels += [gender] * (target - done[gender])
+            done[gender] = target
+        row_labels = row_labels[: len(row_seats)]
+        row_labels += [ANY] * (len(row_seats) - len(row_labels))
+        rng.shuffle(row_labels)
+        labels.update(zip(row_seats, row_labels))
+    return labels
+
+
+def seat_labels(
+    seat_rows: Sequence[Sequence[Optional[int]]],
+    pattern: Pattern,
+    swap: bool = False,
+) -> Dict[int, str]:
+    """Return ``{seat: label}`` of a position pattern.
+
+    ``swap`` exchanges ``M`` and ``F``, e.g. to start a checkerboard with a
+    girl in the front left seat.
+    """
+    pattern = _resolve(pattern)
+    if isinstance(pattern, str):
+        label_at = _named(pattern)
+    else:
+        grid = [str(line) for line in pattern]
+
+        def label_at(r: int, c: int) -> str:
+            if r < len(grid) and c < len(grid[r]):
+                return _label(grid[r][c])
+            return ANY
+
+    labels: Dict[int, str] = {}
+    for r, row in enumerate(seat_rows):
+        for c, seat in enumerate(row):
+            if isinstance(seat, int):
+                label = label_at(r, c)
+                labels[seat] = _SWAP.get(label, label) if swap else label
+    return labels
+
+
+def _max_flow(
+    supply: Mapping[str, int],
+    capacity: Mapping[str, int],
+) -> Dict[Tuple[str, str], int]:
+    """Edmonds-Karp on the class graph source -> gender -> label -> sink.
+
+    A gender may use seats of its own label and ``*`` seats.
+    """
+    source, sink = ("source",), ("sink",)
+    residual: Dict[Any, Dict[Any, int]] = defaultdict(dict)
+
+    def edge(a: Any, b: Any, cap: int) -> None:
+        residual[a][b] = residual[a].get(b, 0) + cap
+        residual[b].setdefault(a, 0)
+
+    infinite = sum(supply.values())
+    for gender, count in supply.items():
+        edge(source, ("g", gender), count)
+        for label in (gender, ANY):
+            if capacity.get(label):
+                edge(("g", gender), ("l", label), infinite)
+    for label, count in capacity.items():
+        edge(("l", label), sink, count)
+
+    while True:
+        parent: Dict[Any, Any] = {source: None}
+        queue = deque([source])
+        while queue and sink not in parent:
+            node = queue.popleft()
+            for nxt, cap in residual[node].items():
+                if cap > 0 and nxt not in parent:
+                    parent[nxt] = node
+                    queue.append(nxt)
+        if sink not in parent:
+            break
+        path = []
+        node = sink
+        while parent[node] is not None:
+            path.append((parent[node], node))
+            node = parent[node]
+        push = min(residual[a][b] for a, b in path)
+        for a, b in path:
+            residual[a][b] -= push
+            residual[b][a] += push
+
+    flow: Dict[Tuple[str, str], int] = {}
+    for gender in supply:
+        for label in (gender, ANY):
+            used = residual[("l", label)].get(("g", gender), 0)
+            if used:
+                flow[(gender, label)] = used
+    return flow
+
+
+def _assign(
+    students: List[Mapping[str, Any]],
+    seats: List[int],
+    labels: Mapping[int, str],
+) -> Tuple[List[Tuple[Mapping[str, Any], int]], int]:
+    """Pair (already shuffled) students and seats; returns the pairs and the
+    number of students on a seat whose label does not fit."""
+    by_gender: Dict[str, List[Mapping[str, Any]]] = defaultdict(list)
+    for data in students:
+        by_gender[_gender(data)].append(data)
+    by_label: Dict[str, List[int]] = defaultdict(list)
+    for seat in seats:
+        by_label[labels.get(seat, ANY)].append(seat)
+    flow = _max_flow(
+        {g: len(v) for g, v in by_gender.items()},
+        {label: len(v) for label, v in by_label.items()},
+    )
+    pairs: List[Tuple[Mapping[str, Any], int]] = []
+    for (gender, label), count in flow.items():
+        for _ in range(count):
+            pairs.append((by_gender[gender].pop(), by_label[label].pop()))
+    rest_students = [data for group in by_gender.values() for data in group]
+    rest_seats = [seat for group in by_label.values() for seat in group]
+    # Seat order is already random; leftovers take the remaining seats.
+    pairs.extend(zip(rest_students, rest_seats))
+    return pairs, len(rest_students)
+
+
+def pattern_shuffle(
+    students_data: List[Dict[str, str]],
+    seat_rows: List[List[Optional[int]]] | None = None,
+    pattern: Pattern = "checkerboard",
+    fixed: Dict[str, int] | None = None,
+    empty_seats: Iterable[int] | None = None,
+    seed: int | None = None,
+    state: "ClassroomState | None" = None,
+    validate: bool = False,
+) -> List[Student]:
+    """Shuffle like :func:`~.shuffle.simple_shuffle` but follow ``pattern``.
+
+    Pinned students and empty seats are respected; their seats keep their
+    pattern label but are not used.  Named patterns other than ``balanced``
+    are tried in both orientations (boys or girls first) and the better one
+    is used.
+    """
+    rng = random.Random(seed)
+    pattern = _resolve(pattern)
+    assigned, remaining_students, remaining_seats = split_request(
+        students_data, seat_rows, fixed, empty_seats, state, validate
+    )
+    rows = state.seat_rows if seat_rows is None else seat_rows
+    rng.shuffle(remaining_students)
+    rng.shuffle(remaining_seats)
+    if pattern == "balanced":
+        positions = {
+            seat: (r, c)
+            for r, row in enumerate(rows)
+            for c, seat in enumerate(row)
+            if isinstance(seat, int)
+        }
+        counts: Dict[str, int] = defaultdict(int)
+        for data in remaining_students:
+            counts[_gender(data)] += 1
+        choices = [_balanced(positions, remaining_seats, counts, rng)]
+    else:
+        choices = [seat_labels(rows, pattern)]
+        if isinstance(pattern, str):
+            choices.append(seat_labels(rows, pattern, swap=True))
+            rng.shuffle(choices)
+    best = None
+    for labels in choices:
+        pairs, misses = _assign(list(remaining_students), list(remaining_seats), labels)
+        if best is None or misses < best[1]:
+            best = (pairs, misses)
+    for data, seat in best[0]:
+        assigned.append(Student.from_record(data, seat))
+    return assigned
+
+
+def mismatches(
+    students: Iterable[Student],
+    seat_rows: Sequence[Sequence[Optional[int]]],
+    pattern: Pattern,
+) -> int:
+    """Number of students on a seat whose label does not fit them, for the
+    better orientation of ``pattern`` (``balanced`` is not positional and
+    counts students beyond each row's rounded share instead)."""
+    students = list(students)
+    pattern = _resolve(pattern)
+    if pattern == "balanced":
+        row_of = {
+            seat: r for r, row in enumerate(seat_rows) for seat in row if isinstance(seat, int)
+        }
+        per_row: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        totals: Dict[str, int] = defaultdict(int)
+        for s in students:
+            per_row[row_of.get(s.seat_number, -1)][s.gender] += 1
+            totals[s.gender] += 1
+        seated = len(students) or 1
+        off = 0
+        for counts in per_row.values():
+            size = sum(counts.values())
+            for gender, total in totals.items():
+                # Rounding either way is fine; count students beyond that.
+                expected = total * size / seated
+                slack = 0 if expected == int(expected) else 1
+                off += max(0, math.ceil(abs(counts.get(gender, 0) - expected)) - slack)
+        # Each student in the wrong row is counted once per gender.
+        return (off + 1) // 2
+    options = [seat_labels(seat_rows, pattern)]
+    if isinstance(pattern, str):
+        options.append(seat_labels(seat_rows, pattern, swap=True))
+    return min(
+        sum(1 for s in students if labels.get(s.seat_number, ANY) not in (ANY, s.gender))
+        for labels in options
+    )
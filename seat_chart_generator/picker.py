@@ -0,0 +1,190 @@
+"""Student picker with incremental search.
+
+:class:`StudentSearch` indexes a roster once: the name, its kana, the serial
+number and the student ID of every student (and the surname and given name
+separately when they are written with a space) are normalized and kept in
+one sorted list, so the students matching a typed prefix are a binary
+search away.  Kana are matched regardless of hiragana/katakana and
+full/half width.
+
+:class:`StudentPicker` is a window created once and shown again for every
+seat.  Each keystroke replaces the contents of its list in a single call
+with row texts prepared when the window is opened; students who already
+have a seat are marked with it.
+"""
+
+from __future__ import annotations
+
+import bisect
+import tkinter as tk
+import unicodedata
+from typing import Any, Callable, List, Mapping, Sequence, Tuple
+
+# Marks in front of the rows of seated and unseated students.
+SEATED_MARK = "●"
+FREE_MARK = "　"
+PICKER_HEIGHT = 15
+# Entries besides the students, passed to ``on_choose`` like a name.
+ACTIONS = ("テキスト", "教卓", "補助机")
+EMPTY_ACTION = "空席にする"
+RELEASE_ACTION = "空席を解除"
+
+_KATAKANA = {code: code - 0x60 for code in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+def normalize(text: Any) -> str:
+    """Search form of ``text``: NFKC, lower case, katakana as hiragana and
+    without spaces."""
+    text = unicodedata.normalize("NFKC", str(text)).lower().translate(_KATAKANA)
+    return "".join(text.split())
+
+
+class StudentSearch:
+    """Prefix search over the names, kana, serial numbers and student IDs
+    of ``records`` (roster mappings).  Results keep the roster order."""
+
+    def __init__(self, records: Sequence[Mapping[str, Any]]) -> None:
+        self.records = list(records)
+        keys: List[Tuple[str, int]] = []
+        for index, record in enumerate(self.records):
+            forms = {
+                str(record.get(field, ""))
+                for field in ("name_kanji", "name_kana", "serial", "student_id")
+            }
+            for field in ("name_kanji", "name_kana"):
+                forms.update(str(record.get(field, "")).split())
+            keys.extend((key, index) for key in {normalize(f) for f in forms} if key)
+        keys.sort()
+        self._keys = [key for key, _ in keys]
+        self._indices = [index for _, index in keys]
+        self._all = list(range(len(self.records)))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def search(self, query: str) -> List[int]:
+        """Indices of the records with a key starting with ``query``."""
+        prefix = normalize(query)
+        if not prefix:
+            return self._all
+        start = bisect.bisect_left(self._keys, prefix)
+        # Every key with the prefix sorts before prefix + the last code point.
+        end = bisect.bisect_left(self._keys, prefix + "\U0010ffff", start)
+        return sorted(set(self._indices[start:end]))
+
+
+class StudentPicker:
+    """Reusable window to choose the student (or text) of a seat.
+
+    ``on_choose(seat, name)`` receives a student name or one of the action
+    labels (:data:`ACTIONS`, :data:`EMPTY_ACTION`, :data:`RELEASE_ACTION`).
+    """
+
+    def __init__(
+        self,
+        master: tk.Misc,
+        records: Sequence[Mapping[str, Any]],
+        on_choose: Callable[[int, str], None],
+    ) -> None:
+        self.search = StudentSearch(records)
+        self.on_choose = on_choose
+        self.seat = 0
+        self._base = [
+            f"{record.get('serial', '')!s:>4} {record['name_kanji']}  {record.get('name_kana', '')}"
+            for record in self.search.records
+        ]
+        self._rows: List[str] = list(self._base)
+        self._shown: List[int] = []
+
+        self.window = tk.Toplevel(master)
+        self.window.withdraw()
+        self.window.transient(master)
+        self.window.protocol("WM_DELETE_WINDOW", self.hide)
+        self.query_var = tk.StringVar()
+        entry = tk.Entry(self.window, textvariable=self.query_var)
+        entry.pack(fill=tk.X, padx=5, pady=(5, 0))
+        self.entry = entry
+        self.count_var = tk.StringVar()
+        tk.Label(self.window, textvariable=self.count_var, anchor="w").pack(fill=tk.X, padx=5)
+
+        body = tk.Frame(self.window)
+        body.pack(fill=tk.BOTH, expand=True, padx=5)
+        self.list_var = tk.StringVar()
+        self.listbox = tk.Listbox(
+            body, height=PICKER_HEIGHT, width=32, listvariable=self.list_var, exportselection=False
+        )
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar = tk.Scrollbar(body, command=self.listbox.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.config(yscrollcommand=scrollbar.set)
+
+        actions = tk.Frame(self.window)
+        actions.pack(fill=tk.X, padx=5, pady=5)
+        self.empty_button = tk.Button(actions, command=lambda: self._choose(self.empty_button.cget("text")))
+        self.empty_button.pack(side=tk.LEFT)
+        for label in ACTIONS:
+            tk.Button(actions, text=label, command=lambda n=label: self._choose(n)).pack(side=tk.LEFT)
+        tk.Button(actions, text="OK", command=self._choose_selected).pack(side=tk.RIGHT)
+
+        self.query_var.trace_add("write", lambda *a: self._filter())
+        entry.bind("<Return>", lambda e: self._choose_selected())
+        entry.bind("<Down>", lambda e: self._move(1))
+        entry.bind("<Up>", lambda e: self._move(-1))
+        self.window.bind("<Escape>", lambda e: self.hide())
+        self.listbox.bind("<Double-Button-1>", lambda e: self._choose_selected())
+        self.listbox.bind("<Return>", lambda e: self._choose_selected())
+
+    def open(self, seat: int, seat_of: Mapping[str, int], empty: bool = False) -> None:
+        """Show the picker for ``seat``; ``seat_of`` maps the names of seated
+        students to their seats."""
+        self.seat = seat
+        self.window.title(f"Seat {seat}")
+        self.empty_button.config(text=RELEASE_ACTION if empty else EMPTY_ACTION)
+        rows = []
+        for record, base in zip(self.search.records, self._base):
+            taken = seat_of.get(record["name_kanji"])
+            rows.append(f"{FREE_MARK}{base}" if taken is None else f"{SEATED_MARK}{base}  [{taken}番]")
+        self._rows = rows
+        self._shown = []
+        if self.query_var.get():
+            self.query_var.set("")
+        else:
+            self._filter()
+        self.window.deiconify()
+        self.window.lift()
+        self.entry.focus_set()
+
+    def hide(self) -> None:
+        self.window.withdraw()
+
+    def _filter(self) -> None:
+        shown = self.search.search(self.query_var.get())
+        if shown != self._shown:
+            self._shown = shown
+            self.list_var.set(tuple(self._rows[i] for i in shown))
+        self.count_var.set(f"{len(shown)} / {len(self.search)}人")
+        if shown:
+            self._select(0)
+
+    def _select(self, position: int) -> None:
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(position)
+        self.listbox.activate(position)
+        self.listbox.see(position)
+
+    def _move(self, step: int) -> str:
+        if self._shown:
+            current = self.listbox.curselection()
+            position = current[0] + step if current else 0
+            self._select(max(0, min(len(self._shown) - 1, position)))
+        return "break"
+
+    def _choose_selected(self) -> None:
+        current = self.listbox.curselection()
+        if current and current[0] < len(self._shown):
+            record = self.search.records[self._shown[current[0]]]
+            self._choose(record["name_kanji"])
+
+    def _choose(self, name: str) -> None:
+        self.hide()
+        self.on_choose(self.seat, name)
@@ -0,0 +1,281 @@
+"""Live chart preview for the GUI.
+
+:class:`PreviewRenderer` draws a :class:`~.geometry.ChartGeometry` with the
+Pillow backend and keeps the result.  When the next geometry has the same
+page items and seat slots (the usual case after editing a seat), only the
+seats whose items changed are cleared and drawn again.  Without a Japanese
+font Pillow would draw every name as empty boxes, so the renderer then
+draws whole pages through the PDF with PyMuPDF instead and says so in
+:attr:`PreviewRenderer.notice`.
+
+:class:`PreviewWorker` runs the layout and drawing on a daemon thread.  Only
+the newest request is kept, so a burst of edits costs one render; like
+:class:`~.export.ExportQueue` the owner polls for results.  The worker keeps
+the geometry of its last request: while the layout, title and committees
+stay the same, only the seats whose student, text or pin changed are laid
+out again (see :func:`~.geometry.relayout_seats`).
+"""
+
+from __future__ import annotations
+
+import io
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Optional, Set, Tuple
+
+from .geometry import ChartGeometry, Item, SeatSlot, TextItem, layout_chart, relayout_seats
+from .raster import _Painter, find_font
+
+
+@dataclass
+class PreviewResult:
+    """A rendered preview as PPM bytes, ready for ``tk.PhotoImage``."""
+
+    request: int
+    data: bytes
+    width: int
+    height: int
+    seconds: float
+    redrawn: Optional[int]
+
+
+# layout_chart arguments that only affect the items of single seats.
+SEAT_ARGS = ("assignments", "fixed_seat_numbers", "empty_seat_texts")
+
+
+def _page_key(layout_args: Mapping[str, Any]) -> Dict[str, Any]:
+    key = {name: value for name, value in layout_args.items() if name not in SEAT_ARGS}
+    if key.get("seat_rows") is not None:
+        key["seat_rows"] = [list(row) for row in key["seat_rows"]]
+    return key
+
+
+def _changed_seats(old: Mapping[str, Any], new: Mapping[str, Any]) -> Set[int]:
+    """Seats whose contents differ between two sets of layout arguments."""
+    changed: Set[int] = set()
+    for name in ("assignments", "empty_seat_texts"):
+        before, after = old.get(name) or {}, new.get(name) or {}
+        for seat in before.keys() | after.keys():
+            a, b = before.get(seat), after.get(seat)
+            if a is not b and a != b:
+                changed.add(seat)
+    changed |= set(old.get("fixed_seat_numbers") or ()) ^ set(new.get("fixed_seat_numbers") or ())
+    return changed
+
+
+def _seat_bounds(slot: SeatSlot, items: Iterable[Item]) -> Tuple[float, float, float, float]:
+    """Return the page area covered by a seat, including the serial number."""
+    bottom, top = 0.0, slot.height
+    for item in items:
+        if isinstance(item, TextItem):
+            bottom = min(bottom, item.y - item.font_size * 0.3)
+            top = max(top, item.y + item.font_size)
+    return slot.x, slot.y + bottom, slot.x + slot.width, slot.y + top
+
+
+class PreviewRenderer:
+    """Render chart pages, redrawing only changed seats when possible."""
+
+    def __init__(self, dpi: float = 60, font_path: str | None = None) -> None:
+        self.dpi = dpi
+        self.font_path = find_font(font_path)
+        # "pymupdf" when no Japanese font is available for Pillow.
+        self.backend = "pillow" if self.font_path is not None else "pymupdf"
+        self.notice: Optional[str] = None
+        if self.backend == "pymupdf":
+            self.notice = (
+                "日本語フォントが見つからないため、プレビューはPDF経由で描画しています"
+                "（SEAT_CHART_FONTで指定できます）"
+            )
+        self.geometry: Optional[ChartGeometry] = None
+        self.image = None
+        self.redrawn: Optional[int] = None
+        self._scratch = None
+
+    def render(self, geometry: ChartGeometry):
+        """Draw ``geometry`` and return the (shared, mutable) image.
+
+        The number of redrawn seats of the last call is kept in
+        :attr:`redrawn`; ``None`` means the whole page was drawn.
+        """
+        old = self.geometry
+        if self.backend == "pymupdf":
+            self.image = self._via_pdf(geometry)
+            self.redrawn = None
+        elif (
+            old is None
+            or old.page_width != geometry.page_width
+            or old.page_height != geometry.page_height
+            or (old.slots is not geometry.slots and old.slots != geometry.slots)
+            or (old.items is not geometry.items and old.items != geometry.items)
+        ):
+            self._full(geometry)
+            self.redrawn = None
+        else:
+            changed = {
+                seat
+                for seat in old.seat_items.keys() | geometry.seat_items.keys()
+                if old.seat_items.get(seat) != geometry.seat_items.get(seat)
+            }
+            self._seats(old, geometry, changed)
+            self.redrawn = len(changed)
+        self.geometry = geometry
+        return self.image
+
+    def _via_pdf(self, geometry: ChartGeometry):
+        from PIL import Image
+
+        from .pdf import write_pdf
+        from .rasterize import rasterize_bytes
+
+        buffer = io.BytesIO()
+        write_pdf(geometry, buffer)
+        png = rasterize_bytes(buffer.getvalue(), 0, self.dpi / 72.0).data
+        return Image.open(io.BytesIO(png)).convert("RGB")
+
+    def _full(self, geometry: ChartGeometry) -> None:
+        from PIL import Image
+
+        scale = self.dpi / 72.0
+        size = (
+            int(round(geometry.page_width * scale)),
+            int(round(geometry.page_height * scale)),
+        )
+        self.image = Image.new("RGB", size, (255, 255, 255))
+        self._scratch = Image.new("RGB", size, (255, 255, 255))
+        self._draw(self.image, geometry, geometry.seat_items)
+
+    def _draw(self, image, geometry: ChartGeometry, seats: Iterable[int]) -> None:
+        from PIL import ImageDraw
+
+        painter = _Painter(ImageDraw.Draw(image), geometry.page_height, self.dpi / 72.0, self.font_path)
+        for seat in seats:
+            slot = geometry.slots[seat]
+            for item in geometry.seat_items[seat]:
+                painter.item(item, slot.x, slot.y)
+        for item in geometry.items:
+            painter.item(item)
+
+    def _seats(self, old: ChartGeometry, new: ChartGeometry, seats: Set[int]) -> None:
+        """Redraw the page area of ``seats`` from scratch.
+
+        Each area is cleared on a scratch page, every item reaching into it
+        (neighbouring seats, the title) is drawn again and the area is
+        copied over, so anti-aliased edges come out exactly as in a full
+        render.
+        """
+        scale = self.dpi / 72.0
+        pad = 2.0 / scale
+        bounds = {
+            seat: _seat_bounds(new.slots[seat], items) for seat, items in new.seat_items.items()
+        }
+        for seat in seats:
+            x0, y0, x1, y1 = _seat_bounds(
+                new.slots[seat], [*old.seat_items.get(seat, ()), *new.seat_items.get(seat, ())]
+            )
+            x0, y0, x1, y1 = x0 - pad, y0 - pad, x1 + pad, y1 + pad
+            box = (
+                max(0, int(x0 * scale)),
+                max(0, int((new.page_height - y1) * scale)),
+                min(self.image.width, int(x1 * scale) + 1),
+                min(self.image.height, int((new.page_height - y0) * scale) + 1),
+            )
+            self._scratch.paste((255, 255, 255), box)
+            touching = [
+                other
+                for other, (ox0, oy0, ox1, oy1) in bounds.items()
+                if ox0 - pad < x1 and ox1 + pad > x0 and oy0 - pad < y1 and oy1 + pad > y0
+            ]
+            self._draw(self._scratch, new, touching)
+            self.image.paste(self._scratch.crop(box), box[:2])
+
+
+def image_to_ppm(image) -> bytes:
+    """Encode an image as binary PPM, which Tk reads without Pillow."""
+    buffer = io.BytesIO()
+    image.save(buffer, "PPM")
+    return buffer.getvalue()
+
+
+class PreviewWorker:
+    """Compute previews on a daemon thread, newest request wins.
+
+    ``submit`` takes the keyword arguments of
+    :func:`~.geometry.layout_chart`; the caller passes copies of any
+    collections it keeps editing.
+    """
+
+    def __init__(self, renderer: Optional[PreviewRenderer] = None) -> None:
+        self.renderer = renderer or PreviewRenderer()
+        self._cond = threading.Condition()
+        self._request: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._result: Optional[PreviewResult] = None
+        self._error: Optional[BaseException] = None
+        self._counter = 0
+        # (page key, seat arguments, geometry) of the last request.
+        self._previous: Optional[Tuple[Dict[str, Any], Dict[str, Any], ChartGeometry]] = None
+        self.relayouts = 0
+        self._thread = threading.Thread(target=self._run, name="seat-chart-preview", daemon=True)
+        self._thread.start()
+
+    def submit(self, **layout_args: Any) -> int:
+        with self._cond:
+            self._counter += 1
+            self._request = (self._counter, layout_args)
+            self._cond.notify()
+            return self._counter
+
+    def poll(self) -> Optional[PreviewResult]:
+        """Return the newest finished preview, if any (never blocks).
+
+        An exception raised while rendering is re-raised here.
+        """
+        with self._cond:
+            result, self._result = self._result, None
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+        return result
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._request is None:
+                    self._cond.wait()
+                number, layout_args = self._request
+                self._request = None
+            start = time.perf_counter()
+            try:
+                geometry = self._layout(layout_args)
+                image = self.renderer.render(geometry)
+                result = PreviewResult(
+                    number,
+                    image_to_ppm(image),
+                    image.width,
+                    image.height,
+                    time.perf_counter() - start,
+                    self.renderer.redrawn,
+                )
+            except Exception as exc:  # reported to the GUI via poll()
+                with self._cond:
+                    self._error = exc
+                continue
+            with self._cond:
+                self._result = result
+
+    def _layout(self, layout_args: Dict[str, Any]) -> ChartGeometry:
+        """Lay out a request, reusing the last geometry when only seats
+        changed."""
+        key = _page_key(layout_args)
+        seat_args = {name: layout_args[name] for name in SEAT_ARGS if name in layout_args}
+        previous = self._previous
+        if previous is not None and previous[0] == key:
+            geometry = relayout_seats(
+                previous[2], _changed_seats(previous[1], seat_args), **seat_args
+            )
+        else:
+            geometry = layout_chart(**layout_args)
+            self.relayouts += 1
+        self._previous = (key, seat_args, geometry)
+        return geometry
@@ -0,0 +1,270 @@
+"""Direct raster backend drawing seat charts with Pillow.
+
+The chart is drawn from the same :class:`~.geometry.ChartGeometry` used for
+the PDF, so no intermediate PDF has to be rasterized.  Pillow cannot use the
+PDF CID font, therefore a TrueType/OpenType Japanese font is looked up from
+common system locations (or passed explicitly with ``font_path``).  Without
+one :class:`~.errors.RasterError` is raised; Pillow's built-in font would
+draw every Japanese character as an empty box.
+"""
+
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from reportlab.lib import colors
+
+from .errors import RasterError
+from .geometry import ChartGeometry, LineItem, RectItem, TextItem, build_chart_geometry
+from .models import Student
+
+FONT_CANDIDATES = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/opentype/ipaexfont-gothic/ipaexg.ttf",
+    "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
+    "/System/Library/Fonts/ヒラギノ角ゴシック W5.ttc",
+    "/System/Library/Fonts/Hiragino Sans GB.ttc",
+    "C:/Windows/Fonts/YuGothM.ttc",
+    "C:/Windows/Fonts/meiryo.ttc",
+    "C:/Windows/Fonts/msgothic.ttc",
+]
+
+# Output modes: "RGB" keeps colours, "L" is grayscale and "P" a small
+# adaptive palette, which gives the smallest PNG files.
+PALETTE_COLOURS = 16
+
+
+# Characters a font must have to be used for the charts.
+JAPANESE_SAMPLE = "あア漢"
+
+
+@lru_cache(maxsize=None)
+def has_japanese_glyphs(font_path: str) -> bool:
+    """Whether the font draws :data:`JAPANESE_SAMPLE` with real glyphs.
+
+    A missing glyph is drawn as the font's ``.notdef`` box, so each sample
+    character is compared with a private use character no font defines.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        font = ImageFont.truetype(font_path, 32)
+    except OSError:
+        return False
+
+    def glyph(char: str) -> bytes:
+        image = Image.new("L", (48, 48))
+        ImageDraw.Draw(image).text((8, 0), char, fill=255, font=font)
+        return image.tobytes()
+
+    missing = glyph("\U000f0000")
+    return all(glyph(char) != missing for char in JAPANESE_SAMPLE)
+
+
+def find_font(font_path: str | None = None) -> Optional[str]:
+    """Return a usable Japanese font file or ``None``.
+
+    ``font_path`` wins when given, then the ``SEAT_CHART_FONT`` environment
+    variable and finally :data:`FONT_CANDIDATES`.  Fonts without Japanese
+    glyphs are skipped.
+    """
+    for candidate in (font_path, os.environ.get("SEAT_CHART_FONT"), *FONT_CANDIDATES):
+        if candidate and Path(candidate).is_file() and has_japanese_glyphs(candidate):
+            return candidate
+    return None
+
+
+def require_font(font_path: str | None = None) -> str:
+    """Like :func:`find_font` but raise :class:`~.errors.RasterError`
+    when no Japanese font is available."""
+    found = find_font(font_path)
+    if found is None:
+        given = ""
+        if font_path:
+            problem = "には日本語の文字がありません" if Path(font_path).is_file() else "がありません"
+            given = f"{font_path}{problem}。"
+        raise RasterError(
+            f"{given}日本語フォントが見つかりません。font_pathか環境変数"
+            "SEAT_CHART_FONTでTrueType/OpenTypeフォントを指定してください",
+            "pillow",
+        )
+    return found
+
+
+@lru_cache(maxsize=256)
+def _load_font(path: str, size: int):
+    from PIL import ImageFont
+
+    return ImageFont.truetype(path, size)
+
+
+def _rgb(colour: colors.Color) -> Tuple[int, int, int]:
+    return (
+        int(round(colour.red * 255)),
+        int(round(colour.green * 255)),
+        int(round(colour.blue * 255)),
+    )
+
+
+class _Painter:
+    """Map page points to pixels and draw geometry items."""
+
+    def __init__(self, draw, page_height: float, scale: float, font_path: str) -> None:
+        self.draw = draw
+        self.page_height = page_height
+        self.scale = scale
+        self.font_path = font_path
+        self.line_width = max(1, int(round(scale)))
+
+    def px(self, x: float, y: float) -> Tuple[float, float]:
+        return x * self.scale, (self.page_height - y) * self.scale
+
+    def item(self, item: object, dx: float = 0.0, dy: float = 0.0) -> None:
+        if isinstance(item, TextItem):
+            self.text(item, dx, dy)
+        elif isinstance(item, RectItem):
+            x0, y1 = self.px(item.x + dx, item.y + dy)
+            x1, y0 = self.px(item.x + dx + item.width, item.y + dy + item.height)
+            self.draw.rectangle(
+                [x0, y0, x1, y1],
+                outline=(0, 0, 0),
+                fill=(255, 255, 255) if item.fill else None,
+                width=self.line_width,
+            )
+        elif isinstance(item, LineItem):
+            self.draw.line(
+                [self.px(item.x1 + dx, item.y1 + dy), self.px(item.x2 + dx, item.y2 + dy)],
+                fill=(0, 0, 0),
+                width=self.line_width,
+            )
+
+    def text(self, item: TextItem, dx: float, dy: float) -> None:
+        if not item.text:
+            return
+        size = item.font_size * self.scale
+        font = _load_font(self.font_path, max(1, int(size)))
+        if item.max_width is not None:
+            # The TrueType font has different metrics from the PDF font, so
+            # the text is fitted again against the same width.
+            limit = item.max_width * self.scale
+            width = font.getlength(item.text)
+            if width > limit:
+                font = _load_font(self.font_path, max(1, int(size * limit / width)))
+        x, y = self.px(item.x + dx, item.y + dy)
+        anchor = "ms" if item.align == "center" else "ls"
+        self.draw.text((x, y), item.text, fill=_rgb(item.colour), font=font, anchor=anchor)
+
+
+def render_geometry(
+    geometry: ChartGeometry,
+    dpi: float = 288,
+    font_path: str | None = None,
+):
+    """Draw ``geometry`` into a new RGB :class:`PIL.Image.Image`.
+
+    Raises :class:`~.errors.RasterError` without a Japanese font.
+    """
+    from PIL import Image, ImageDraw
+
+    font_path = require_font(font_path)
+    scale = dpi / 72.0
+    size = (int(round(geometry.page_width * scale)), int(round(geometry.page_height * scale)))
+    image = Image.new("RGB", size, (255, 255, 255))
+    painter = _Painter(ImageDraw.Draw(image), geometry.page_height, scale, font_path)
+    for seat, items in geometry.seat_items.items():
+        slot = geometry.slots[seat]
+        for item in items:
+            painter.item(item, slot.x, slot.y)
+    for item in geometry.items:
+        painter.item(item)
+    return image
+
+
+def convert_mode(image, mode: str = "RGB"):
+    """Convert a rendered chart to ``"RGB"``, ``"L"`` or palette ``"P"``."""
+    from PIL import Image
+
+    if mode == "RGB":
+        return image
+    if mode == "L":
+        return image.convert("L")
+    if mode == "P":
+        return image.quantize(colors=PALETTE_COLOURS, method=Image.Quantize.MEDIANCUT)
+    raise ValueError(f"unknown image mode: {mode}")
+
+
+def render_chart_images(
+    geometry: ChartGeometry,
+    sizes: Mapping[str, float],
+    mode: str = "RGB",
+    font_path: str | None = None,
+) -> Dict[str, object]:
+    """Render several sizes of one chart in a single drawing pass.
+
+    ``sizes`` maps arbitrary keys to a DPI.  The chart is drawn once at the
+    largest DPI and smaller sizes are downsampled from that image.
+    """
+    from PIL import Image
+
+    if not sizes:
+        return {}
+    top_dpi = max(sizes.values())
+    master = render_geometry(geometry, top_dpi, font_path)
+    images: Dict[str, object] = {}
+    for key, dpi in sizes.items():
+        image = master
+        if dpi != top_dpi:
+            ratio = dpi / top_dpi
+            target = (max(1, int(round(master.width * ratio))), max(1, int(round(master.height * ratio))))
+            image = master.resize(target, Image.Resampling.LANCZOS)
+        images[key] = convert_mode(image, mode)
+    return images
+
+
+def save_chart_images(
+    geometry: ChartGeometry,
+    outputs: Mapping[str, float],
+    mode: str = "RGB",
+    font_path: str | None = None,
+) -> None:
+    """Render and save images; ``outputs`` maps file paths to DPI."""
+    images = render_chart_images(geometry, outputs, mode, font_path)
+    for path, image in images.items():
+        image.save(path, optimize=mode != "RGB")
+
+
+def create_seat_chart_images(
+    students: List[Student],
+    outputs: Mapping[str, float],
+    seat_rows: List[List[Optional[int]]] | None = None,
+    reserved_students: Iterable[str] = (),
+    reserved_seat_numbers: Optional[List[int]] = None,
+    committees: Optional[List[Tuple[str, List[str]]]] = None,
+    title: str = "座席表",
+    exam_notice: Optional[str] = None,
+    fixed_seat_numbers: Iterable[int] = (),
+    empty_seat_texts: Optional[Dict[int, Tuple[str, str]]] = None,
+    mode: str = "RGB",
+    font_path: str | None = None,
+) -> None:
+    """Draw seat chart images without producing a PDF.
+
+    Example: ``outputs={"chart.png": 300, "chart_thumb.png": 36}`` writes a
+    print quality image and a thumbnail from one rendering.
+    """
+    geometry = build_chart_geometry(
+        students,
+        seat_rows,
+        reserved_students,
+        reserved_seat_numbers,
+        committees=committees,
+        title=title,
+        exam_notice=exam_notice,
+        fixed_seat_numbers=fixed_seat_numbers,
+        empty_seat_texts=empty_seat_texts,
+    )
+    save_chart_images(geometry, outputs, mode, font_path)
@@ -0,0 +1,211 @@
+"""Rasterize PDF pages to PNG images with PyMuPDF.
+
+Pages of one or more PDFs are fanned out to a process pool.  Every worker
+opens the documents itself (PyMuPDF documents cannot be shared between
+processes) and keeps a few of them open for the following pages.  Results
+are yielded as soon as they are ready, either written to disk or returned as
+PNG bytes, and the number of pages in flight is limited by a memory cap.
+"""
+
+from __future__ import annotations
+
+import os
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+DEFAULT_ZOOM = 4.0
+DEFAULT_MEMORY_MB = 512
+_OPEN_DOCS_PER_WORKER = 4
+
+_open_docs: "OrderedDict[Tuple[str, int, int], object]" = OrderedDict()
+
+
+@dataclass(frozen=True)
+class PageImage:
+    """Result of rasterizing one page.
+
+    ``path`` is set when the image was written to disk, ``data`` holds the
+    PNG bytes otherwise.
+    """
+
+    pdf_path: str
+    page: int
+    width: int
+    height: int
+    path: Optional[str] = None
+    data: Optional[bytes] = None
+
+
+def _document(pdf_path: str):
+    import fitz  # PyMuPDF
+
+    # The modification time is part of the key so that a file rewritten at
+    # the same path (e.g. by create_seat_chart) is opened again.
+    stat = os.stat(pdf_path)
+    key = (pdf_path, stat.st_mtime_ns, stat.st_size)
+    doc = _open_docs.pop(key, None)
+    if doc is None:
+        doc = fitz.open(pdf_path)
+        while len(_open_docs) >= _OPEN_DOCS_PER_WORKER:
+            _, old = _open_docs.popitem(last=False)
+            old.close()
+    _open_docs[key] = doc
+    return doc
+
+
+def _render(doc, pdf_path: str, page: int, zoom: float, output_path: str | None) -> PageImage:
+    import fitz  # PyMuPDF
+
+    pix = doc.load_page(page).get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    if output_path is not None:
+        pix.save(output_path)
+        return PageImage(pdf_path, page, pix.width, pix.height, path=str(output_path))
+    return PageImage(pdf_path, page, pix.width, pix.height, data=pix.tobytes("png"))
+
+
+def rasterize_page(
+    pdf_path: str,
+    page: int = 0,
+    zoom: float = DEFAULT_ZOOM,
+    output_path: str | None = None,
+    keep_open: bool = False,
+) -> PageImage:
+    """Rasterize a single page.
+
+    ``keep_open`` keeps the document open for later pages; it is used by the
+    pool workers.  Direct callers leave it off so the PDF can be removed
+    right afterwards (Windows refuses to delete open files).
+    """
+    import fitz  # PyMuPDF
+
+    pdf_path = str(pdf_path)
+    if keep_open:
+        return _render(_document(pdf_path), pdf_path, page, zoom, output_path)
+    with fitz.open(pdf_path) as doc:
+        return _render(doc, pdf_path, page, zoom, output_path)
+
+
+def rasterize_bytes(data: bytes, page: int = 0, zoom: float = DEFAULT_ZOOM) -> PageImage:
+    """Rasterize a page of a PDF held in memory; the PNG is in ``data``."""
+    import fitz  # PyMuPDF
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return _render(doc, "", page, zoom, None)
+
+
+def _page_jobs(pdf_paths: Iterable[str], zoom: float) -> List[Tuple[str, int, int]]:
+    """Return ``(pdf_path, page, estimated_bytes)`` for every page."""
+    import fitz  # PyMuPDF
+
+    jobs: List[Tuple[str, int, int]] = []
+    for pdf_path in pdf_paths:
+        with fitz.open(pdf_path) as doc:
+            for number, page in enumerate(doc):
+                rect = page.rect
+                # RGB pixmap plus a generous allowance for the PNG encoder
+                estimate = int(rect.width * zoom * rect.height * zoom * 3 * 2)
+                jobs.append((str(pdf_path), number, estimate))
+    return jobs
+
+
+def _output_stems(pdf_paths: Iterable[str]) -> Dict[str, str]:
+    """Name the images of each PDF after its stem.
+
+    PDFs with the same stem in different directories (``a/chart.pdf`` and
+    ``b/chart.pdf``) get their parent directory prepended, and an index
+    when that is still ambiguous, so no image overwrites another.  Names
+    are compared case-insensitively as on Windows and macOS.
+    """
+    paths = list(pdf_paths)
+    counts: Dict[str, int] = {}
+    for path in paths:
+        stem = Path(path).stem.lower()
+        counts[stem] = counts.get(stem, 0) + 1
+    stems: Dict[str, str] = {}
+    used: Set[str] = set()
+    for path in paths:
+        pdf = Path(path)
+        stem = pdf.stem
+        if counts[stem.lower()] > 1:
+            parent = pdf.resolve().parent.name
+            stem = f"{parent}_{stem}" if parent else stem
+        candidate, number = stem, 1
+        while candidate.lower() in used:
+            number += 1
+            candidate = f"{stem}_{number}"
+        used.add(candidate.lower())
+        stems[path] = candidate
+    return stems
+
+
+def _output_name(output_dir: Optional[Path], stem: str, page: int, pages: int) -> Optional[str]:
+    if output_dir is None:
+        return None
+    name = f"{stem}.png" if pages == 1 else f"{stem}_{page + 1:03d}.png"
+    return str(output_dir / name)
+
+
+def rasterize_pdfs(
+    pdf_paths: Iterable[str],
+    output_dir: str | Path | None = None,
+    zoom: float = DEFAULT_ZOOM,
+    workers: int | None = None,
+    max_memory_mb: float = DEFAULT_MEMORY_MB,
+) -> Iterator[PageImage]:
+    """Rasterize every page of ``pdf_paths`` in parallel.
+
+    Images are written to ``output_dir`` as ``<stem>.png`` (single page
+    documents) or ``<stem>_001.png`` ...; PDFs sharing a stem are told
+    apart by their directory name (see :func:`_output_stems`).  Without
+    ``output_dir`` the PNG bytes are returned in :attr:`PageImage.data`.
+    Results are yielded in completion order.  Pages are only submitted while the estimated memory
+    of the pages in flight stays below ``max_memory_mb``.
+    """
+    # A PDF listed twice is rendered once.
+    jobs = _page_jobs(dict.fromkeys(str(path) for path in pdf_paths), zoom)
+    if not jobs:
+        return
+    out_dir = Path(output_dir) if output_dir is not None else None
+    if out_dir is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    page_counts: Dict[str, int] = {}
+    for pdf_path, page, _ in jobs:
+        page_counts[pdf_path] = max(page_counts.get(pdf_path, 0), page + 1)
+    stems = _output_stems(page_counts)
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) == 1:
+        import fitz  # PyMuPDF
+
+        for pdf_path, pages in page_counts.items():
+            with fitz.open(pdf_path) as doc:
+                for page in range(pages):
+                    target = _output_name(out_dir, stems[pdf_path], page, pages)
+                    yield _render(doc, pdf_path, page, zoom, target)
+        return
+
+    budget = max_memory_mb * 1024 * 1024
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        pending: Set[Future] = set()
+        sizes: Dict[Future, int] = {}
+        in_flight = 0
+        index = 0
+        while index < len(jobs) or pending:
+            while index < len(jobs) and len(pending) < workers * 2:
+                pdf_path, page, estimate = jobs[index]
+                # Always allow one page so an oversized page still runs.
+                if pending and in_flight + estimate > budget:
+                    break
+                target = _output_name(out_dir, stems[pdf_path], page, page_counts[pdf_path])
+                future = pool.submit(rasterize_page, pdf_path, page, zoom, target, True)
+                pending.add(future)
+                sizes[future] = estimate
+                in_flight += estimate
+                index += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight -= sizes.pop(future)
+                yield future.result()
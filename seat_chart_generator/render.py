@@ -0,0 +1,150 @@
+"""In-memory rendering of seat charts.
+
+:func:`create_seat_chart` writes files.  Services that send charts over the
+network use :class:`ChartRenderer` instead: it returns the PDF and PNG as
+``memoryview`` objects or writes them into file objects supplied by the
+caller, and raises :class:`~.errors.RenderError` /
+:class:`~.errors.RasterError` instead of printing.  A renderer keeps the
+font registration and backend imports warm, so a worker creates one and
+reuses it for every request (:func:`thread_renderer` does that per thread).
+"""
+
+from __future__ import annotations
+
+import io
+import threading
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Optional
+
+from .errors import RasterError, RenderError
+from .geometry import ChartGeometry, build_chart_geometry, ensure_font
+from .pdf import write_pdf
+from .state import ClassroomState
+
+IMAGE_BACKENDS = ("pymupdf", "pillow")
+
+
+@dataclass
+class RenderedChart:
+    """Result of :meth:`ChartRenderer.render`; ``png`` is ``None`` unless
+    requested."""
+
+    pdf: memoryview
+    png: Optional[memoryview] = None
+    geometry: Optional[ChartGeometry] = None
+
+
+class ChartRenderer:
+    """Render charts to memory with one warm set of fonts and backends."""
+
+    def __init__(
+        self,
+        image_backend: str = "pymupdf",
+        image_dpi: float = 288,
+        font_path: str | None = None,
+    ) -> None:
+        if image_backend not in IMAGE_BACKENDS:
+            raise ValueError(f"unknown image backend: {image_backend}")
+        self.image_backend = image_backend
+        self.image_dpi = image_dpi
+        self.font_path = font_path
+        self.renders = 0
+        ensure_font()
+
+    def geometry(self, state: ClassroomState | None = None, **chart_args: Any) -> ChartGeometry:
+        """Compute the chart geometry from :func:`create_seat_chart` style
+        arguments."""
+        if state is not None:
+            chart_args.update(
+                students=state.students(),
+                seat_rows=state.seat_rows,
+                fixed_seat_numbers=state.fixed,
+                empty_seat_texts=state.empty,
+            )
+        chart_args.setdefault("students", [])
+        try:
+            return build_chart_geometry(**chart_args)
+        except Exception as exc:
+            raise RenderError(f"座席表を配置できません: {exc}", "layout") from exc
+
+    def write_pdf(self, geometry: ChartGeometry, out: BinaryIO, title: str = "座席表") -> None:
+        try:
+            write_pdf(geometry, out, title)
+        except Exception as exc:
+            raise RenderError(f"PDFを作成できません: {exc}", "pdf") from exc
+
+    def write_png(
+        self,
+        geometry: ChartGeometry,
+        out: BinaryIO,
+        pdf: bytes | memoryview | None = None,
+        dpi: float | None = None,
+    ) -> None:
+        """Write the PNG image; the PyMuPDF backend needs the PDF bytes."""
+        dpi = dpi or self.image_dpi
+        try:
+            if self.image_backend == "pillow":
+                from .raster import render_geometry
+
+                render_geometry(geometry, dpi, self.font_path).save(out, "PNG")
+            else:
+                from .rasterize import rasterize_bytes
+
+                if pdf is None:
+                    buffer = io.BytesIO()
+                    self.write_pdf(geometry, buffer)
+                    pdf = buffer.getbuffer()
+                out.write(rasterize_bytes(bytes(pdf), 0, dpi / 72.0).data)
+        except RenderError:
+            raise
+        except Exception as exc:
+            raise RasterError(f"画像を作成できません: {exc}", self.image_backend) from exc
+
+    def render_into(
+        self,
+        pdf_out: BinaryIO | None,
+        png_out: BinaryIO | None = None,
+        title: str = "座席表",
+        **chart_args: Any,
+    ) -> ChartGeometry:
+        """Render into caller supplied binary file objects.
+
+        Either output may be ``None``.  Returns the geometry used.
+        """
+        geometry = self.geometry(title=title, **chart_args)
+        pdf_data = None
+        if pdf_out is not None or (png_out is not None and self.image_backend == "pymupdf"):
+            buffer = io.BytesIO()
+            self.write_pdf(geometry, buffer, title)
+            pdf_data = buffer.getbuffer()
+            if pdf_out is not None:
+                pdf_out.write(pdf_data)
+        if png_out is not None:
+            self.write_png(geometry, png_out, pdf_data)
+        self.renders += 1
+        return geometry
+
+    def render(self, png: bool = False, title: str = "座席表", **chart_args: Any) -> RenderedChart:
+        """Render a chart and return its PDF (and optionally PNG) bytes."""
+        pdf_out = io.BytesIO()
+        png_out = io.BytesIO() if png else None
+        geometry = self.render_into(pdf_out, png_out, title=title, **chart_args)
+        return RenderedChart(
+            pdf_out.getbuffer(),
+            png_out.getbuffer() if png_out is not None else None,
+            geometry,
+        )
+
+
+_local = threading.local()
+
+
+def thread_renderer(**options: Any) -> ChartRenderer:
+    """Return the renderer of the calling thread, creating it on first use.
+
+    ``options`` are only used when the renderer is created.
+    """
+    renderer = getattr(_local, "renderer", None)
+    if renderer is None:
+        renderer = _local.renderer = ChartRenderer(**options)
+    return renderer
@@ -0,0 +1,398 @@
+"""Room layouts with seat metadata and a memory-mapped cache.
+
+A version 1 layout file (``seat_layout.json``) is a bare 2D list of seat
+numbers and ``None``.  A version 2 file is an object that describes every
+seat on its own, so a seat keeps its ID when the room is edited::
+
+    {"version": 2, "name": "体育館", "rows": 20, "cols": 24,
+     "pitch": [0.6, 0.9],
+     "seats": [{"id": 1, "row": 0, "col": 0, "zone": "front",
+                "attributes": ["accessible"], "x": 0.0, "y": 0.0}, ...]}
+
+``zone`` is a free-form name such as ``front``, ``window`` or ``door``;
+``attributes`` are flags such as ``accessible`` or ``broken``.  ``x``/``y``
+are the physical position of the seat in metres and default to the grid
+position times ``pitch`` (across, front to back).
+
+Parsing a large JSON file on every run is slow, so for halls with at least
+:data:`CACHE_MIN_SEATS` seats a binary copy is written next to it
+(``<file>.seatcache``).  The cache is memory-mapped by
+:class:`RoomCache`; :func:`cached_seat_rows` reads only its seat grid.  It
+records the size and modification time of the JSON file and is ignored
+once they no longer match.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+FORMAT_VERSION = 2
+DEFAULT_PITCH: Tuple[float, float] = (0.6, 0.9)
+BROKEN = "broken"
+ACCESSIBLE = "accessible"
+CACHE_SUFFIX = ".seatcache"
+CACHE_MIN_SEATS = 400
+
+# magic, cache version, source mtime (ns), source size, rows, cols, seats,
+# string table length, pitch
+_HEADER = struct.Struct("<4sHxxqqIIIIdd")
+# id, row, col, zone index (-1: none), attribute bit mask, x, y
+_RECORD = struct.Struct("<iIIiIdd")
+_MAGIC = b"SEAT"
+_CACHE_VERSION = 1
+_NO_SEAT = -1
+
+
+@dataclass
+class SeatInfo:
+    """One seat of a :class:`RoomLayout`."""
+
+    id: int
+    row: int
+    col: int
+    zone: Optional[str] = None
+    attributes: Tuple[str, ...] = ()
+    x: float = 0.0
+    y: float = 0.0
+
+    @property
+    def broken(self) -> bool:
+        return BROKEN in self.attributes
+
+    @property
+    def accessible(self) -> bool:
+        return ACCESSIBLE in self.attributes
+
+
+@dataclass
+class RoomLayout:
+    """A room grid whose seats carry IDs, zones, attributes and positions."""
+
+    rows: int
+    cols: int
+    seats: Dict[int, SeatInfo] = field(default_factory=dict)
+    name: str = ""
+    pitch: Tuple[float, float] = DEFAULT_PITCH
+
+    def __post_init__(self) -> None:
+        taken: Dict[Tuple[int, int], int] = {}
+        for seat_id, seat in self.seats.items():
+            if seat.id != seat_id or seat_id < 0:
+                raise ValueError(f"invalid seat id: {seat_id}")
+            if not (0 <= seat.row < self.rows and 0 <= seat.col < self.cols):
+                raise ValueError(f"seat {seat_id} is outside the room")
+            position = (seat.row, seat.col)
+            if position in taken:
+                raise ValueError(f"seats {taken[position]} and {seat_id} share a position")
+            taken[position] = seat_id
+
+    @classmethod
+    def from_rows(
+        cls,
+        seat_rows: Sequence[Sequence[Optional[int]]],
+        name: str = "",
+        pitch: Tuple[float, float] = DEFAULT_PITCH,
+    ) -> "RoomLayout":
+        """Build a room from a version 1 grid; seat numbers become IDs."""
+        seats: Dict[int, SeatInfo] = {}
+        for r, row in enumerate(seat_rows):
+            for c, cell in enumerate(row):
+                if isinstance(cell, int) and not isinstance(cell, bool):
+                    if cell in seats:
+                        raise ValueError(f"duplicate seat id: {cell}")
+                    seats[cell] = SeatInfo(cell, r, c, x=c * pitch[0], y=r * pitch[1])
+        cols = max((len(row) for row in seat_rows), default=0)
+        return cls(len(seat_rows), cols, seats, name, pitch)
+
+    @classmethod
+    def from_json(cls, data: Any) -> "RoomLayout":
+        """Read a version 1 list or a version 2 object."""
+        if isinstance(data, list):
+            return cls.from_rows(data)
+        if not isinstance(data, dict) or data.get("version") != FORMAT_VERSION:
+            raise ValueError("unsupported layout format")
+        pitch = tuple(data.get("pitch", DEFAULT_PITCH))
+        seats: Dict[int, SeatInfo] = {}
+        for entry in data.get("seats", []):
+            seat_id, row, col = int(entry["id"]), int(entry["row"]), int(entry["col"])
+            if seat_id in seats:
+                raise ValueError(f"duplicate seat id: {seat_id}")
+            seats[seat_id] = SeatInfo(
+                seat_id,
+                row,
+                col,
+                entry.get("zone") or None,
+                tuple(sorted(set(entry.get("attributes", ())))),
+                float(entry.get("x", col * pitch[0])),
+                float(entry.get("y", row * pitch[1])),
+            )
+        return cls(int(data["rows"]), int(data["cols"]), seats, data.get("name", ""), pitch)
+
+    def to_json(self) -> Dict[str, Any]:
+        seats = []
+        for seat in sorted(self.seats.values(), key=lambda s: (s.row, s.col)):
+            entry: Dict[str, Any] = {"id": seat.id, "row": seat.row, "col": seat.col}
+            if seat.zone:
+                entry["zone"] = seat.zone
+            if seat.attributes:
+                entry["attributes"] = list(seat.attributes)
+            entry["x"] = round(seat.x, 3)
+            entry["y"] = round(seat.y, 3)
+            seats.append(entry)
+        return {
+            "version": FORMAT_VERSION,
+            "name": self.name,
+            "rows": self.rows,
+            "cols": self.cols,
+            "pitch": list(self.pitch),
+            "seats": seats,
+        }
+
+    @property
+    def seat_rows(self) -> List[List[Optional[int]]]:
+        """The version 1 grid of seat IDs."""
+        grid: List[List[Optional[int]]] = [[None] * self.cols for _ in range(self.rows)]
+        for seat in self.seats.values():
+            grid[seat.row][seat.col] = seat.id
+        return grid
+
+    def usable_rows(self) -> List[List[Optional[int]]]:
+        """The grid without broken seats, as used for seating students."""
+        grid = self.seat_rows
+        for seat in self.seats.values():
+            if seat.broken:
+                grid[seat.row][seat.col] = None
+        return grid
+
+    def zone(self, name: str) -> List[int]:
+        return [seat.id for seat in self.seats.values() if seat.zone == name]
+
+    def with_attribute(self, attribute: str) -> List[int]:
+        return [seat.id for seat in self.seats.values() if attribute in seat.attributes]
+
+    def distance(self, first: int, second: int) -> float:
+        """Physical distance between two seats in metres."""
+        a, b = self.seats[first], self.seats[second]
+        return ((a.x - b.x) ** 2 + (a.y - b.y) ** 2) ** 0.5
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def cache_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + CACHE_SUFFIX)
+
+
+def encode_cache(room: RoomLayout, source: os.stat_result) -> bytes:
+    """Serialize ``room`` into the binary cache format."""
+    zones = sorted({seat.zone for seat in room.seats.values() if seat.zone})
+    attributes = sorted({a for seat in room.seats.values() for a in seat.attributes})
+    if len(attributes) > 32:
+        raise ValueError("too many seat attributes for the cache")
+    zone_index = {name: i for i, name in enumerate(zones)}
+    bits = {name: 1 << i for i, name in enumerate(attributes)}
+    strings = json.dumps([room.name, zones, attributes], ensure_ascii=False).encode("utf-8")
+    seats = sorted(room.seats.values(), key=lambda s: (s.row, s.col))
+    out = bytearray(
+        _HEADER.pack(
+            _MAGIC,
+            _CACHE_VERSION,
+            source.st_mtime_ns,
+            source.st_size,
+            room.rows,
+            room.cols,
+            len(seats),
+            len(strings),
+            *room.pitch,
+        )
+    )
+    for seat in seats:
+        mask = 0
+        for name in seat.attributes:
+            mask |= bits[name]
+        out += _RECORD.pack(
+            seat.id, seat.row, seat.col, zone_index.get(seat.zone, -1), mask, seat.x, seat.y
+        )
+    grid = [_NO_SEAT] * (room.rows * room.cols)
+    for seat in seats:
+        grid[seat.row * room.cols + seat.col] = seat.id
+    out += struct.pack(f"<{len(grid)}i", *grid)
+    out += strings
+    return bytes(out)
+
+
+class RoomCache:
+    """Read-only, memory-mapped view of a ``.seatcache`` file.
+
+    Nothing is decoded up front: :meth:`seat_rows` reads the grid and
+    :meth:`seat` a single record.  Use as a context manager or call
+    :meth:`close`.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        with open(path, "rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header = _HEADER.unpack_from(self._map, 0)
+        except struct.error:
+            self._map.close()
+            raise ValueError("truncated seat cache") from None
+        magic, version, self.mtime_ns, self.size, self.rows, self.cols, self.count, names, *pitch = header
+        self.pitch = (pitch[0], pitch[1])
+        self._records = _HEADER.size
+        self._grid = self._records + self.count * _RECORD.size
+        self._strings = self._grid + 4 * self.rows * self.cols
+        if magic != _MAGIC or version != _CACHE_VERSION or len(self._map) != self._strings + names:
+            self._map.close()
+            raise ValueError("not a seat cache")
+        self._names: Optional[List[Any]] = None
+
+    def __enter__(self) -> "RoomCache":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+
+    def fresh_for(self, source: os.stat_result) -> bool:
+        return self.mtime_ns == source.st_mtime_ns and self.size == source.st_size
+
+    def _strings_table(self) -> List[Any]:
+        if self._names is None:
+            self._names = json.loads(self._map[self._strings :].decode("utf-8"))
+        return self._names
+
+    def seat_rows(self) -> List[List[Optional[int]]]:
+        ids = struct.unpack_from(f"<{self.rows * self.cols}i", self._map, self._grid)
+        cols = self.cols
+        return [
+            [None if v == _NO_SEAT else v for v in ids[r * cols : (r + 1) * cols]]
+            for r in range(self.rows)
+        ]
+
+    def seat(self, index: int) -> SeatInfo:
+        """Decode the ``index``-th seat in reading order."""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        seat_id, row, col, zone, mask, x, y = _RECORD.unpack_from(
+            self._map, self._records + index * _RECORD.size
+        )
+        _, zones, attributes = self._strings_table()
+        return SeatInfo(
+            seat_id,
+            row,
+            col,
+            zones[zone] if zone >= 0 else None,
+            tuple(name for i, name in enumerate(attributes) if mask & (1 << i)),
+            x,
+            y,
+        )
+
+    def usable_rows(self) -> List[List[Optional[int]]]:
+        rows = self.seat_rows()
+        _, _, attributes = self._strings_table()
+        if BROKEN in attributes:
+            bit = 1 << attributes.index(BROKEN)
+            for index in range(self.count):
+                _, row, col, _, mask, _, _ = _RECORD.unpack_from(
+                    self._map, self._records + index * _RECORD.size
+                )
+                if mask & bit:
+                    rows[row][col] = None
+        return rows
+
+    def to_room(self) -> RoomLayout:
+        seats = (self.seat(i) for i in range(self.count))
+        name = self._strings_table()[0]
+        return RoomLayout(self.rows, self.cols, {s.id: s for s in seats}, name, self.pitch)
+
+
+def _open_fresh_cache(path: Path) -> Optional[RoomCache]:
+    try:
+        source = path.stat()
+        cache = RoomCache(cache_path(path))
+    except (OSError, ValueError):
+        return None
+    if not cache.fresh_for(source):
+        cache.close()
+        return None
+    return cache
+
+
+def update_cache(room: RoomLayout, path: str | Path) -> None:
+    """Write the cache of the layout file ``path`` if the room is large
+    enough to benefit; failures are ignored, the JSON file stays the
+    source of truth."""
+    if len(room.seats) < CACHE_MIN_SEATS:
+        return
+    path = Path(path)
+    try:
+        _atomic_write(cache_path(path), encode_cache(room, path.stat()))
+    except (OSError, ValueError):
+        pass
+
+
+def cached_seat_rows(path: str | Path, usable: bool = True) -> Optional[List[List[Optional[int]]]]:
+    """Return the seat grid from a fresh cache, or ``None`` without one."""
+    cache = _open_fresh_cache(Path(path))
+    if cache is None:
+        return None
+    with cache:
+        return cache.usable_rows() if usable else cache.seat_rows()
+
+
+def load_room(path: str | Path, cache: bool = True) -> RoomLayout:
+    """Load a version 1 or version 2 layout file as a :class:`RoomLayout`."""
+    path = Path(path)
+    if cache:
+        mapped = _open_fresh_cache(path)
+        if mapped is not None:
+            with mapped:
+                return mapped.to_room()
+    with path.open("r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    if isinstance(data, list):
+        data = [[cell if isinstance(cell, int) else None for cell in row] for row in data]
+    room = RoomLayout.from_json(data)
+    if cache and isinstance(data, dict):
+        update_cache(room, path)
+    return room
+
+
+def save_room(room: RoomLayout, path: str | Path) -> None:
+    """Write ``room`` as a version 2 layout file (and refresh its cache)."""
+    path = Path(path)
+    text = json.dumps(room.to_json(), ensure_ascii=False, indent=1)
+    _atomic_write(path, text.encode("utf-8"))
+    stale = cache_path(path)
+    if len(room.seats) >= CACHE_MIN_SEATS:
+        update_cache(room, path)
+    elif stale.exists():
+        try:
+            stale.unlink()
+        except OSError:
+            pass
+
@@ -0,0 +1,61 @@
+"""Reading roster exports.
+
+Rosters exported from the school system are CSV files with one row per
+student.  Columns use the keys of ``students.STUDENTS`` (``serial``,
+``student_id``, ``name_kanji``, ``name_kana``, ``status``, ``gender``) or
+their Japanese headers.  A JSON file holding a list of such records is
+accepted as well.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+HEADER_ALIASES = {
+    "整理番号": "serial",
+    "番号": "serial",
+    "学籍番号": "student_id",
+    "氏名": "name_kanji",
+    "名前": "name_kanji",
+    "ふりがな": "name_kana",
+    "フリガナ": "name_kana",
+    "在籍状況": "status",
+    "状態": "status",
+    "性別": "gender",
+}
+GENDER_ALIASES = {"男": "M", "女": "F"}
+
+
+def _normalise(row: Dict[str, Any]) -> Dict[str, Any]:
+    record = {HEADER_ALIASES.get(key.strip(), key.strip()): value for key, value in row.items() if key}
+    record["serial"] = int(record["serial"])
+    record["student_id"] = str(record.get("student_id", "")).strip()
+    record["name_kanji"] = str(record["name_kanji"]).strip()
+    record["name_kana"] = str(record.get("name_kana", "")).strip()
+    record["status"] = str(record.get("status") or "在籍").strip()
+    gender = str(record.get("gender") or "M").strip()
+    record["gender"] = GENDER_ALIASES.get(gender, gender.upper())
+    return record
+
+
+def iter_roster(path: str | Path) -> Iterator[Dict[str, Any]]:
+    """Yield roster records one by one without reading the whole file."""
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with path.open("r", encoding="utf-8") as fh:
+            records = json.load(fh)
+        for record in records:
+            yield _normalise(record)
+        return
+    with path.open("r", encoding="utf-8-sig", newline="") as fh:
+        for row in csv.DictReader(fh):
+            if any(value and value.strip() for value in row.values() if isinstance(value, str)):
+                yield _normalise(row)
+
+
+def load_roster(path: str | Path) -> List[Dict[str, Any]]:
+    """Return all records of a roster export."""
+    return list(iter_roster(path))
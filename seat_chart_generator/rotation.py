@@ -0,0 +1,279 @@
+"""Seating for several exam sessions in the same room.
+
+:func:`plan_rotation` seats the same students for ``sessions`` sessions so
+that nobody sits next to, in front of or behind the same person twice.
+The layout is turned into an adjacency index once and every student keeps
+the set of students they have already sat beside, so a conflict is a
+lookup.  Each session is built seat by seat, preferring students who have
+not met the neighbours already placed, and the remaining conflicts are
+repaired by swaps whose effect is computed from the neighbours of the two
+seats only.  The pairs of a finished session are added to the index before
+the next one starts.
+
+When the rule cannot be met (for instance with more sessions than the room
+allows) the repeats are reported as :class:`~.validate.Conflict` warnings
+instead of failing.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .models import Student
+from .shuffle import split_request
+from .validate import WARNING, Conflict
+
+if TYPE_CHECKING:
+    from .state import ClassroomState
+
+# Neighbour offsets counted once each: right and behind, plus the two
+# diagonals behind with ``diagonal=True``.
+ADJACENT = ((0, 1), (1, 0))
+DIAGONAL = ((1, 1), (1, -1))
+# Students looked at per seat before settling for the least bad one.
+CANDIDATES = 24
+# Repair swaps tried per free seat and session.
+SWAPS_PER_SEAT = 200
+
+
+def adjacency(
+    seat_rows: Sequence[Sequence[Optional[int]]],
+    diagonal: bool = False,
+) -> Dict[int, List[int]]:
+    """Return ``{seat: [neighbouring seats]}`` of a layout.
+
+    Seats are neighbours when their cells touch left/right or front/back;
+    a missing cell (an aisle) separates them.
+    """
+    grid = {
+        (r, c): seat
+        for r, row in enumerate(seat_rows)
+        for c, seat in enumerate(row)
+        if isinstance(seat, int)
+    }
+    neighbours: Dict[int, List[int]] = {seat: [] for seat in grid.values()}
+    for (r, c), seat in grid.items():
+        for dr, dc in ADJACENT + (DIAGONAL if diagonal else ()):
+            other = grid.get((r + dr, c + dc))
+            if other is not None:
+                neighbours[seat].append(other)
+                neighbours[other].append(seat)
+    return neighbours
+
+
+@dataclass
+class RotationPlan:
+    """The seating of every session and the repeats that remain."""
+
+    seat_rows: List[List[Optional[int]]]
+    sessions: List[List[Student]] = field(default_factory=list)
+    conflicts: List[List[Conflict]] = field(default_factory=list)
+
+    @property
+    def repeats(self) -> int:
+        return sum(len(conflicts) for conflicts in self.conflicts)
+
+    def write_charts(
+        self,
+        output_dir: str | Path = ".",
+        stem: str = "seat_chart",
+        title: str = "座席表",
+        images: bool = False,
+        **chart_args: Any,
+    ) -> List[str]:
+        """Write one chart per session (``<stem>_session1.pdf`` ...) with
+        :func:`~.pdf.create_seat_chart` and return the PDF paths."""
+        from .pdf import create_seat_chart
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for number, students in enumerate(self.sessions, start=1):
+            path = output_dir / f"{stem}_session{number}.pdf"
+            create_seat_chart(
+                students,
+                seat_rows=self.seat_rows,
+                title=f"{title} 第{number}回",
+                output_path=str(path),
+                image_path=str(path.with_suffix(".png")) if images else None,
+                **chart_args,
+            )
+            paths.append(str(path))
+        return paths
+
+
+class _Session:
+    """Occupancy of one session with conflict costs against ``met``."""
+
+    def __init__(
+        self,
+        neighbours: Dict[int, List[int]],
+        met: List[Dict[int, int]],
+        occupant: Dict[int, int],
+    ) -> None:
+        self.neighbours = neighbours
+        self.met = met
+        self.occupant = occupant
+
+    def cost(self, person: int, seat: int, skip: Optional[int] = None) -> int:
+        met = self.met[person]
+        total = 0
+        for other in self.neighbours[seat]:
+            if other != skip:
+                holder = self.occupant.get(other)
+                if holder is not None and holder in met:
+                    total += 1
+        return total
+
+    def fill(self, seats: Sequence[int], pool: List[int]) -> None:
+        """Greedy placement, front to back."""
+        for seat in seats:
+            if not pool:
+                break
+            best, best_cost = len(pool) - 1, None
+            for index in range(len(pool) - 1, max(-1, len(pool) - 1 - CANDIDATES), -1):
+                cost = self.cost(pool[index], seat)
+                if best_cost is None or cost < best_cost:
+                    best, best_cost = index, cost
+                    if cost == 0:
+                        break
+            pool[best], pool[-1] = pool[-1], pool[best]
+            self.occupant[seat] = pool.pop()
+
+    def repair(self, seats: Sequence[int], budget: int, rng: random.Random) -> None:
+        """Swap conflicted students with others while that does not add
+        conflicts."""
+        queue = [seat for seat in seats if seat in self.occupant]
+        queued = set(queue)
+        while queue and budget > 0:
+            index = rng.randrange(len(queue))
+            a = queue[index]
+            x = self.occupant.get(a)
+            if x is None or self.cost(x, a) == 0:
+                queue[index] = queue[-1]
+                queue.pop()
+                queued.discard(a)
+                continue
+            budget -= 1
+            b = seats[rng.randrange(len(seats))]
+            if b == a:
+                continue
+            y = self.occupant.get(b)
+            before = self.cost(x, a, b) + (self.cost(y, b, a) if y is not None else 0)
+            after = self.cost(x, b, a) + (self.cost(y, a, b) if y is not None else 0)
+            if after > before:
+                continue
+            self.occupant[b] = x
+            if y is None:
+                del self.occupant[a]
+            else:
+                self.occupant[a] = y
+            # Neighbours of both seats may have gained a conflict.
+            for seat in (a, b, *self.neighbours[a], *self.neighbours[b]):
+                if seat not in queued and seat in self.occupant:
+                    queue.append(seat)
+                    queued.add(seat)
+
+
+def plan_rotation(
+    students_data: List[Dict[str, str]],
+    seat_rows: List[List[Optional[int]]] | None = None,
+    sessions: int = 2,
+    fixed: Dict[str, int] | None = None,
+    empty_seats: Iterable[int] | None = None,
+    seed: int | None = None,
+    diagonal: bool = False,
+    state: "ClassroomState | None" = None,
+    validate: bool = False,
+) -> RotationPlan:
+    """Seat the same students for ``sessions`` sessions without repeating
+    neighbours.
+
+    Pinned students keep their seat in every session (and still count as
+    neighbours, but two pinned neighbours are not reported as a repeat);
+    empty seats stay empty.  As in
+    :func:`~.shuffle.simple_shuffle`, ``validate`` checks the request
+    first.  With ``diagonal`` the seats diagonally in front and behind
+    count as neighbours too.
+    """
+    if sessions < 1:
+        raise ValueError("sessions must be at least 1")
+    rng = random.Random(seed)
+    pinned, records, free_seats = split_request(
+        students_data, seat_rows, fixed, empty_seats, state, validate
+    )
+    rows = [list(row) for row in (state.seat_rows if seat_rows is None else seat_rows)]
+    neighbours = adjacency(rows, diagonal)
+    positions = {
+        seat: (r, c) for r, row in enumerate(rows) for c, seat in enumerate(row) if isinstance(seat, int)
+    }
+    names = [s.name_kanji for s in pinned] + [str(d["name_kanji"]).strip() for d in records]
+    # met[person][other] is the first session in which they were neighbours.
+    met: List[Dict[int, int]] = [{} for _ in names]
+    first_free = len(pinned)
+    plan = RotationPlan(rows)
+
+    for number in range(1, sessions + 1):
+        session = _Session(
+            neighbours, met, {s.seat_number: i for i, s in enumerate(pinned)}
+        )
+        pool = list(range(first_free, len(names)))
+        rng.shuffle(pool)
+        session.fill(free_seats, pool)
+        session.repair(free_seats, SWAPS_PER_SEAT * len(free_seats), rng)
+
+        conflicts: List[Conflict] = []
+        for seat, person in session.occupant.items():
+            for other_seat in neighbours[seat]:
+                other = session.occupant.get(other_seat)
+                if other is None or (person < first_free and other < first_free):
+                    # Two pinned neighbours meet in every session anyway.
+                    continue
+                if seat < other_seat and other in met[person]:
+                    conflicts.append(
+                        Conflict(
+                            "repeat_neighbour",
+                            f"{names[other]}と第{met[person][other]}回にも隣でした",
+                            seat,
+                            names[person],
+                            positions[seat],
+                            WARNING,
+                        )
+                    )
+        for seat, person in session.occupant.items():
+            for other_seat in neighbours[seat]:
+                other = session.occupant.get(other_seat)
+                if other is not None:
+                    met[person].setdefault(other, number)
+
+        students = list(pinned)
+        for seat, person in session.occupant.items():
+            if person >= first_free:
+                students.append(Student.from_record(records[person - first_free], seat))
+        plan.sessions.append(students)
+        plan.conflicts.append(conflicts)
+    return plan
+
+
+def repeated_pairs(
+    sessions: Iterable[Iterable[Student]],
+    seat_rows: Sequence[Sequence[Optional[int]]],
+    diagonal: bool = False,
+) -> List[Tuple[str, str]]:
+    """Pairs of students (by name) who are neighbours in more than one of
+    ``sessions``; useful to check plans made elsewhere."""
+    neighbours = adjacency(seat_rows, diagonal)
+    seen: Dict[Tuple[str, str], int] = {}
+    for students in sessions:
+        by_seat = {s.seat_number: s.name_kanji for s in students}
+        pairs = set()
+        for seat, name in by_seat.items():
+            for other in neighbours.get(seat, ()):
+                if other in by_seat:
+                    pairs.add(tuple(sorted((name, by_seat[other]))))
+        for pair in pairs:
+            seen[pair] = seen.get(pair, 0) + 1
+    return sorted(pair for pair, count in seen.items() if count > 1)
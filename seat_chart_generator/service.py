@@ -0,0 +1,472 @@
+"""Small HTTP service for shuffling and rendering seat charts.
+
+Only the standard library is used.  Requests are handled by a
+:class:`~http.server.ThreadingHTTPServer`; the actual work runs on a
+:class:`~concurrent.futures.ProcessPoolExecutor` whose workers each keep a
+warm :class:`~.render.ChartRenderer`.  At most ``max_queue`` jobs may be
+running or waiting at once; further requests are answered with ``503`` and
+a ``Retry-After`` header instead of piling up.
+
+Endpoints
+---------
+``POST /render``
+    JSON job (see :func:`build_state`) plus ``"format": "pdf" | "png"``;
+    answers with the chart.  Deterministic jobs (no shuffle, or a shuffle
+    with ``seed``) are cached.
+``POST /shuffle``
+    Same job; answers with ``{"seats": {seat: name}}``.
+``GET /health``
+    Liveness and current queue depth.
+``GET /metrics``
+    Request counts, queue depth, latency percentiles and cache hit rate.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .errors import SeatChartError
+from .layout import DEFAULT_SEAT_ROWS
+
+MAX_BODY_BYTES = 4 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+CONTENT_TYPES = {"pdf": "application/pdf", "png": "image/png"}
+
+
+class JobError(SeatChartError):
+    """A job cannot be processed; ``status`` is the HTTP status to send."""
+
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+    def __reduce__(self):
+        return (type(self), (str(self), self.status))
+
+
+# -- worker side ------------------------------------------------------------
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(roster: Sequence[Mapping[str, Any]], committees: Any, image_dpi: float) -> None:
+    from .render import ChartRenderer
+
+    _worker["roster"] = list(roster)
+    _worker["committees"] = committees
+    _worker["renderer"] = ChartRenderer(image_dpi=image_dpi)
+
+
+def build_state(job: Mapping[str, Any], roster: Sequence[Mapping[str, Any]]):
+    """Create a :class:`~.state.ClassroomState` from a JSON job.
+
+    Recognised keys: ``layout`` (rows of seat numbers, default layout when
+    missing), ``roster`` (records replacing the server roster),
+    ``fixed`` (``{seat: name}`` pinned students), ``empty`` (``{seat: text}``
+    or ``{seat: [text, colour]}``), ``assignments`` (``{seat: name}``
+    unpinned students) and ``shuffle``/``seed``.
+    """
+    from .shuffle import simple_shuffle
+    from .state import ClassroomState
+
+    roster = job.get("roster") or roster
+    state = ClassroomState(job.get("layout") or DEFAULT_SEAT_ROWS, roster)
+    try:
+        for seat, value in (job.get("empty") or {}).items():
+            text, colour = (value, "black") if isinstance(value, str) else value
+            state.set_text(int(seat), text, colour)
+        for key, fixed in (("fixed", True), ("assignments", False)):
+            for seat, name in (job.get(key) or {}).items():
+                if not state.has_seat(int(seat)):
+                    raise JobError(f"unknown seat: {seat}")
+                if name not in state.roster:
+                    raise JobError(f"unknown student: {name}")
+                state.place_name(int(seat), name, fixed)
+        if job.get("shuffle"):
+            state.apply_shuffle(simple_shuffle(roster, state=state, seed=job.get("seed")))
+    except JobError:
+        raise
+    except ValueError as exc:
+        raise JobError(str(exc), 422) from exc
+    except (TypeError, KeyError, AttributeError) as exc:
+        raise JobError(f"invalid job: {exc}") from exc
+    return state
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_str_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def check_job(job: Mapping[str, Any]) -> None:
+    """Raise :class:`JobError` (400) for fields of the wrong JSON type.
+
+    Runs in the request handler, so malformed jobs never reach a worker.
+    """
+
+    def fail(key: str, expected: str) -> None:
+        raise JobError(f"invalid job: {key!r} must be {expected}")
+
+    layout = job.get("layout")
+    if layout is not None and not (
+        isinstance(layout, list)
+        and all(
+            isinstance(row, list) and all(cell is None or _is_int(cell) for cell in row)
+            for row in layout
+        )
+    ):
+        fail("layout", "a list of rows of seat numbers or null")
+    roster = job.get("roster")
+    if roster is not None and not (
+        isinstance(roster, list)
+        and all(isinstance(r, dict) and isinstance(r.get("name_kanji"), str) for r in roster)
+    ):
+        fail("roster", "a list of student records with name_kanji")
+    for key in ("fixed", "assignments"):
+        value = job.get(key)
+        if value is not None and not (
+            isinstance(value, dict) and all(isinstance(v, str) for v in value.values())
+        ):
+            fail(key, "an object of seat: name")
+    empty = job.get("empty")
+    if empty is not None and not (
+        isinstance(empty, dict)
+        and all(
+            isinstance(v, str) or (_is_str_list(v) and len(v) == 2) for v in empty.values()
+        )
+    ):
+        fail("empty", "an object of seat: text or [text, colour]")
+    for key in ("fixed", "assignments", "empty"):
+        for seat in job.get(key) or {}:
+            if not str(seat).strip().lstrip("-").isdigit():
+                fail(key, "keyed by seat numbers")
+    if "seed" in job and job["seed"] is not None and not _is_int(job["seed"]):
+        fail("seed", "an integer")
+    if "shuffle" in job and not isinstance(job["shuffle"], bool):
+        fail("shuffle", "true or false")
+    for key in ("format", "title"):
+        if key in job and not isinstance(job[key], str):
+            fail(key, "a string")
+    if job.get("exam_notice") is not None and not isinstance(job["exam_notice"], str):
+        fail("exam_notice", "a string or null")
+    committees = job.get("committees")
+    if committees is not None and not (
+        isinstance(committees, list)
+        and all(
+            isinstance(c, list) and len(c) == 2 and isinstance(c[0], str) and _is_str_list(c[1])
+            for c in committees
+        )
+    ):
+        fail("committees", "a list of [name, [members]]")
+
+
+def run_job(kind: str, job: Mapping[str, Any]) -> Tuple[bytes, str]:
+    """Execute a job inside a worker and return ``(body, content type)``."""
+    state = build_state(job, _worker["roster"])
+    if kind == "shuffle":
+        seats = {str(seat): s.name_kanji for seat, s in sorted(state.assignments.items())}
+        return json.dumps({"seats": seats}, ensure_ascii=False).encode("utf-8"), "application/json"
+    fmt = job.get("format", "pdf")
+    if fmt not in CONTENT_TYPES:
+        raise JobError(f"unknown format: {fmt}")
+    chart = _worker["renderer"].render(
+        png=fmt == "png",
+        state=state,
+        title=job.get("title", "座席表"),
+        exam_notice=job.get("exam_notice"),
+        committees=job.get("committees", _worker["committees"]),
+    )
+    data = chart.png if fmt == "png" else chart.pdf
+    return bytes(data), CONTENT_TYPES[fmt]
+
+
+# -- server side ------------------------------------------------------------
+
+
+def percentile(values: Sequence[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile, ``None`` for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class ResultCache:
+    """LRU cache of rendered results bounded by total size."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Tuple[bytes, str]) -> None:
+        if len(value[0]) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._items[key] = value
+            self.size += len(value[0])
+            while self.size > self.max_bytes:
+                _, dropped = self._items.popitem(last=False)
+                self.size -= len(dropped[0])
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+
+class ChartService:
+    """Process pool, admission control, cache and metrics of the server."""
+
+    def __init__(
+        self,
+        roster: Sequence[Mapping[str, Any]] = (),
+        committees: Any = None,
+        workers: Optional[int] = None,
+        max_queue: int = 64,
+        job_timeout: float = 60.0,
+        image_dpi: float = 288,
+        cache_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self._pool_args = dict(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(list(roster), committees, image_dpi),
+        )
+        self.pool = ProcessPoolExecutor(**self._pool_args)
+        self.pool_restarts = 0
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self.cache = ResultCache(cache_bytes)
+        self.started = time.time()
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+        self.counts: Dict[str, int] = {}
+        self.latencies: Deque[float] = deque(maxlen=2048)
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> None:
+        """Start a new pool after a worker died; concurrent jobs that saw
+        the same broken pool replace it only once."""
+        with self._lock:
+            if self.pool is not broken:
+                return
+            self.pool = ProcessPoolExecutor(**self._pool_args)
+            self.pool_restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def cache_key(kind: str, job: Mapping[str, Any]) -> Optional[str]:
+        if job.get("shuffle") and job.get("seed") is None:
+            return None
+        canonical = json.dumps([kind, job], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def submit(self, kind: str, job: Mapping[str, Any]) -> Tuple[bytes, str]:
+        """Run a job; raises :class:`JobError` (503 when saturated)."""
+        key = self.cache_key(kind, job)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise JobError("server busy", 503)
+        with self._lock:
+            self.in_flight += 1
+        pool = self.pool
+        try:
+            future = pool.submit(run_job, kind, job)
+        except BrokenProcessPool as exc:
+            self._release()
+            self._replace_pool(pool)
+            raise JobError("worker process failed", 500) from exc
+        except BaseException:
+            self._release()
+            raise
+        # The slot is given back when the job ends, not when the request
+        # does: a job that timed out keeps running in its worker.
+        future.add_done_callback(lambda _: self._release())
+        try:
+            result = future.result(self.job_timeout)
+        except FutureTimeout as exc:
+            future.cancel()
+            raise JobError("job timed out", 504) from exc
+        except BrokenProcessPool as exc:
+            self._replace_pool(pool)
+            raise JobError("worker process failed", 500) from exc
+        except JobError:
+            raise
+        except SeatChartError as exc:
+            raise JobError(str(exc), 422) from exc
+        if key is not None:
+            self.cache.put(key, result)
+        return result
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def record(self, path: str, status: int, seconds: float) -> None:
+        with self._lock:
+            name = f"{path} {status}"
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.latencies.append(seconds)
+
+    def health(self) -> Dict[str, Any]:
+        return {"status": "ok", "queue_depth": self.in_flight, "max_queue": self.max_queue}
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies: List[float] = list(self.latencies)
+            counts = dict(self.counts)
+            in_flight, rejected = self.in_flight, self.rejected
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "queue_depth": in_flight,
+            "max_queue": self.max_queue,
+            "rejected": rejected,
+            "pool_restarts": self.pool_restarts,
+            "requests": counts,
+            "latency_ms": {
+                name: (None if value is None else round(value * 1000, 1))
+                for name, value in (
+                    ("p50", percentile(latencies, 0.50)),
+                    ("p95", percentile(latencies, 0.95)),
+                    ("p99", percentile(latencies, 0.99)),
+                )
+            },
+            "cache": {
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+                "hit_rate": self.cache.hit_rate,
+                "bytes": self.cache.size,
+            },
+        }
+
+
+class ChartRequestHandler(BaseHTTPRequestHandler):
+    server_version = "SeatChart/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> ChartService:
+        return self.server.service  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        view = memoryview(body)
+        for offset in range(0, len(view), CHUNK_SIZE):
+            self.wfile.write(view[offset : offset + CHUNK_SIZE])
+
+    def _send_json(
+        self, status: int, data: Any, headers: Optional[Mapping[str, str]] = None
+    ) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    def do_GET(self) -> None:
+        start = time.perf_counter()
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            self._send_json(200, self.service.health())
+            status = 200
+        elif path == "/metrics":
+            self._send_json(200, self.service.metrics())
+            status = 200
+        else:
+            status = 404
+            self._send_json(status, {"error": "not found"})
+        self.service.record(path, status, time.perf_counter() - start)
+
+    def do_POST(self) -> None:
+        start = time.perf_counter()
+        path = self.path.split("?", 1)[0]
+        kind = {"/render": "render", "/shuffle": "shuffle"}.get(path)
+        status = 200
+        try:
+            if kind is None:
+                raise JobError("not found", 404)
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                raise JobError("request too large", 413)
+            try:
+                job = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as exc:
+                raise JobError(f"invalid JSON: {exc}") from exc
+            if not isinstance(job, dict):
+                raise JobError("job must be a JSON object")
+            check_job(job)
+            body, content_type = self.service.submit(kind, job)
+            self._send(200, body, content_type)
+        except JobError as exc:
+            status = exc.status
+            headers = {"Retry-After": "1"} if status == 503 else None
+            self._send_json(status, {"error": str(exc)}, headers)
+        except Exception as exc:
+            status = 500
+            self._send_json(status, {"error": f"{type(exc).__name__}: {exc}"})
+        self.service.record(path, status, time.perf_counter() - start)
+
+
+def make_server(
+    service: ChartService,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    verbose: bool = False,
+) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ChartRequestHandler)
+    server.daemon_threads = True
+    server.service = service  # type: ignore[attr-defined]
+    server.verbose = verbose  # type: ignore[attr-defined]
+    return server
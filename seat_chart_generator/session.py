@@ -0,0 +1,218 @@
+"""Crash-safe session persistence for a :class:`~.state.ClassroomState`.
+
+A session consists of two files:
+
+``<path>``
+    A compacted snapshot (layout, title and every occupied seat), always
+    replaced atomically.
+``<path>.journal``
+    Newline separated JSON records appended after the snapshot, one per
+    edit, each listing only the seats that changed.
+
+Every record carries a sequence number.  Loading reads the snapshot and
+replays the journal records newer than it; a torn last line left by a crash
+is ignored.  After ``compact_every`` records the journal is folded into a new
+snapshot.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional, Set, Tuple
+
+from .history import PersistentMap, Snapshot
+from .state import ClassroomState, cell_from_json, cell_to_json
+
+SESSION_VERSION = 1
+JOURNAL_SUFFIX = ".journal"
+BROKEN_SUFFIX = ".broken"
+
+
+def atomic_write_json(path: str | Path, data: Any) -> None:
+    """Write JSON to ``path`` so readers see either the old or new file."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, ensure_ascii=False)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def layout_fingerprint(seat_rows: Iterable[Iterable[Any]]) -> str:
+    """Short hash of a layout, stored in the session metadata to notice
+    when the layout file changed after the session began."""
+    rows = [list(row) for row in seat_rows]
+    return hashlib.sha1(json.dumps(rows).encode("utf-8")).hexdigest()[:16]
+
+
+def journal_path(path: str | Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + JOURNAL_SUFFIX)
+
+
+def set_aside(path: str | Path) -> Path:
+    """Rename an unreadable session and its journal to ``<name>.broken``
+    so a new session does not overwrite them.  Returns the new path."""
+    path = Path(path)
+    broken = path.with_name(path.name + BROKEN_SUFFIX)
+    os.replace(path, broken)
+    journal = journal_path(path)
+    if journal.is_file():
+        os.replace(journal, journal_path(broken))
+    return broken
+
+
+def _read_journal(path: Path, after: int) -> Iterable[Dict[str, Any]]:
+    if not path.is_file():
+        return
+    with path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn write at the end of the journal after a crash.
+                break
+            if record.get("seq", 0) > after:
+                yield record
+
+
+def load_session(
+    path: str | Path,
+    roster: Iterable[Mapping[str, Any]],
+) -> Tuple[ClassroomState, Dict[str, Any]]:
+    """Load a session and return the state and its metadata (e.g. title).
+
+    The snapshot and the journal tail are folded into one persistent map
+    first and applied to the state in a single restore.
+    """
+    path = Path(path)
+    with path.open("r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    state = ClassroomState(data["layout"], roster)
+    meta: Dict[str, Any] = dict(data.get("meta", {}))
+    seq = data.get("seq", 0)
+    cells = PersistentMap().update(
+        (int(seat), cell_from_json(value, state.roster, int(seat)))
+        for seat, value in data.get("cells", {}).items()
+    )
+    for record in _read_journal(journal_path(path), seq):
+        seq = record["seq"]
+        meta.update(record.get("meta", {}))
+        cells = cells.update(
+            (int(seat), cell_from_json(value, state.roster, int(seat)))
+            for seat, value in record.get("changes", {}).items()
+        )
+    state.restore(Snapshot(cells, state.seat_rows))
+    meta["seq"] = seq
+    return state, meta
+
+
+class SessionJournal:
+    """Record every change of a state into a session file pair.
+
+    Use :meth:`attach` to start journaling; the current state is written as
+    the first snapshot.  Each change afterwards is one small append.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        compact_every: int = 200,
+        fsync: bool = True,
+    ) -> None:
+        self.path = Path(path)
+        self.journal = journal_path(self.path)
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.meta: Dict[str, Any] = {}
+        self.seq = 0
+        self.pending = 0
+        self.state: Optional[ClassroomState] = None
+        self._layout = None
+        self._fh = None
+
+    def attach(self, state: ClassroomState, meta: Optional[Mapping[str, Any]] = None) -> None:
+        if meta:
+            self.seq = max(self.seq, int(meta.get("seq", 0)))
+            self.meta.update({k: v for k, v in meta.items() if k != "seq"})
+        self.state = state
+        state.subscribe(self._on_change)
+        self.compact()
+
+    def detach(self) -> None:
+        if self.state is not None:
+            self.state.unsubscribe(self._on_change)
+            self.compact()
+            self.state = None
+        self.close()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def set_meta(self, **meta: Any) -> None:
+        """Record metadata such as the chart title."""
+        self.meta.update(meta)
+        self._append({"meta": meta})
+
+    def compact(self) -> None:
+        """Write a full snapshot atomically and start an empty journal.
+
+        If the process dies between the two steps the old journal records
+        are older than the snapshot and skipped on load.
+        """
+        state = self.state
+        if state is None:
+            return
+        self.seq += 1
+        atomic_write_json(
+            self.path,
+            {
+                "version": SESSION_VERSION,
+                "seq": self.seq,
+                "layout": state.seat_rows,
+                "meta": self.meta,
+                "cells": {str(seat): cell_to_json(cell) for seat, cell in state.cells.items()},
+            },
+        )
+        self.close()
+        self._fh = self.journal.open("w", encoding="utf-8")
+        self._layout = state.seat_rows
+        self.pending = 0
+
+    def _on_change(self, seats: Set[int]) -> None:
+        state = self.state
+        if state is None:
+            return
+        if state.seat_rows is not self._layout:
+            self.compact()
+            return
+        self._append(
+            {"changes": {str(seat): cell_to_json(state.cells.get(seat)) for seat in seats}}
+        )
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        if self._fh is None:
+            self._fh = self.journal.open("a", encoding="utf-8")
+        self.seq += 1
+        record["seq"] = self.seq
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        if self.fsync:
+            os.fsync(self._fh.fileno())
+        self.pending += 1
+        if self.pending >= self.compact_every:
+            self.compact()
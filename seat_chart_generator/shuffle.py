@@ -3,78 +3,97 @@
 from __future__ import annotations
 
 import random
-from typing import Dict, List, Optional
-
-from reportlab.lib import colors
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
 from .models import Student
+from .validate import check, validate_request
 
+if TYPE_CHECKING:
+    from .state import ClassroomState
 
-def simple_shuffle(
+
+def split_request(
     students_data: List[Dict[str, str]],
-    seat_rows: List[List[Optional[int]]],
+    seat_rows: List[List[Optional[int]]] | None = None,
     fixed: Dict[str, int] | None = None,
-    empty_seats: List[int] | None = None,
-    seed: int | None = None,
-) -> List[Student]:
-    """Shuffle students randomly without amidakuji.
+    empty_seats: Iterable[int] | None = None,
+    state: "ClassroomState | None" = None,
+    validate: bool = False,
+) -> Tuple[List[Student], List[Dict[str, str]], List[int]]:
+    """Split a shuffle request up, validating it first with ``validate``.
 
-    ``fixed`` maps student names to seat numbers that should not be
-    changed. ``empty_seats`` is a list of seat numbers that must remain
-    unassigned. Students marked as "休学" are skipped unless a fixed seat is
-    provided for them.
+    Returns the pinned students (already seated), the students to place
+    and the free seats in layout order.  Arguments are as for
+    :func:`simple_shuffle`.
     """
-
-    rng = random.Random(seed)
-    seats = [n for row in seat_rows for n in row if isinstance(n, int)]
+    if state is not None:
+        seat_rows = seat_rows if seat_rows is not None else state.seat_rows
+        fixed = fixed if fixed is not None else state.fixed_names
+        empty_seats = empty_seats if empty_seats is not None else state.empty
+    if seat_rows is None:
+        raise TypeError("a shuffle needs seat_rows or state")
     fixed = fixed or {}
     empty = set(empty_seats or [])
+    if validate:
+        check(validate_request(students_data, seat_rows, fixed, empty))
+    taken = empty | set(fixed.values())
 
     assigned: List[Student] = []
     remaining_students: List[Dict[str, str]] = []
-    remaining_seats = [s for s in seats if s not in empty]
+    remaining_seats = [
+        n for row in seat_rows for n in row if isinstance(n, int) and n not in taken
+    ]
 
     for data in students_data:
         name = data["name_kanji"]
-        colour = colors.red if data.get("status") == "休学" else None
         if name in fixed:
-            seat = fixed[name]
-            if seat in remaining_seats:
-                remaining_seats.remove(seat)
-            assigned.append(
-                Student(
-                    seat_number=seat,
-                    serial=data["serial"],
-                    student_id=data["student_id"],
-                    name_kanji=name,
-                    name_kana=data["name_kana"],
-                    gender=data.get("gender", "M"),
-                    color=colour,
-                )
-            )
+            assigned.append(Student.from_record(data, fixed[name]))
         else:
             if data.get("status") == "休学":
                 # Skip students on leave unless a seat is fixed for them
                 continue
             remaining_students.append(data)
 
-    rng.shuffle(remaining_students)
-    rng.shuffle(remaining_seats)
     if len(remaining_students) > len(remaining_seats):
         raise ValueError("席が足りません")
+    return assigned, remaining_students, remaining_seats
+
+
+def simple_shuffle(
+    students_data: List[Dict[str, str]],
+    seat_rows: List[List[Optional[int]]] | None = None,
+    fixed: Dict[str, int] | None = None,
+    empty_seats: List[int] | None = None,
+    seed: int | None = None,
+    state: "ClassroomState | None" = None,
+    validate: bool = False,
+) -> List[Student]:
+    """Shuffle students randomly without amidakuji.
+
+    ``fixed`` maps student names to seat numbers that should not be
+    changed. ``empty_seats`` is a list of seat numbers that must remain
+    unassigned. Students marked as "休学" are skipped unless a fixed seat is
+    provided for them.
+
+    With ``state`` the layout, pinned students and empty seats are taken
+    from the :class:`~.state.ClassroomState` indexes unless given
+    explicitly.
+
+    With ``validate`` the request is checked first (see
+    :func:`~.validate.validate_request`) and a
+    :class:`~.errors.ValidationError` listing every conflict is raised
+    before anything is shuffled.  Without it only a lack of seats is an
+    error.
+    """
+
+    rng = random.Random(seed)
+    assigned, remaining_students, remaining_seats = split_request(
+        students_data, seat_rows, fixed, empty_seats, state, validate
+    )
+    rng.shuffle(remaining_students)
+    rng.shuffle(remaining_seats)
 
     for data, seat in zip(remaining_students, remaining_seats):
-        colour = colors.red if data.get("status") == "休学" else None
-        assigned.append(
-            Student(
-                seat_number=seat,
-                serial=data["serial"],
-                student_id=data["student_id"],
-                name_kanji=data["name_kanji"],
-                name_kana=data["name_kana"],
-                gender=data.get("gender", "M"),
-                color=colour,
-            )
-        )
+        assigned.append(Student.from_record(data, seat))
 
     return assigned
@@ -0,0 +1,276 @@
+"""Central seating state shared by the GUI, shuffling and chart output.
+
+:class:`ClassroomState` owns the assignment of students to seats together
+with the fixed and empty seats.  Both directions (seat → student and
+name → seat) are indexed, as well as the fixed students that shuffling has
+to keep, so every edit is a constant number of dictionary operations and
+nothing has to be re-derived from the other collections.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .history import DELETE, PersistentMap, Snapshot
+from .models import Student
+
+Listener = Callable[[Set[int]], None]
+
+# Cells of the persistent snapshot map: ("student", Student, pinned) or
+# ("empty", text, colour).  Plain free seats have no cell.
+Cell = Tuple[Any, ...]
+
+
+def cell_to_json(cell: Optional[Cell]) -> Optional[Dict[str, Any]]:
+    if cell is None:
+        return None
+    if cell[0] == "student":
+        return {"name": cell[1].name_kanji, "fixed": cell[2]}
+    return {"text": cell[1], "colour": cell[2]}
+
+
+def cell_from_json(
+    value: Optional[Mapping[str, Any]],
+    roster: Mapping[str, Mapping[str, Any]],
+    seat: int,
+) -> Any:
+    """Inverse of :func:`cell_to_json`; ``None`` becomes :data:`DELETE`."""
+    if value is None:
+        return DELETE
+    if "name" in value:
+        if value["name"] not in roster:
+            # The roster changed since the cell was written.
+            return DELETE
+        student = Student.from_record(roster[value["name"]], seat)
+        return ("student", student, bool(value.get("fixed")))
+    return ("empty", value.get("text", ""), value.get("colour", "black"))
+
+
+class ClassroomState:
+    """Assignment of students to the seats of one layout.
+
+    ``fixed`` holds the seats that shuffling must not touch: seats with a
+    pinned student as well as empty seats and seats showing text.  ``empty``
+    maps empty seats to their ``(text, colour)``; the text is ``""`` for a
+    plain empty seat.  Listeners registered with :meth:`subscribe` receive
+    the set of seats changed by each mutation.
+    """
+
+    def __init__(
+        self,
+        seat_rows: List[List[Optional[int]]],
+        roster: Iterable[Mapping[str, Any]] = (),
+    ) -> None:
+        self.seat_rows = seat_rows
+        self.roster: Dict[str, Mapping[str, Any]] = {d["name_kanji"]: d for d in roster}
+        self.assignments: Dict[int, Student] = {}
+        self.seat_of: Dict[str, int] = {}
+        self.fixed: Set[int] = set()
+        self.empty: Dict[int, Tuple[str, str]] = {}
+        # name -> seat of pinned students, i.e. the ``fixed`` argument of
+        # simple_shuffle kept up to date on every edit.
+        self.fixed_names: Dict[str, int] = {}
+        self._seats: Set[int] = {s for row in seat_rows for s in row if isinstance(s, int)}
+        self._listeners: List[Listener] = []
+        # Persistent mirror of the seats above, updated per changed seat so
+        # that snapshot() is free and snapshots share structure.
+        self.cells = PersistentMap()
+
+    # -- queries ------------------------------------------------------------
+
+    @property
+    def total_seats(self) -> int:
+        return len(self._seats)
+
+    def has_seat(self, seat: int) -> bool:
+        return seat in self._seats
+
+    def student_at(self, seat: int) -> Optional[Student]:
+        return self.assignments.get(seat)
+
+    def seat_of_name(self, name: str) -> Optional[int]:
+        return self.seat_of.get(name)
+
+    def students(self) -> List[Student]:
+        return list(self.assignments.values())
+
+    # -- notifications ------------------------------------------------------
+
+    def subscribe(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        self._listeners.remove(listener)
+
+    def _notify(self, seats: Set[int]) -> None:
+        if seats:
+            self.cells = self.cells.update((seat, self._cell(seat)) for seat in seats)
+            for listener in list(self._listeners):
+                listener(seats)
+
+    # -- snapshots ----------------------------------------------------------
+
+    def _cell(self, seat: int) -> Any:
+        student = self.assignments.get(seat)
+        if student is not None:
+            return ("student", student, self.fixed_names.get(student.name_kanji) == seat)
+        if seat in self.empty:
+            text, colour = self.empty[seat]
+            return ("empty", text, colour)
+        return DELETE
+
+    def snapshot(self, label: str = "") -> Snapshot:
+        """Return an immutable snapshot; O(1) thanks to the mirror map."""
+        return Snapshot(self.cells, self.seat_rows, label)
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """Return to ``snapshot``, touching only the seats that differ."""
+        if snapshot.seat_rows is not self.seat_rows:
+            self.seat_rows = snapshot.seat_rows
+            self._seats = {s for row in self.seat_rows for s in row if isinstance(s, int)}
+        changed = set(self.cells.diff(snapshot.cells))
+        # Empty every changed seat first so students moving between two
+        # changed seats are not removed again after being placed.
+        for seat in changed:
+            self._vacate(seat)
+            self._unfix(seat)
+        for seat in changed:
+            cell = snapshot.cells.get(seat)
+            if cell is None:
+                continue
+            if cell[0] == "student":
+                student = cell[1]
+                student.seat_number = seat
+                self.assignments[seat] = student
+                self.seat_of[student.name_kanji] = seat
+                if cell[2]:
+                    self.fixed.add(seat)
+                    self.fixed_names[student.name_kanji] = seat
+            else:
+                self.empty[seat] = (cell[1], cell[2])
+                self.fixed.add(seat)
+        self.cells = snapshot.cells
+        for listener in list(self._listeners):
+            listener(changed)
+
+    # -- low level helpers --------------------------------------------------
+
+    def _vacate(self, seat: int) -> None:
+        student = self.assignments.pop(seat, None)
+        if student is not None:
+            del self.seat_of[student.name_kanji]
+            if self.fixed_names.get(student.name_kanji) == seat:
+                del self.fixed_names[student.name_kanji]
+
+    def _unfix(self, seat: int) -> None:
+        self.fixed.discard(seat)
+        self.empty.pop(seat, None)
+
+    # -- mutations ----------------------------------------------------------
+
+    def place(self, seat: int, student: Student, fixed: bool = True) -> None:
+        """Put ``student`` on ``seat``, moving them from their old seat."""
+        changed = {seat}
+        name = student.name_kanji
+        previous = self.seat_of.get(name)
+        if previous is not None and previous != seat:
+            self._vacate(previous)
+            self._unfix(previous)
+            changed.add(previous)
+        self._vacate(seat)
+        self.empty.pop(seat, None)
+        student.seat_number = seat
+        self.assignments[seat] = student
+        self.seat_of[name] = seat
+        if fixed:
+            self.fixed.add(seat)
+            self.fixed_names[name] = seat
+        else:
+            self.fixed.discard(seat)
+        self._notify(changed)
+
+    def place_name(self, seat: int, name: str, fixed: bool = True) -> Student:
+        """Pin the roster student ``name`` to ``seat``."""
+        student = Student.from_record(self.roster[name], seat)
+        self.place(seat, student, fixed)
+        return student
+
+    def set_text(self, seat: int, text: str = "", colour: str = "black") -> None:
+        """Mark ``seat`` empty, optionally showing ``text`` (e.g. 教卓)."""
+        self._vacate(seat)
+        self.empty[seat] = (text, colour)
+        self.fixed.add(seat)
+        self._notify({seat})
+
+    def vacate(self, seat: int) -> None:
+        """Remove the student on ``seat``; the seat is no longer pinned."""
+        if seat in self.assignments:
+            self._vacate(seat)
+            self.fixed.discard(seat)
+            self._notify({seat})
+
+    def release(self, seat: int) -> None:
+        """Make ``seat`` a normal unfixed, unoccupied seat again."""
+        self._vacate(seat)
+        self._unfix(seat)
+        self._notify({seat})
+
+    def clear_all(self) -> None:
+        changed = set(self.assignments) | self.fixed
+        self.assignments.clear()
+        self.seat_of.clear()
+        self.fixed.clear()
+        self.empty.clear()
+        self.fixed_names.clear()
+        self._notify(changed)
+
+    def apply_shuffle(self, students: Iterable[Student]) -> None:
+        """Replace the assignment with a shuffle result.
+
+        Pinned students keep their seats in a shuffle, so only the free
+        seats change; fixed and empty seats stay as they are.
+        """
+        changed = set(self.assignments)
+        self.assignments = {s.seat_number: s for s in students}
+        self.seat_of = {s.name_kanji: seat for seat, s in self.assignments.items()}
+        self.fixed = set(self.fixed_names.values()) | set(self.empty)
+        changed.update(self.assignments)
+        self._notify(changed)
+
+    def move_students(self, moves: Mapping[int, int]) -> None:
+        """Move students between seats in one step, e.g. a bulk transform.
+
+        ``moves`` maps source to destination seats and must be a
+        permutation of unfixed seats.  Raises :class:`ValueError` otherwise
+        and leaves the state unchanged.
+        """
+        if set(moves) != set(moves.values()):
+            raise ValueError("moves are not a permutation of seats")
+        pinned = sorted(self.fixed.intersection(moves))
+        if pinned:
+            raise ValueError(f"moves touch fixed seats: {pinned}")
+        moves = {src: dst for src, dst in moves.items() if src != dst}
+        moving = {src: self.assignments.pop(src) for src in moves if src in self.assignments}
+        for dst, student in ((moves[src], student) for src, student in moving.items()):
+            student.seat_number = dst
+            self.assignments[dst] = student
+            self.seat_of[student.name_kanji] = dst
+        self._notify(set(moves) | set(moves.values()))
+
+    def reset(self, seat_rows: List[List[Optional[int]]]) -> None:
+        """Switch to a new layout, dropping all assignments.
+
+        Listeners are always notified, with the seats of the old layout;
+        they can tell the layout changed from :attr:`seat_rows`.
+        """
+        changed = set(self._seats)
+        self.assignments.clear()
+        self.seat_of.clear()
+        self.fixed.clear()
+        self.empty.clear()
+        self.fixed_names.clear()
+        self.seat_rows = seat_rows
+        self._seats = {s for row in seat_rows for s in row if isinstance(s, int)}
+        self.cells = PersistentMap()
+        for listener in list(self._listeners):
+            listener(changed)
@@ -0,0 +1,323 @@
+"""Streaming seat charts for very large rosters.
+
+For a whole-grade or whole-school exam the roster is read one record at a
+time, students are collected until a room is full, that room is shuffled,
+its chart is written to its own PDF and everything belonging to it is
+dropped before the next room starts.  Peak memory therefore depends on the
+size of one room, not on the size of the roster.
+
+Every run writes a manifest (``<stem>.manifest.jsonl``, one line per room)
+with the seating of each room and a digest of everything that goes into its
+chart.  On the next run a room whose digest is unchanged keeps its PDF, and
+each room is compared with its previous seating.  The room diffs go straight
+to a :class:`~.diff.MoveWriter`, so the move list does not grow in memory
+either; the report only keeps its totals.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set
+
+from .diff import MoveCounts, MoveWriter, PlanDiff, diff_assignments
+from .layout import DEFAULT_SEAT_ROWS
+from .models import Student
+from .shuffle import simple_shuffle
+
+MANIFEST_SUFFIX = ".manifest.jsonl"
+
+
+@dataclass
+class RoomChart:
+    """One written room chart."""
+
+    room: int
+    students: int
+    path: str
+    image_path: Optional[str] = None
+    # True when the chart of the previous run was kept as it was.
+    reused: bool = False
+    # Changes against the previous run, ``(room, seat)`` keyed; ``None``
+    # when there was no previous run.
+    diff: Optional[PlanDiff] = None
+    # Bytes removed by ``optimize``, if it was given.
+    saved_bytes: int = 0
+
+
+@dataclass
+class StreamReport:
+    rooms: List[RoomChart] = field(default_factory=list)
+    peak_bytes: Optional[int] = None
+    # Totals of the changes against the previous run, ``None`` without one.
+    moves: Optional[MoveCounts] = None
+
+    @property
+    def students(self) -> int:
+        return sum(room.students for room in self.rooms)
+
+    @property
+    def rendered(self) -> List[RoomChart]:
+        return [room for room in self.rooms if not room.reused]
+
+    @property
+    def saved_bytes(self) -> int:
+        return sum(room.saved_bytes for room in self.rooms)
+
+
+def _room_digest(
+    title: str,
+    seat_rows: Any,
+    students: List[Student],
+    chart_args: Mapping[str, Any],
+) -> str:
+    seats = sorted(
+        (s.seat_number, s.serial, s.student_id, s.name_kanji, s.name_kana, s.gender, repr(s.color))
+        for s in students
+    )
+    data = repr((title, seat_rows, seats, sorted(chart_args.items())))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def _room_entry(number: int, digest: str, students: List[Student]) -> Dict[str, Any]:
+    return {
+        "room": number,
+        "digest": digest,
+        "seats": {
+            str(s.seat_number): [s.serial, s.student_id, s.name_kanji, s.name_kana]
+            for s in students
+        },
+    }
+
+
+def _entry_seating(entry: Mapping[str, Any]) -> Dict[Any, Student]:
+    room = entry["room"]
+    return {
+        (room, int(seat)): Student(int(seat), serial, student_id, kanji, kana)
+        for seat, (serial, student_id, kanji, kana) in entry["seats"].items()
+    }
+
+
+def _read_manifest(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield previous room entries one at a time; a damaged manifest
+    simply ends early."""
+    try:
+        with path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+    except OSError:
+        return
+
+
+def iter_room_records(
+    records: Iterable[Mapping[str, Any]],
+    capacity: int,
+) -> Iterator[List[Mapping[str, Any]]]:
+    """Group enrolled records into rooms of at most ``capacity`` students.
+
+    Students on leave ("休学") are skipped, as in :func:`simple_shuffle`.
+    """
+    if capacity <= 0:
+        raise ValueError("席が足りません")
+    room: List[Mapping[str, Any]] = []
+    for record in records:
+        if record.get("status") == "休学":
+            continue
+        room.append(record)
+        if len(room) == capacity:
+            yield room
+            room = []
+    if room:
+        yield room
+
+
+def _restore_manifest(consumed: Path, manifest: Path, rendered: Set[int]) -> None:
+    """Put the previous manifest back after an unfinished run.
+
+    Rooms rendered again in that run lose their digest, as their PDFs no
+    longer match the seating recorded for them.
+    """
+    restoring = manifest.with_name(manifest.name + ".restore")
+    with restoring.open("w", encoding="utf-8") as out:
+        for entry in _read_manifest(consumed):
+            if entry.get("room") in rendered:
+                entry["digest"] = ""
+            out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(restoring, manifest)
+    consumed.unlink()
+
+
+def iter_room_charts(
+    records: Iterable[Mapping[str, Any]],
+    seat_rows: List[List[Optional[int]]] | None = None,
+    output_dir: str | Path = ".",
+    stem: str = "seat_chart",
+    title: str = "座席表",
+    seed: Optional[int] = None,
+    images: bool = False,
+    reuse: bool = True,
+    moves: Optional[MoveWriter] = None,
+    **chart_args: Any,
+) -> Iterator[RoomChart]:
+    """Write one chart per room and yield it as soon as it is on disk.
+
+    Rooms share ``seat_rows``.  Files are named ``<stem>_001.pdf``,
+    ``<stem>_002.pdf`` and so on; with ``images`` a PNG is written next to
+    each PDF.  ``chart_args`` are passed on to :func:`create_seat_chart`.
+    With ``reuse`` rooms that are unchanged since the previous run are not
+    rendered again.
+
+    When there was a previous run each room carries its
+    :attr:`RoomChart.diff`, and the diffs (including the departures from
+    rooms that no longer exist) are added to ``moves`` as they are found.
+
+    The previous manifest is set aside as ``<manifest>.prev`` before the
+    first room and the new one replaces it only once all rooms are done.
+    A run that stops early puts the previous manifest back; after a crash
+    the next run finds ``.prev``, compares with it and renders every room.
+    """
+    from .pdf import create_seat_chart
+
+    seat_rows = seat_rows if seat_rows is not None else DEFAULT_SEAT_ROWS
+    capacity = sum(1 for row in seat_rows for seat in row if isinstance(seat, int))
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = output_dir / f"{stem}{MANIFEST_SUFFIX}"
+    consumed = manifest.with_name(manifest.name + ".prev")
+    pending = manifest.with_name(manifest.name + ".tmp")
+    if consumed.exists():
+        if manifest.exists():
+            # The crash came after the new manifest was in place.
+            consumed.unlink()
+        else:
+            # The crash came mid-run: the PDFs may belong to either run.
+            os.replace(consumed, manifest)
+            reuse = False
+    previous = None
+    if manifest.exists():
+        os.replace(manifest, consumed)
+        previous = _read_manifest(consumed)
+    rendered: Set[int] = set()
+    finished = False
+    try:
+        with pending.open("w", encoding="utf-8") as out:
+            for number, room in enumerate(iter_room_records(records, capacity), start=1):
+                room_seed = None if seed is None else seed + number
+                students = simple_shuffle(room, seat_rows, seed=room_seed)
+                path = output_dir / f"{stem}_{number:03}.pdf"
+                image_path = path.with_suffix(".png") if images else None
+                room_title = f"{title} 第{number}室"
+                digest = _room_digest(
+                    room_title, seat_rows, students, {**chart_args, "images": images}
+                )
+                old = next(previous, None) if previous is not None else None
+                if old is not None and old.get("room") != number:
+                    old = None
+                reused = (
+                    reuse
+                    and old is not None
+                    and old.get("digest") == digest
+                    and path.exists()
+                    and (image_path is None or image_path.exists())
+                )
+                optimized = None
+                if not reused:
+                    rendered.add(number)
+                    optimized = create_seat_chart(
+                        students,
+                        seat_rows=seat_rows,
+                        title=room_title,
+                        output_path=str(path),
+                        image_path=str(image_path) if image_path else None,
+                        **chart_args,
+                    )
+                chart = RoomChart(
+                    number,
+                    len(students),
+                    str(path),
+                    str(image_path) if image_path else None,
+                    reused=reused,
+                    saved_bytes=optimized.saved if optimized is not None else 0,
+                )
+                if previous is not None:
+                    chart.diff = diff_assignments(
+                        _entry_seating(old) if old is not None else {},
+                        {(number, s.seat_number): s for s in students},
+                    )
+                    if moves is not None:
+                        moves.add(chart.diff)
+                out.write(json.dumps(_room_entry(number, digest, students), ensure_ascii=False) + "\n")
+                yield chart
+            if previous is not None:
+                # Rooms that no longer exist: everyone in them has left.
+                for old in previous:
+                    if moves is not None:
+                        moves.add(diff_assignments(_entry_seating(old), {}))
+                previous.close()
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(pending, manifest)
+        finished = True
+    finally:
+        if previous is not None:
+            previous.close()
+        if finished:
+            if consumed.exists():
+                consumed.unlink()
+        else:
+            if pending.exists():
+                pending.unlink()
+            if consumed.exists():
+                _restore_manifest(consumed, manifest, rendered)
+
+
+def stream_seat_charts(
+    records: Iterable[Mapping[str, Any]],
+    seat_rows: List[List[Optional[int]]] | None = None,
+    output_dir: str | Path = ".",
+    measure_memory: bool = False,
+    moves_path: str | Path | None = None,
+    moves_title: str = "移動リスト",
+    **kwargs: Any,
+) -> StreamReport:
+    """Write all room charts and return a report.
+
+    With ``measure_memory`` the Python heap is traced while the charts are
+    produced and the peak is stored in :attr:`StreamReport.peak_bytes`.
+    Tracing slows allocation down, so it is off by default.  When a
+    previous run left a manifest, :attr:`StreamReport.moves` holds the
+    totals of the changes against it and, with ``moves_path``, the move
+    list is written there (CSV, or PDF by suffix) while the rooms are done.
+    Without a previous run no move list is written.
+    """
+    report = StreamReport()
+    tracing = measure_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    try:
+        if measure_memory:
+            tracemalloc.reset_peak()
+        compared = False
+        manifest = Path(output_dir) / f"{kwargs.get('stem', 'seat_chart')}{MANIFEST_SUFFIX}"
+        has_previous = manifest.exists() or manifest.with_name(manifest.name + ".prev").exists()
+        with MoveWriter(moves_path if has_previous else None, moves_title) as moves:
+            for chart in iter_room_charts(records, seat_rows, output_dir, moves=moves, **kwargs):
+                if chart.diff is not None:
+                    compared = True
+                    chart.diff = None
+                report.rooms.append(chart)
+        if compared or moves.counts.moved:
+            report.moves = moves.counts
+        if measure_memory:
+            report.peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        if tracing:
+            tracemalloc.stop()
+    return report
@@ -0,0 +1,126 @@
+"""Bulk transformations of a seating plan.
+
+Every transformation is a permutation ``T`` of the cells of the layout grid
+(``rows × columns``, stored as flat index arrays).  Only *movable* seats take
+part: real seats that are neither pinned nor marked empty.  The permutation
+of the movable seats is the one induced by ``T``: each movable seat goes to
+the next movable seat along its cycle of ``T``, skipping pinned, empty and
+missing cells.  For a row rotation this means students step over a pinned
+seat to the next free one; for a mirror a student whose mirror image is
+pinned stays put.  All cycles are walked once, so every transformation is a
+single pass over the grid.  The resulting ``{from_seat: to_seat}`` moves
+are applied with :meth:`~.state.ClassroomState.move_students`.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+SeatRows = Sequence[Sequence[Optional[int]]]
+Block = Tuple[int, int, int, int]  # row, column, height, width
+
+
+def _grid(seat_rows: SeatRows) -> Tuple[int, int, List[Optional[int]]]:
+    rows = len(seat_rows)
+    cols = max((len(row) for row in seat_rows), default=0)
+    cells: List[Optional[int]] = [None] * (rows * cols)
+    for r, row in enumerate(seat_rows):
+        for c, seat in enumerate(row):
+            if isinstance(seat, int):
+                cells[r * cols + c] = seat
+    return rows, cols, cells
+
+
+def induced_moves(
+    seat_rows: SeatRows,
+    target: Sequence[int],
+    fixed: Iterable[int] = (),
+) -> Dict[int, int]:
+    """Return ``{from_seat: to_seat}`` induced by the cell permutation.
+
+    ``target[i]`` is the flat grid index that cell ``i`` is sent to.  Seats
+    in ``fixed`` and cells without a seat are skipped over.  Seats that do
+    not move are left out of the result.
+    """
+    _, _, cells = _grid(seat_rows)
+    fixed = set(fixed)
+    movable = [seat is not None and seat not in fixed for seat in cells]
+    seen = [False] * len(cells)
+    moves: Dict[int, int] = {}
+    for start in range(len(cells)):
+        if seen[start]:
+            continue
+        cycle: List[int] = []
+        index = start
+        while not seen[index]:
+            seen[index] = True
+            if movable[index]:
+                cycle.append(cells[index])
+            index = target[index]
+        for source, destination in zip(cycle, cycle[1:] + cycle[:1]):
+            if source != destination:
+                moves[source] = destination
+    return moves
+
+
+def rotate_rows(seat_rows: SeatRows, steps: int = 1, fixed: Iterable[int] = ()) -> Dict[int, int]:
+    """Move everyone ``steps`` rows back (towards higher row numbers).
+
+    Students of the last rows wrap around to the first row of their column.
+    """
+    rows, cols, _ = _grid(seat_rows)
+    target = [((i // cols + steps) % rows) * cols + i % cols for i in range(rows * cols)]
+    return induced_moves(seat_rows, target, fixed)
+
+
+def shift_columns(seat_rows: SeatRows, steps: int = 1, fixed: Iterable[int] = ()) -> Dict[int, int]:
+    """Move everyone ``steps`` columns to the right, wrapping per row."""
+    rows, cols, _ = _grid(seat_rows)
+    target = [(i // cols) * cols + (i % cols + steps) % cols for i in range(rows * cols)]
+    return induced_moves(seat_rows, target, fixed)
+
+
+def mirror(seat_rows: SeatRows, horizontal: bool = True, fixed: Iterable[int] = ()) -> Dict[int, int]:
+    """Mirror left/right (``horizontal``) or front/back."""
+    rows, cols, _ = _grid(seat_rows)
+    if horizontal:
+        target = [(i // cols) * cols + cols - 1 - i % cols for i in range(rows * cols)]
+    else:
+        target = [(rows - 1 - i // cols) * cols + i % cols for i in range(rows * cols)]
+    return induced_moves(seat_rows, target, fixed)
+
+
+def rotate_180(seat_rows: SeatRows, fixed: Iterable[int] = ()) -> Dict[int, int]:
+    """Turn the plan around: the front left seat swaps with the back right."""
+    rows, cols, _ = _grid(seat_rows)
+    size = rows * cols
+    return induced_moves(seat_rows, [size - 1 - i for i in range(size)], fixed)
+
+
+def swap_blocks(
+    seat_rows: SeatRows,
+    first: Block,
+    second: Block,
+    fixed: Iterable[int] = (),
+) -> Dict[int, int]:
+    """Swap two equally sized, non-overlapping blocks of seats.
+
+    Blocks are ``(row, column, height, width)`` with 0-based positions.
+    """
+    rows, cols, _ = _grid(seat_rows)
+    (r1, c1, h, w), (r2, c2, h2, w2) = first, second
+    if (h, w) != (h2, w2):
+        raise ValueError("blocks must have the same size")
+    for r, c in ((r1, c1), (r2, c2)):
+        if r < 0 or c < 0 or r + h > rows or c + w > cols:
+            raise ValueError("block outside the layout")
+    if r1 < r2 + h and r2 < r1 + h and c1 < c2 + w and c2 < c1 + w:
+        raise ValueError("blocks overlap")
+    target = list(range(rows * cols))
+    for dr in range(h):
+        for dc in range(w):
+            a = (r1 + dr) * cols + c1 + dc
+            b = (r2 + dr) * cols + c2 + dc
+            target[a], target[b] = b, a
+    return induced_moves(seat_rows, target, fixed)
+
@@ -0,0 +1,319 @@
+"""Up-front checks of a seating request.
+
+:func:`validate_request` looks at the roster, the layout, pinned students,
+empty seats and reserved seats before anything is shuffled and returns
+every problem at once as a :class:`Conflict` with the seat, its position in
+the layout and the student concerned.  Each check is a single pass over
+its input, so the whole validation is linear in the size of the request.
+
+Conflicts with severity ``"error"`` would lead to a wrong chart (a student
+silently dropped, two students on one seat, a pin that is ignored);
+:func:`check` raises :class:`ValidationError` for them.  ``"warning"``
+conflicts are legal but probably unintended, such as a pinned student on
+leave.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .assignment import plan_reserved_seats
+from .errors import ValidationError
+from .models import Student
+
+if TYPE_CHECKING:
+    from .state import ClassroomState
+
+ERROR = "error"
+WARNING = "warning"
+
+
+@dataclass(frozen=True)
+class Conflict:
+    """One problem of a request.
+
+    ``position`` is the 0-based ``(row, column)`` of ``seat`` in the
+    layout, when the seat exists.
+    """
+
+    code: str
+    message: str
+    seat: Optional[int] = None
+    student: Optional[str] = None
+    position: Optional[Tuple[int, int]] = None
+    severity: str = ERROR
+
+    def __str__(self) -> str:
+        where = []
+        if self.seat is not None:
+            where.append(f"席{self.seat}")
+        if self.position is not None:
+            where.append(f"({self.position[0] + 1}行{self.position[1] + 1}列)")
+        if self.student:
+            where.append(self.student)
+        prefix = " ".join(where)
+        return f"{prefix}: {self.message}" if prefix else self.message
+
+
+def _positions(
+    seat_rows: Sequence[Sequence[Optional[int]]],
+    conflicts: List[Conflict],
+) -> Dict[int, Tuple[int, int]]:
+    positions: Dict[int, Tuple[int, int]] = {}
+    for r, row in enumerate(seat_rows):
+        for c, seat in enumerate(row):
+            if not isinstance(seat, int):
+                continue
+            if seat in positions:
+                conflicts.append(
+                    Conflict("duplicate_seat", "座席番号が重複しています", seat, position=(r, c))
+                )
+            else:
+                positions[seat] = (r, c)
+    return positions
+
+
+def _check_reserved(
+    conflicts: List[Conflict],
+    positions: Mapping[int, Tuple[int, int]],
+    names: Mapping[str, Any],
+    pinned: Mapping[str, int],
+    empty: Iterable[int],
+    reserved_students: Iterable[str],
+    reserved_seat_numbers: Optional[Iterable[int]],
+) -> None:
+    reserved = [name.strip() for name in reserved_students]
+    if not reserved:
+        return
+    empty = set(empty)
+    pinned_seat = {seat: name for name, seat in pinned.items()}
+    reserved_set = set(reserved)
+    usable = 0
+    for seat in reserved_seat_numbers if reserved_seat_numbers is not None else positions:
+        if seat not in positions:
+            conflicts.append(Conflict("unknown_reserved_seat", "優先席がレイアウトにありません", seat))
+        elif seat in empty:
+            conflicts.append(
+                Conflict("reserved_seat_empty", "優先席が空席に指定されています", seat, position=positions[seat])
+            )
+        elif seat in pinned_seat and pinned_seat[seat] not in reserved_set:
+            conflicts.append(
+                Conflict(
+                    "reserved_seat_taken",
+                    "優先席に別の生徒が固定されています",
+                    seat,
+                    pinned_seat[seat],
+                    positions[seat],
+                )
+            )
+        else:
+            usable += 1
+    for name in reserved:
+        if name not in names:
+            conflicts.append(Conflict("unknown_student", "優先する生徒が名簿にいません", student=name))
+        elif name in pinned:
+            seat = pinned[name]
+            conflicts.append(
+                Conflict(
+                    "reserved_pinned",
+                    "優先する生徒が別の席に固定されています",
+                    seat,
+                    name,
+                    positions.get(seat),
+                    WARNING,
+                )
+            )
+    if len(reserved) > usable:
+        conflicts.append(
+            Conflict("reserved_capacity", f"優先席が足りません（{usable}席に対して{len(reserved)}人）")
+        )
+
+
+def validate_request(
+    roster: Iterable[Mapping[str, Any]],
+    seat_rows: Sequence[Sequence[Optional[int]]],
+    fixed: Optional[Mapping[str, int]] = None,
+    empty: Iterable[int] = (),
+    reserved_students: Iterable[str] = (),
+    reserved_seat_numbers: Optional[Iterable[int]] = None,
+) -> List[Conflict]:
+    """Return all conflicts of a request, errors and warnings alike.
+
+    The arguments mirror :func:`~.shuffle.simple_shuffle` (``fixed`` maps
+    names to seats, ``empty`` lists seats that stay unassigned) and
+    :func:`~.assignment.assign_students_to_seats` for the reservations.
+    """
+    conflicts: List[Conflict] = []
+    positions = _positions(seat_rows, conflicts)
+    fixed = fixed or {}
+    empty = set(empty)
+
+    records: Dict[str, Mapping[str, Any]] = {}
+    name_counts: Counter = Counter()
+    id_counts: Counter = Counter()
+    for data in roster:
+        name = str(data["name_kanji"]).strip()
+        name_counts[name] += 1
+        records.setdefault(name, data)
+        student_id = str(data.get("student_id", "")).strip()
+        if student_id:
+            id_counts[student_id] += 1
+    for name, count in name_counts.items():
+        if count > 1:
+            pinned = name in fixed
+            conflicts.append(
+                Conflict(
+                    "duplicate_name",
+                    "同じ名前の生徒がいます" + ("（固定席が区別できません）" if pinned else ""),
+                    fixed.get(name),
+                    name,
+                    positions.get(fixed.get(name)),
+                    ERROR if pinned else WARNING,
+                )
+            )
+    for student_id, count in id_counts.items():
+        if count > 1:
+            conflicts.append(
+                Conflict("duplicate_student_id", f"学籍番号{student_id}が重複しています", severity=WARNING)
+            )
+
+    for seat in empty:
+        if seat not in positions:
+            conflicts.append(
+                Conflict("unknown_empty_seat", "空席に指定した席がレイアウトにありません", seat, severity=WARNING)
+            )
+
+    holder: Dict[int, str] = {}
+    pinned_seats = set()
+    for name, seat in fixed.items():
+        position = positions.get(seat)
+        if name not in records:
+            conflicts.append(Conflict("unknown_student", "固定した生徒が名簿にいません", seat, name, position))
+        if position is None:
+            conflicts.append(Conflict("unknown_seat", "固定した席がレイアウトにありません", seat, name))
+            continue
+        if seat in empty:
+            conflicts.append(Conflict("pinned_empty", "空席に生徒が固定されています", seat, name, position))
+        if seat in holder:
+            conflicts.append(
+                Conflict("duplicate_pin", f"{holder[seat]}と同じ席に固定されています", seat, name, position)
+            )
+        holder.setdefault(seat, name)
+        pinned_seats.add(seat)
+        if name in records and records[name].get("status") == "休学":
+            conflicts.append(
+                Conflict("on_leave_pinned", "休学中の生徒が固定されています", seat, name, position, WARNING)
+            )
+
+    free = sum(1 for seat in positions if seat not in empty and seat not in pinned_seats)
+    need = sum(
+        count
+        for name, count in name_counts.items()
+        if name not in fixed and records[name].get("status") != "休学"
+    )
+    if need > free:
+        conflicts.append(Conflict("capacity", f"席が足りません（空き{free}席に対して{need}人）"))
+
+    _check_reserved(
+        conflicts, positions, records, fixed, empty, reserved_students, reserved_seat_numbers
+    )
+    return conflicts
+
+
+def validate_state(
+    state: "ClassroomState",
+    roster: Optional[Iterable[Mapping[str, Any]]] = None,
+    **reserved: Any,
+) -> List[Conflict]:
+    """Validate the next shuffle of a :class:`~.state.ClassroomState`."""
+    return validate_request(
+        state.roster.values() if roster is None else roster,
+        state.seat_rows,
+        state.fixed_names,
+        state.empty,
+        **reserved,
+    )
+
+
+def validate_students(
+    students: Iterable[Student],
+    seat_rows: Sequence[Sequence[Optional[int]]],
+    reserved_students: Iterable[str] = (),
+    reserved_seat_numbers: Optional[Iterable[int]] = None,
+) -> List[Conflict]:
+    """Check already seated students before a chart is drawn.
+
+    Reports students on the same seat or on a seat missing from the layout
+    (both would silently disappear from the chart) and reserved seats held
+    by someone else, which would leave a reserved student where they are.
+    The reserved seats are worked out by
+    :func:`~.assignment.plan_reserved_seats`, exactly as the assignment
+    will, including students already marked ``special_needs``.
+    """
+    students = list(students)
+    conflicts: List[Conflict] = []
+    positions = _positions(seat_rows, conflicts)
+    seated: Dict[int, Student] = {}
+    for student in students:
+        seat = student.seat_number
+        if seat not in positions:
+            conflicts.append(
+                Conflict("unknown_seat", "席がレイアウトにありません", seat, student.name_kanji)
+            )
+        elif seat in seated:
+            conflicts.append(
+                Conflict(
+                    "duplicate_pin",
+                    f"{seated[seat].name_kanji}と同じ席に割り当てられています",
+                    seat,
+                    student.name_kanji,
+                    positions[seat],
+                )
+            )
+        else:
+            seated[seat] = student
+    reserved = {name.strip() for name in reserved_students}
+    names = {s.name_kanji for s in students}
+    for name in sorted(reserved - names):
+        conflicts.append(Conflict("unknown_student", "優先する生徒が席にいません", student=name))
+    if reserved_seat_numbers is not None:
+        reserved_seat_numbers = list(reserved_seat_numbers)
+    _, blocked = plan_reserved_seats(students, seat_rows, reserved, reserved_seat_numbers)
+    for seat, student in blocked:
+        holder = seated.get(seat)
+        conflicts.append(
+            Conflict(
+                "reserved_seat_taken",
+                f"優先席に{holder.name_kanji if holder else '別の生徒'}が座っています",
+                seat,
+                student.name_kanji,
+                positions.get(seat),
+            )
+        )
+    return conflicts
+
+
+def errors(conflicts: Iterable[Conflict]) -> List[Conflict]:
+    return [c for c in conflicts if c.severity == ERROR]
+
+
+def check(conflicts: Iterable[Conflict]) -> List[Conflict]:
+    """Raise :class:`ValidationError` if there are errors, otherwise return
+    the warnings."""
+    conflicts = list(conflicts)
+    failed = errors(conflicts)
+    if failed:
+        raise ValidationError(failed)
+    return conflicts
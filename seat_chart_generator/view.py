@@ -0,0 +1,105 @@
+"""View model for seat widgets in the GUI.
+
+Each seat is described by a :class:`SeatView`, a plain tuple of the widget
+options that make up its appearance.  The GUI keeps the last applied view of
+every seat and only reconfigures widgets for the options that
+:func:`diff_views` reports as changed.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+
+from reportlab.lib import colors
+
+from .models import Student
+
+DESK_TEXTS = ("教卓", "補助机")
+
+
+class SeatView(NamedTuple):
+    text: str
+    fg: str
+    bg: str
+    relief: str
+    borderwidth: int
+    anchor: str
+    justify: str
+
+
+def format_student(student: Student) -> str:
+    """Return multiline string with student details."""
+    return (
+        f"{student.serial}\n"
+        f"{student.student_id}\n"
+        f"{student.name_kanji}\n"
+        f"{student.name_kana}"
+    )
+
+
+def seat_view(
+    student: Optional[Student],
+    fixed: bool,
+    empty: Optional[Tuple[str, str]],
+    default_bg: str,
+) -> SeatView:
+    """Return the appearance of a seat.
+
+    ``empty`` is the ``(text, colour)`` entry of a seat marked empty or
+    showing free text, ``None`` otherwise.  ``default_bg`` is the platform
+    dependent default background of a label.
+    """
+    if empty is not None:
+        text, colour = empty
+        if text in DESK_TEXTS:
+            return SeatView(text, colour, "white", "solid", 2, "center", "center")
+        if text:
+            return SeatView(text, colour, default_bg, "flat", 0, "w", "left")
+        return SeatView("", "black", default_bg, "flat", 0, "center", "center")
+    if student is not None and student.color == colors.red:
+        return SeatView(format_student(student), "red", default_bg, "flat", 0, "center", "center")
+    text = format_student(student) if student is not None else ""
+    return SeatView(text, "black", "white", "solid", 4 if fixed else 2, "center", "center")
+
+
+def build_views(
+    seats: Iterable[int],
+    assignments: Mapping[int, Student],
+    fixed_seats: Iterable[int],
+    empty_seats: Mapping[int, Tuple[str, str]],
+    default_bg: str,
+) -> Dict[int, SeatView]:
+    fixed = fixed_seats if isinstance(fixed_seats, (set, frozenset)) else set(fixed_seats)
+    return {
+        seat: seat_view(assignments.get(seat), seat in fixed, empty_seats.get(seat), default_bg)
+        for seat in seats
+    }
+
+
+def view_options(view: SeatView) -> Dict[str, Any]:
+    return view._asdict()
+
+
+def diff_views(
+    old: Mapping[int, SeatView],
+    new: Mapping[int, SeatView],
+) -> Dict[int, Dict[str, Any]]:
+    """Return the minimal widget options to turn ``old`` into ``new``.
+
+    Seats missing from ``old`` get all their options.  Seats whose view is
+    unchanged are left out entirely.
+    """
+    changes: Dict[int, Dict[str, Any]] = {}
+    for seat, view in new.items():
+        before = old.get(seat)
+        if before == view:
+            continue
+        if before is None:
+            changes[seat] = view_options(view)
+            continue
+        changes[seat] = {
+            key: value
+            for key, value, previous in zip(SeatView._fields, view, before)
+            if value != previous
+        }
+    return changes
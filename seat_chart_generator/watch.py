@@ -0,0 +1,301 @@
+"""Watch mode: re-render seat charts when their input files change.
+
+A :class:`ChartWatcher` keeps one process warm — the registered font, the
+text width cache and parsed layouts and rosters stay loaded — and waits for
+changes of the layout, roster and session files of its targets.  Changes are
+reported by inotify on Linux and by polling ``stat`` elsewhere.  Bursts of
+events (an editor writing a temporary file and renaming it, a journal being
+appended to) are debounced, and only targets whose input *contents* changed
+are rendered again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import select
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from .layout import DEFAULT_SEAT_ROWS, load_layout
+from .pattern import Pattern, pattern_shuffle
+from .roster import load_roster
+from .session import journal_path, load_session
+from .shuffle import simple_shuffle
+
+Fingerprint = Optional[Tuple[int, int]]
+
+
+@dataclass
+class WatchTarget:
+    """One chart and the files it is rendered from.
+
+    Without ``session_path`` the students are shuffled onto the layout,
+    following ``pattern`` when given; a fixed ``seed`` keeps the seating
+    stable between renders.  ``chart_args`` go to
+    :func:`~.pdf.create_seat_chart`, e.g. ``documents`` or ``optimize``.
+    """
+
+    output_path: str
+    layout_path: Optional[str] = "seat_layout.json"
+    roster_path: Optional[str] = None
+    session_path: Optional[str] = None
+    title: Optional[str] = None
+    image_path: Optional[str] = None
+    seed: Optional[int] = None
+    pattern: Optional[Pattern] = None
+    chart_args: Dict[str, Any] = field(default_factory=dict)
+
+    def inputs(self) -> List[Path]:
+        paths = [self.layout_path, self.roster_path]
+        if self.session_path:
+            paths += [self.session_path, str(journal_path(self.session_path))]
+        return [Path(p).resolve() for p in paths if p]
+
+
+def fingerprint(path: Path) -> Fingerprint:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def content_digest(path: Path) -> Optional[str]:
+    try:
+        return hashlib.sha1(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+class PollingWatcher:
+    """Report changed files by comparing ``stat`` results."""
+
+    def __init__(self, paths: Iterable[Path], interval: float = 0.5) -> None:
+        self.interval = interval
+        self.stats: Dict[Path, Fingerprint] = {p: fingerprint(p) for p in paths}
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path, old in self.stats.items():
+                new = fingerprint(path)
+                if new != old:
+                    self.stats[path] = new
+                    changed.add(path)
+            if changed:
+                return changed
+            delay = self.interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return set()
+                delay = min(delay, remaining)
+            time.sleep(delay)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Report changed files with Linux inotify through ``ctypes``.
+
+    The parent directories are watched rather than the files themselves so
+    that files replaced by a rename (atomic saves) keep being tracked.
+    """
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, paths: Iterable[Path]) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = set(paths)
+        self.dirs: Dict[int, Path] = {}
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        for directory in {p.parent for p in self.paths}:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+            self.dirs[wd] = directory
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, _mask, _cookie, length = self._EVENT.unpack_from(data, offset)
+                offset += self._EVENT.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                path = self.dirs.get(wd, Path()) / name
+                if path in self.paths:
+                    changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def make_watcher(paths: Iterable[Path], poll_interval: float = 0.5, use_inotify: bool = True):
+    """Return an inotify watcher where available, a polling one otherwise."""
+    paths = list(paths)
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(paths, poll_interval)
+
+
+class ChartWatcher:
+    """Render targets once and then again whenever their inputs change.
+
+    ``roster`` is used for targets without a ``roster_path``.  Parsed
+    layouts and rosters are cached by content digest, so a file that is
+    saved without changes costs a hash and nothing else.
+    """
+
+    def __init__(
+        self,
+        targets: Iterable[WatchTarget],
+        roster: Iterable[Mapping[str, Any]] = (),
+        debounce: float = 0.3,
+        poll_interval: float = 0.5,
+        use_inotify: bool = True,
+        on_render: Optional[Callable[[WatchTarget, float], None]] = None,
+        on_error: Optional[Callable[[WatchTarget, Exception], None]] = None,
+    ) -> None:
+        self.targets = list(targets)
+        self.roster = list(roster)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.on_render = on_render
+        self.on_error = on_error
+        self.renders = 0
+        self._digests: Dict[Path, Optional[str]] = {}
+        self._rendered: Dict[int, Tuple[Optional[str], ...]] = {}
+        self._layouts: Dict[Tuple[Path, Optional[str]], List[List[Optional[int]]]] = {}
+        self._rosters: Dict[Tuple[Path, Optional[str]], List[Dict[str, Any]]] = {}
+
+    def _digest(self, path: Path) -> Optional[str]:
+        if path not in self._digests:
+            self._digests[path] = content_digest(path)
+        return self._digests[path]
+
+    def _layout(self, target: WatchTarget) -> List[List[Optional[int]]]:
+        if not target.layout_path:
+            return DEFAULT_SEAT_ROWS
+        path = Path(target.layout_path).resolve()
+        key = (path, self._digest(path))
+        if key not in self._layouts:
+            self._layouts = {k: v for k, v in self._layouts.items() if k[0] != path}
+            self._layouts[key] = load_layout(path)
+        return self._layouts[key]
+
+    def _roster(self, target: WatchTarget) -> List[Dict[str, Any]]:
+        if not target.roster_path:
+            return self.roster
+        path = Path(target.roster_path).resolve()
+        key = (path, self._digest(path))
+        if key not in self._rosters:
+            self._rosters = {k: v for k, v in self._rosters.items() if k[0] != path}
+            self._rosters[key] = load_roster(path)
+        return self._rosters[key]
+
+    def render(self, target: WatchTarget) -> None:
+        from .pdf import create_seat_chart
+
+        roster = self._roster(target)
+        title = target.title or "席替え座席表"
+        if target.session_path:
+            state, meta = load_session(target.session_path, roster)
+            title = target.title or meta.get("title", title)
+            chart_args = dict(state=state)
+        else:
+            seat_rows = self._layout(target)
+            if target.pattern is None:
+                students = simple_shuffle(roster, seat_rows, seed=target.seed)
+            else:
+                students = pattern_shuffle(roster, seat_rows, target.pattern, seed=target.seed)
+            chart_args = dict(students=students, seat_rows=seat_rows, roster=roster)
+        chart_args.update(target.chart_args)
+        create_seat_chart(
+            title=title,
+            output_path=target.output_path,
+            image_path=target.image_path,
+            **chart_args,
+        )
+
+    def render_changed(self, changed: Optional[Set[Path]] = None) -> List[WatchTarget]:
+        """Render the targets whose input contents differ from last time.
+
+        ``changed`` limits rehashing to those paths; ``None`` rehashes all.
+        """
+        if changed is None:
+            self._digests.clear()
+        else:
+            for path in changed:
+                self._digests.pop(path, None)
+        rendered = []
+        for index, target in enumerate(self.targets):
+            digests = tuple(self._digest(p) for p in target.inputs())
+            if self._rendered.get(index) == digests:
+                continue
+            start = time.perf_counter()
+            try:
+                self.render(target)
+            except Exception as exc:
+                if self.on_error is None:
+                    raise
+                self.on_error(target, exc)
+                continue
+            self._rendered[index] = digests
+            self.renders += 1
+            rendered.append(target)
+            if self.on_render is not None:
+                self.on_render(target, time.perf_counter() - start)
+        return rendered
+
+    def run(self, should_stop: Callable[[], bool] = lambda: False) -> None:
+        """Render everything, then watch until ``should_stop`` returns true."""
+        paths = {p for target in self.targets for p in target.inputs()}
+        watcher = make_watcher(paths, self.poll_interval, self.use_inotify)
+        try:
+            self.render_changed()
+            while not should_stop():
+                changed = watcher.wait(self.poll_interval)
+                if not changed:
+                    continue
+                # Collect the rest of the burst before rendering.
+                while True:
+                    more = watcher.wait(self.debounce)
+                    if not more:
+                        break
+                    changed |= more
+                self.render_changed(changed)
+        finally:
+            watcher.close()
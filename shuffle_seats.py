@@ -2,25 +2,297 @@
 
 from __future__ import annotations
 
+import argparse
+import os
 import re
+import sys
+from typing import Any, Dict, List, Optional
 
-from seat_chart_generator import create_seat_chart, load_layout, simple_shuffle
+from seat_chart_generator import SeatChartError, create_seat_chart, load_layout, simple_shuffle
+from seat_chart_generator.diff import diff_assignments, write_moves
+from seat_chart_generator.documents import DOCUMENTS
+from seat_chart_generator.models import Student
+from seat_chart_generator.optimize import OutputOptions
+from seat_chart_generator.pattern import PATTERN_ALIASES, PATTERNS, mismatches, pattern_shuffle
+from seat_chart_generator.roster import load_roster
+from seat_chart_generator.session import load_session
+from seat_chart_generator.validate import ERROR, Conflict, errors, validate_request, validate_state
 from students import STUDENTS, COMMITTEES
 
+# Seed of --watch renders without --seed: a change of the input files must
+# not reshuffle the whole class.
+WATCH_SEED = 0
+
 
 def main() -> None:
-    seat_rows = load_layout()
-    students = simple_shuffle(STUDENTS, seat_rows)
-    title = "席替え座席表"
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--layout", default="seat_layout.json", help="seat layout JSON file"
+    )
+    parser.add_argument(
+        "--roster", help="roster export (CSV or JSON) instead of students.py"
+    )
+    parser.add_argument(
+        "--session",
+        help="render the seating saved by the GUI in this session file",
+    )
+    parser.add_argument(
+        "--shuffle",
+        action="store_true",
+        help="with --session, reshuffle the free seats while keeping pins",
+    )
+    parser.add_argument("--title", help="chart title")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and re-render when the input files change",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help=f"random seed; --watch uses {WATCH_SEED} unless given so that "
+        "re-renders keep the seating",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="read --roster lazily and write one PDF per room (low memory)",
+    )
+    parser.add_argument(
+        "--sessions",
+        type=int,
+        help="plan this many exam sessions in which nobody sits next to or "
+        "behind the same person twice, one chart each",
+    )
+    parser.add_argument(
+        "--output-dir", default="rooms", help="directory for --stream and --sessions output"
+    )
+    parser.add_argument(
+        "--pattern",
+        help="gender pattern for the shuffle: " + ", ".join(PATTERNS)
+        + ", or a file with one row of M/F/* per line",
+    )
+    parser.add_argument(
+        "--documents",
+        help="comma separated extra pages: class_list, committees, attendance",
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="shrink the PDF and PNG files for archiving and report the bytes saved",
+    )
+    parser.add_argument(
+        "--png-max-kb", type=int, help="with --optimize, downscale PNGs above this size"
+    )
+    parser.add_argument(
+        "--embed-font", help="with --optimize, embed a subset of this TrueType font"
+    )
+    parser.add_argument(
+        "--moves",
+        help="write the move list (.csv or .pdf) against the session before "
+        "--shuffle, or against the previous --stream run",
+    )
+    args = parser.parse_args()
+    documents = [d.strip() for d in args.documents.split(",") if d.strip()] if args.documents else []
+    unknown = set(documents) - set(DOCUMENTS)
+    if unknown:
+        parser.error(f"unknown document: {', '.join(sorted(unknown))}")
+    pattern = read_pattern(parser, args.pattern) if args.pattern else None
+    optimize = None
+    if args.optimize:
+        optimize = OutputOptions(
+            png_max_bytes=args.png_max_kb * 1024 if args.png_max_kb else None,
+            font_path=args.embed_font,
+        )
+    elif args.png_max_kb or args.embed_font:
+        parser.error("--png-max-kb and --embed-font require --optimize")
+    if args.moves and not (args.stream or (args.session and args.shuffle)):
+        parser.error("--moves requires --session with --shuffle, or --stream")
+
+    if args.watch:
+        for flag in ("shuffle", "stream", "sessions"):
+            if getattr(args, flag):
+                parser.error(f"--watch cannot be combined with --{flag}")
+        watch(args, pattern, documents, optimize)
+        return
+    if args.sessions:
+        rotation(parser, args)
+        return
+    if args.stream:
+        if not args.roster:
+            parser.error("--stream requires --roster")
+        stream(args, optimize)
+        return
+    roster = load_roster(args.roster) if args.roster else STUDENTS
+    title = args.title or "席替え座席表"
+    if args.session:
+        state, meta = load_session(args.session, roster)
+        title = args.title or meta.get("title", title)
+        if args.shuffle:
+            before = dict(state.assignments)
+            validate_or_exit(parser, validate_state(state, roster))
+            state.apply_shuffle(shuffle(roster, pattern, seed=args.seed, state=state))
+            if args.moves:
+                diff = diff_assignments(before, state.assignments)
+                write_moves(diff, args.moves, f"{title} 移動リスト")
+                print(f"{len(diff.moves)}人の移動リストを {args.moves} に保存しました")
+        chart_args = dict(
+            students=state.students(),
+            seat_rows=state.seat_rows,
+            fixed_seat_numbers=state.fixed,
+            empty_seat_texts=state.empty,
+        )
+    else:
+        seat_rows = load_layout(args.layout)
+        validate_or_exit(parser, validate_request(roster, seat_rows))
+        chart_args = dict(
+            students=shuffle(roster, pattern, seat_rows, seed=args.seed), seat_rows=seat_rows
+        )
     safe_title = re.sub(r'[\\/:*?"<>|]', "_", title)
-    create_seat_chart(
-        students,
-        seat_rows=seat_rows,
-        committees=COMMITTEES,
-        title=title,
+    try:
+        report = create_seat_chart(
+            committees=COMMITTEES,
+            title=title,
+            output_path=f"{safe_title}.pdf",
+            image_path=f"{safe_title}.png",
+            documents=documents,
+            roster=roster,
+            optimize=optimize,
+            validate=True,
+            **chart_args,
+        )
+    except SeatChartError as exc:
+        parser.exit(1, f"{exc}\n")
+    if report is not None:
+        print(f"最適化: {report.summary()}")
+
+
+def read_pattern(parser: argparse.ArgumentParser, value: str) -> str | List[str]:
+    """A named pattern, or the rows of a pattern file."""
+    if value in PATTERNS or value in PATTERN_ALIASES:
+        return value
+    if not os.path.exists(value):
+        parser.error(f"unknown pattern: {value}")
+    with open(value, encoding="utf-8") as fh:
+        return [line.rstrip("\n") for line in fh if line.strip()]
+
+
+def shuffle(
+    roster: List[Dict[str, Any]],
+    pattern: str | List[str] | None,
+    seat_rows: List[List[Optional[int]]] | None = None,
+    **kwargs: Any,
+) -> List[Student]:
+    """Shuffle at random, or towards ``pattern`` and report how close it got."""
+    if pattern is None:
+        return simple_shuffle(roster, seat_rows, **kwargs)
+    students = pattern_shuffle(roster, seat_rows, pattern, **kwargs)
+    rows = seat_rows if seat_rows is not None else kwargs["state"].seat_rows
+    missed = mismatches(students, rows, pattern)
+    if missed:
+        print(f"{missed}人は並びどおりにできませんでした", file=sys.stderr)
+    return students
+
+
+def validate_or_exit(parser: argparse.ArgumentParser, conflicts: List[Conflict]) -> None:
+    """Print every conflict; stop before shuffling if any is an error."""
+    for conflict in conflicts:
+        label = "エラー" if conflict.severity == ERROR else "警告"
+        print(f"{label}: {conflict}", file=sys.stderr)
+    if errors(conflicts):
+        parser.exit(1, f"{len(errors(conflicts))}件のエラーがあるため座席表を作成しません\n")
+
+
+def rotation(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    from seat_chart_generator.rotation import plan_rotation
+
+    roster = load_roster(args.roster) if args.roster else STUDENTS
+    title = args.title or "座席表"
+    if args.session:
+        state, meta = load_session(args.session, roster)
+        title = args.title or meta.get("title", title)
+        validate_or_exit(parser, validate_state(state, roster))
+        plan = plan_rotation(roster, sessions=args.sessions, seed=args.seed, state=state)
+        chart_args = dict(fixed_seat_numbers=state.fixed, empty_seat_texts=state.empty)
+    else:
+        seat_rows = load_layout(args.layout)
+        validate_or_exit(parser, validate_request(roster, seat_rows))
+        plan = plan_rotation(roster, seat_rows, args.sessions, seed=args.seed)
+        chart_args = {}
+    for number, conflicts in enumerate(plan.conflicts, start=1):
+        for conflict in conflicts:
+            print(f"警告: 第{number}回 {conflict}", file=sys.stderr)
+    safe_title = re.sub(r'[\\/:*?"<>|]', "_", title)
+    paths = plan.write_charts(
+        args.output_dir, safe_title, title, committees=COMMITTEES, **chart_args
+    )
+    print(f"{len(paths)}回分の座席表を {args.output_dir} に保存しました")
+    if plan.repeats:
+        print(f"{plan.repeats}組は同じ人と再び隣になります")
+
+
+def stream(args: argparse.Namespace, optimize: Optional[OutputOptions] = None) -> None:
+    from seat_chart_generator.roster import iter_roster
+    from seat_chart_generator.stream import stream_seat_charts
+
+    report = stream_seat_charts(
+        iter_roster(args.roster),
+        load_layout(args.layout),
+        args.output_dir,
+        measure_memory=True,
+        moves_path=args.moves,
+        moves_title=f"{args.title or '座席表'} 移動リスト",
+        title=args.title or "座席表",
+        seed=args.seed,
+        optimize=optimize,
+    )
+    print(f"{len(report.rooms)}室 / {report.students}人の座席表を {args.output_dir} に保存しました")
+    reused = len(report.rooms) - len(report.rendered)
+    if reused:
+        print(f"変更のない{reused}室は前回の座席表をそのまま使いました")
+    if args.moves:
+        if report.moves is None:
+            print("前回の結果がないため移動リストは作成しません")
+        else:
+            rooms = "、".join(f"第{room}室" for room in sorted(report.moves.pages))
+            print(f"{report.moves.moved}人の移動リストを {args.moves} に保存しました ({rooms or '変更なし'})")
+    if optimize is not None:
+        print(f"最適化: {report.saved_bytes:,} バイト削減")
+    print(f"ピークメモリ: {report.peak_bytes / (1024 * 1024):.1f} MB")
+
+
+def watch(
+    args: argparse.Namespace,
+    pattern: str | List[str] | None,
+    documents: List[str],
+    optimize: Optional[OutputOptions],
+) -> None:
+    from seat_chart_generator.watch import ChartWatcher, WatchTarget
+
+    title = args.title or "席替え座席表"
+    safe_title = re.sub(r'[\\/:*?"<>|]', "_", title)
+    target = WatchTarget(
         output_path=f"{safe_title}.pdf",
+        layout_path=None if args.session else args.layout,
+        roster_path=args.roster,
+        session_path=args.session,
+        title=args.title,
         image_path=f"{safe_title}.png",
+        seed=WATCH_SEED if args.seed is None else args.seed,
+        pattern=pattern,
+        chart_args={"committees": COMMITTEES, "documents": documents, "optimize": optimize},
+    )
+    watcher = ChartWatcher(
+        [target],
+        roster=STUDENTS,
+        on_render=lambda t, secs: print(f"{t.output_path} を更新しました ({secs:.2f}秒)"),
+        on_error=lambda t, exc: print(f"{t.output_path} の作成に失敗しました: {exc}"),
     )
+    print("入力ファイルを監視しています (Ctrl+C で終了)")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
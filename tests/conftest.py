@@ -0,0 +1,42 @@
+"""Shared fixtures: a small roster and layout independent of students.py."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def record(serial: int, gender: str = "M", status: str = "在籍") -> Dict[str, Any]:
+    return {
+        "serial": serial,
+        "student_id": f"S{serial:04d}",
+        "name_kanji": f"生徒{serial:02d}",
+        "name_kana": f"せいと{serial:02d}",
+        "gender": gender,
+        "status": status,
+    }
+
+
+@pytest.fixture
+def make_roster():
+    """Return a factory for ``count`` roster records, alternating M and F."""
+
+    def make(count: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        return [record(n, "MF"[(n - 1) % 2], **kwargs) for n in range(1, count + 1)]
+
+    return make
+
+
+@pytest.fixture
+def roster(make_roster) -> List[Dict[str, Any]]:
+    return make_roster(6)
+
+
+@pytest.fixture
+def seat_rows() -> List[List[Any]]:
+    return [[1, 2, 3], [4, None, 5], [6, 7, 8]]
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import csv
+import random
+
+from seat_chart_generator.diff import (
+    CSV_HEADER,
+    MoveWriter,
+    PlanDiff,
+    diff_assignments,
+    write_moves,
+    write_moves_csv,
+)
+from seat_chart_generator.models import Student
+
+
+def student(serial: int, seat: int = 0) -> Student:
+    return Student(seat, serial, f"S{serial:04d}", f"生徒{serial:02d}", f"せいと{serial:02d}")
+
+
+def plan(seats):
+    """``{seat: serial}`` to ``{seat: Student}``; new Student objects every
+    time, as after reloading a session."""
+    return {
+        seat: student(serial, seat[1] if isinstance(seat, tuple) else seat)
+        for seat, serial in seats.items()
+    }
+
+
+def room(seats, number):
+    return {key: value for key, value in seats.items() if key[0] == number}
+
+
+def moves_of(diff):
+    return {m.student.serial: (m.source, m.target) for m in diff.moves}
+
+
+def test_swap_is_a_cycle_of_two():
+    diff = diff_assignments(plan({1: 1, 2: 2, 3: 3}), plan({1: 2, 2: 1, 3: 3}))
+    assert moves_of(diff) == {1: (1, 2), 2: (2, 1)}
+    assert diff.unchanged == 1
+    assert [sorted(c) for c in diff.cycles] == [[1, 2]]
+    assert diff.swaps == diff.cycles
+    assert diff.chains == []
+
+
+def test_cycles_chains_arrivals_and_departures():
+    old = plan({1: 1, 2: 2, 3: 3, 4: 4, 5: 5, 9: 9})
+    # 1 -> 2 -> 3 -> 1 rotate, 4 moves on to free seat 6 and 5 follows into
+    # 4, 9 leaves and 10 arrives at 7.
+    new = plan({2: 1, 3: 2, 1: 3, 6: 4, 4: 5, 7: 10})
+    diff = diff_assignments(old, new)
+    assert moves_of(diff) == {
+        1: (1, 2),
+        2: (2, 3),
+        3: (3, 1),
+        4: (4, 6),
+        5: (5, 4),
+        9: (9, None),
+        10: (None, 7),
+    }
+    assert len(diff.cycles) == 1 and sorted(diff.cycles[0]) == [1, 2, 3]
+    assert diff.chains == [[5, 4, 6]]
+    assert diff.swaps == []
+    assert diff.affected_seats == {1, 2, 3, 4, 5, 6, 7, 9}
+    groups = diff.group_of()
+    assert groups[1] == groups[2] == groups[3] != groups[5] == groups[4] == groups[6]
+
+
+def test_decomposition_covers_every_move_once():
+    rng = random.Random(7)
+    seats = list(range(1, 61))
+    old = plan({seat: seat for seat in seats[:50]})
+    targets = rng.sample(seats, 50)
+    new = plan({seat: serial for seat, serial in zip(targets, range(1, 51))})
+    diff = diff_assignments(old, new)
+    steps = set()
+    for cycle in diff.cycles:
+        steps |= set(zip(cycle, cycle[1:] + cycle[:1]))
+    for chain in diff.chains:
+        steps |= set(zip(chain, chain[1:]))
+    seated = {(s, t) for s, t in moves_of(diff).values() if s is not None and t is not None}
+    assert steps == seated
+    sources = {s for s, _ in seated}
+    for chain in diff.chains:
+        assert chain[0] not in {t for _, t in seated} and chain[-1] not in sources
+    assert diff.unchanged + len(diff.moves) == 50
+
+
+def test_rooms_compared_one_at_a_time_merge_into_one_move():
+    old = plan({(1, 1): 1, (1, 2): 2, (2, 1): 3})
+    new = plan({(1, 1): 1, (2, 2): 2, (2, 1): 3})
+    whole = diff_assignments(old, new)
+    assert moves_of(whole) == {2: ((1, 2), (2, 2))}
+    assert whole.pages() == {1, 2}
+
+    halves = [diff_assignments(room(old, r), room(new, r)) for r in (1, 2)]
+    assert moves_of(halves[0]) == {2: ((1, 2), None)}
+    merged = PlanDiff.from_moves([m for d in halves for m in d.moves])
+    assert moves_of(merged) == moves_of(whole)
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8-sig", newline="") as fh:
+        rows = list(csv.reader(fh))
+    assert rows[0] == CSV_HEADER
+    return rows[1:]
+
+
+def test_csv_lists_moves_with_groups(tmp_path):
+    diff = diff_assignments(plan({1: 1, 2: 2}), plan({1: 2, 2: 1, 3: 3}))
+    path = tmp_path / "moves.csv"
+    write_moves_csv(diff, path)
+    rows = read_rows(path)
+    assert [row[2:5] for row in rows] == [
+        ["生徒01", "1", "2"],
+        ["生徒02", "2", "1"],
+        ["生徒03", "-", "3"],
+    ]
+    assert rows[0][5] == rows[1][5] != "" and rows[2][5] == ""
+
+
+def test_write_moves_picks_the_format_by_suffix(tmp_path):
+    diff = diff_assignments(plan({1: 1, 2: 2}), plan({1: 2, 2: 1}))
+    write_moves(diff, tmp_path / "moves.pdf", "テスト")
+    write_moves(diff, tmp_path / "moves.csv")
+    assert (tmp_path / "moves.pdf").read_bytes().startswith(b"%PDF")
+    assert len(read_rows(tmp_path / "moves.csv")) == 2
+
+
+def test_move_writer_matches_whole_diff(tmp_path):
+    rng = random.Random(3)
+    rooms, per_room = 4, 10
+    keys = [(r, s) for r in range(1, rooms + 1) for s in range(1, per_room + 1)]
+    old = plan({key: n for n, key in enumerate(keys, start=1)})
+    shuffled = list(range(1, len(keys) - 2))  # three students leave
+    rng.shuffle(shuffled)
+    new = plan(dict(zip(keys, shuffled + [100])))  # one arrives
+    whole = diff_assignments(old, new)
+
+    path = tmp_path / "moves.csv"
+    with MoveWriter(path) as writer:
+        for r in range(1, rooms + 1):
+            writer.add(diff_assignments(room(old, r), room(new, r)))
+    counts = writer.counts
+    assert counts.moved == len(whole.moves)
+    assert counts.unchanged == whole.unchanged
+    assert counts.pages == whole.pages()
+    streamed = sorted(row[:5] for row in read_rows(path))
+    reference = tmp_path / "reference.csv"
+    write_moves_csv(whole, reference)
+    assert streamed == sorted(row[:5] for row in read_rows(reference))
+
+
+def test_move_writer_without_file_only_counts(tmp_path):
+    writer = MoveWriter()
+    writer.add(diff_assignments(plan({1: 1, 2: 2}), plan({1: 2, 2: 1})))
+    counts = writer.close()
+    assert (counts.moved, counts.unchanged, counts.pages) == (2, 0, {1})
+
+
+def test_move_writer_pdf(tmp_path):
+    path = tmp_path / "moves.pdf"
+    with MoveWriter(path, "テスト") as writer:
+        writer.add(diff_assignments(plan({1: 1, 2: 2}), plan({1: 2, 2: 1})))
+    assert path.read_bytes().startswith(b"%PDF")
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import pymupdf
+import pytest
+
+from seat_chart_generator.documents import (
+    RosterIndex,
+    attendance_pages,
+    class_list_pages,
+    create_class_charts,
+    resolve_committees,
+)
+from seat_chart_generator.models import Student
+from seat_chart_generator.pdf import create_seat_chart
+
+ROWS = [[1, 2], [3, 4]]
+
+
+def page_texts(path):
+    with pymupdf.open(str(path)) as doc:
+        return [page.get_text() for page in doc]
+
+
+def lines(text, start, end=None):
+    """The lines of ``text`` after the line ``start`` and before ``end``."""
+    found = text.splitlines()
+    found = found[found.index(start) + 1 :]
+    return found[: found.index(end)] if end else found
+
+
+def test_roster_index_lookups(roster):
+    index = RosterIndex(reversed(roster), {4: Student(4, 2, "S0002", "生徒02", "せいと02")})
+    assert [r["serial"] for r in index.records] == [1, 2, 3, 4, 5, 6]
+    for ref in ("生徒03", "S0003", 3, " 3 ", "せいと03"):
+        assert index.lookup(ref)["name_kanji"] == "生徒03"
+    found, missing = index.resolve(["S0001", "転校生", 6])
+    assert [r["name_kanji"] for r in found] == ["生徒01", "生徒06"]
+    assert missing == ["転校生"]
+    assert index.seat_of(index.lookup("生徒02")) == 4
+    assert index.seat_of(index.lookup("生徒01")) is None
+    assert resolve_committees([("図書", ["S0001", "誰か"])], index) == [("図書", ["生徒01", "誰か"])]
+
+
+def test_names_are_not_shadowed_by_serial_numbers():
+    index = RosterIndex(
+        [
+            {"serial": 1, "student_id": "7", "name_kanji": "一", "name_kana": "いち"},
+            {"serial": 7, "student_id": "A7", "name_kanji": "1", "name_kana": "なな"},
+        ]
+    )
+    assert index.lookup("1")["name_kana"] == "なな"  # the name, not serial 1
+    assert index.lookup("7")["name_kanji"] == "一"  # the student ID, not serial 7
+
+
+def test_documents_follow_the_chart_in_order(roster, tmp_path):
+    roster[5]["status"] = "休学"
+    students = [Student.from_record(r, seat) for r, seat in zip(roster[:4], (4, 3, 2, 1))]
+    path = tmp_path / "chart.pdf"
+    create_seat_chart(
+        students,
+        seat_rows=ROWS,
+        output_path=str(path),
+        title="1組",
+        roster=roster,
+        committees=[("図書委員", ["S0002", "誰か"]), ("保健委員", [5])],
+        documents=["attendance", "class_list", "committees"],
+    )
+    chart, attendance, class_list, committees = page_texts(path)
+    assert "1組" in chart
+    assert attendance.startswith("1組 出席簿")
+    assert class_list.startswith("1組 名簿")
+    assert committees.startswith("1組 委員会名簿")
+    # Everyone on the roster in serial order, with their seats.
+    assert lines(class_list, "状況")[:7] == ["1", "S0001", "生徒01", "せいと01", "男", "4", "在籍"]
+    assert [line for line in lines(class_list, "状況") if line.startswith("生徒")] == [
+        f"生徒{n:02d}" for n in range(1, 7)
+    ]
+    assert lines(class_list, "S0006")[-2:] == ["女", "休学"]
+    # Members are resolved by ID or serial; unknown members stay as written.
+    assert lines(committees, "席") == [
+        "図書委員", "2", "S0002", "生徒02", "3", "誰か",
+        "保健委員", "5", "S0005", "生徒05",
+    ]  # fmt: skip
+    assert lines(attendance, "生徒06") == ["休学"]
+
+
+def test_long_lists_continue_on_more_pages(make_roster):
+    index = RosterIndex(make_roster(120))
+    pages = class_list_pages(index, "名簿")
+    assert len(pages) == 3
+    headings = [page.items[0].text for page in pages]
+    assert headings == ["名簿 (1/3)", "名簿 (2/3)", "名簿 (3/3)"]
+    assert len(attendance_pages(RosterIndex(make_roster(10)))) == 1
+
+
+def test_unknown_document(roster, tmp_path):
+    with pytest.raises(ValueError):
+        create_seat_chart(
+            [],
+            seat_rows=ROWS,
+            output_path=str(tmp_path / "x.pdf"),
+            roster=roster,
+            documents=["diary"],
+        )
+
+
+def test_one_file_per_class(roster, tmp_path):
+    classes = {
+        "1/A": {"students": [Student.from_record(roster[0], 1)], "roster": roster[:3]},
+        "1/B": {"students": [Student.from_record(roster[3], 2)], "roster": roster[3:]},
+    }
+    paths = create_class_charts(classes, tmp_path, documents=["class_list"], seat_rows=ROWS)
+    assert paths == [str(tmp_path / "1_A.pdf"), str(tmp_path / "1_B.pdf")]
+    texts = page_texts(paths[1])
+    assert len(texts) == 2 and texts[1].startswith("1/B 名簿")
+    assert "生徒04" in texts[1] and "生徒01" not in texts[1]
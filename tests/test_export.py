@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from seat_chart_generator import export
+from seat_chart_generator.export import CANCELLED, DONE, FAILED, ExportQueue, _replacing
+from seat_chart_generator.models import Student
+
+ROWS = [[1, 2], [3, 4]]
+
+
+def students():
+    return [Student(n, n, f"S{n:04d}", f"生徒{n:02d}", f"せいと{n:02d}") for n in (1, 2, 3)]
+
+
+def wait(exports, count=1, timeout=30.0):
+    finished = []
+    deadline = time.monotonic() + timeout
+    while len(finished) < count and time.monotonic() < deadline:
+        finished += exports.poll()
+        time.sleep(0.01)
+    assert len(finished) == count
+    return finished
+
+
+def test_submit_copies_the_caller_state(tmp_path):
+    exports = ExportQueue()
+    seated = students()
+    fixed = {1}
+    empty = {4: ("教卓", "black")}
+    job = exports.submit(
+        str(tmp_path / "chart.pdf"),
+        students=seated,
+        seat_rows=ROWS,
+        fixed_seat_numbers=fixed,
+        empty_seat_texts=empty,
+    )
+    # Edits made while the export runs do not reach it.
+    seated[0].name_kanji = "変更後"
+    fixed.add(2)
+    empty.clear()
+    assert job.chart_args["students"][0].name_kanji == "生徒01"
+    assert job.chart_args["students"][0] is not seated[0]
+    assert job.chart_args["fixed_seat_numbers"] == [1]
+    assert job.chart_args["empty_seat_texts"] == {4: ("教卓", "black")}
+    [done] = wait(exports)
+    assert done is job and job.status == DONE
+    assert (tmp_path / "chart.pdf").read_bytes().startswith(b"%PDF")
+    assert exports.pending() == 0
+
+
+def test_failed_job_does_not_stop_the_queue(tmp_path):
+    exports = ExportQueue()
+    bad = exports.submit(str(tmp_path / "bad.pdf"), students=students(), no_such_option=1)
+    good = exports.submit(str(tmp_path / "good.png"), students=students(), seat_rows=ROWS)
+    wait(exports, 2)
+    assert bad.status == FAILED and isinstance(bad.error, TypeError)
+    assert good.status == DONE
+    assert (tmp_path / "good.png").read_bytes().startswith(b"\x89PNG")
+
+
+def test_failed_export_keeps_the_old_file(tmp_path, monkeypatch):
+    path = tmp_path / "chart.pdf"
+    path.write_bytes(b"old chart")
+
+    def half_written(output_path, **chart_args):
+        with open(output_path, "wb") as fh:
+            fh.write(b"%PDF-1.4 trunc")
+        raise OSError("disk full")
+
+    exports = ExportQueue()
+    with monkeypatch.context() as patch:
+        patch.setattr(export, "create_seat_chart", half_written)
+        job = exports.submit(str(path), students=students(), seat_rows=ROWS)
+        wait(exports)
+    assert job.status == FAILED and isinstance(job.error, OSError)
+    assert path.read_bytes() == b"old chart"
+    assert [p.name for p in tmp_path.iterdir()] == ["chart.pdf"]
+
+    exports.submit(str(path), students=students(), seat_rows=ROWS)
+    wait(exports)
+    assert path.read_bytes().startswith(b"%PDF")
+
+
+def test_replacing_is_all_or_nothing(tmp_path):
+    path = tmp_path / "out.txt"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with _replacing(str(path)) as tmp:
+            with open(tmp, "w") as fh:
+                fh.write("half")
+            raise RuntimeError
+    assert path.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.txt"]
+    with _replacing(str(path)) as tmp:
+        with open(tmp, "w") as fh:
+            fh.write("new")
+    assert path.read_text() == "new"
+
+
+def test_cancel_between_pdf_and_png(tmp_path, monkeypatch):
+    pdf_written = threading.Event()
+    go_on = threading.Event()
+    check = ExportQueue._check
+
+    def pausing_check(self, job):
+        pdf_written.set()
+        go_on.wait(10)
+        check(self, job)
+
+    monkeypatch.setattr(ExportQueue, "_check", pausing_check)
+    exports = ExportQueue()
+    running = exports.submit(str(tmp_path / "chart.png"), students=students(), seat_rows=ROWS)
+    queued = exports.submit(str(tmp_path / "later.pdf"), students=students(), seat_rows=ROWS)
+    assert pdf_written.wait(30)
+    assert exports.current() is running
+    exports.cancel()
+    go_on.set()
+    assert {job.job_id for job in wait(exports, 2)} == {running.job_id, queued.job_id}
+    assert running.status == queued.status == CANCELLED
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from seat_chart_generator.history import DELETE, History, PersistentMap
+from seat_chart_generator.state import ClassroomState
+
+
+class Collide:
+    """Key with a fixed hash, to force shared buckets."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __hash__(self) -> int:
+        return 7
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Collide) and other.name == self.name
+
+
+def test_persistent_map_matches_dict():
+    rng = random.Random(1)
+    pmap, expected = PersistentMap(), {}
+    versions = []
+    for _ in range(300):
+        batch = [(rng.randrange(200), rng.random()) for _ in range(rng.randrange(1, 6))]
+        batch += [(rng.randrange(200), DELETE)]
+        versions.append((pmap, dict(expected)))
+        pmap = pmap.update(batch)
+        for key, value in batch:
+            if value is DELETE:
+                expected.pop(key, None)
+            else:
+                expected[key] = value
+        assert len(pmap) == len(expected)
+    assert dict(pmap.items()) == expected
+    # Older versions are unaffected by later updates.
+    for old, contents in versions[::50]:
+        assert dict(old.items()) == contents
+
+
+def test_diff_reports_exactly_the_changed_keys():
+    base = PersistentMap.from_items((n, n) for n in range(500))
+    changed = base.update([(3, "x"), (499, DELETE), (1000, 1)])
+    assert set(base.diff(changed)) == {3, 499, 1000}
+    assert list(base.diff(base)) == []
+
+
+def test_colliding_keys_share_a_bucket():
+    a, b = Collide("a"), Collide("b")
+    pmap = PersistentMap.from_items([(a, 1), (b, 2)])
+    assert pmap.get(a) == 1 and pmap.get(b) == 2
+    smaller = pmap.delete(a)
+    assert a not in smaller and smaller.get(b) == 2 and len(smaller) == 1
+    assert set(pmap.diff(smaller)) == {a}
+
+
+@pytest.fixture
+def state(seat_rows, roster):
+    return ClassroomState(seat_rows, roster)
+
+
+def assignment(state):
+    return {seat: s.name_kanji for seat, s in state.assignments.items()}
+
+
+def test_undo_redo_round_trip(state):
+    history = History(state)
+    state.place_name(1, "生徒01")
+    history.record("place")
+    state.place_name(2, "生徒01")
+    state.set_text(3, "教卓")
+    history.record("move")
+    after = (assignment(state), dict(state.empty), set(state.fixed))
+
+    assert history.undo()
+    assert assignment(state) == {1: "生徒01"}
+    assert state.fixed_names == {"生徒01": 1}
+    assert state.empty == {}
+    assert history.undo()
+    assert assignment(state) == {} and state.fixed == set()
+    assert not history.undo()
+
+    assert history.redo() and history.redo()
+    assert (assignment(state), dict(state.empty), set(state.fixed)) == after
+    assert not history.can_redo()
+
+
+def test_restore_notifies_only_changed_seats(state):
+    history = History(state)
+    state.place_name(1, "生徒01")
+    history.record()
+    state.place_name(5, "生徒02")
+    history.record()
+    seen = []
+    state.subscribe(seen.append)
+    history.undo()
+    assert seen == [{5}]
+
+
+def test_record_skips_unchanged_state_and_drops_redo(state):
+    history = History(state)
+    assert not history.record("nothing")
+    state.place_name(1, "生徒01")
+    history.record()
+    history.undo()
+    state.place_name(2, "生徒02")
+    history.record()
+    assert not history.can_redo()
+    assert len(history.entries) == 2
+
+
+def test_undo_across_layout_change(state, seat_rows):
+    history = History(state)
+    state.place_name(1, "生徒01")
+    history.record()
+    state.reset([[1, 2]])
+    history.record()
+    history.undo()
+    assert state.seat_rows is seat_rows
+    assert state.total_seats == 8
+    assert assignment(state) == {1: "生徒01"}
+
+
+def test_limit_keeps_newest_entries(state):
+    history = History(state, limit=3)
+    for seat in (1, 2, 3, 4):
+        state.place_name(seat, "生徒01")
+        history.record(str(seat))
+    assert [e.label for e in history.entries] == ["2", "3", "4"]
+
+
+def test_export_and_load(tmp_path, state, seat_rows, roster):
+    history = History(state)
+    state.place_name(1, "生徒01")
+    state.set_text(4, "補助机", "blue")
+    history.record("a")
+    state.place_name(6, "生徒01", fixed=False)
+    history.record("b")
+    history.undo()
+    path = tmp_path / "history.json"
+    history.export(path)
+
+    other = ClassroomState(seat_rows, roster)
+    loaded = History.load(path, other)
+    assert [e.label for e in loaded.entries] == ["開始", "a", "b"]
+    assert loaded.position == 1
+    assert assignment(other) == {1: "生徒01"}
+    assert other.empty == {4: ("補助机", "blue")}
+    loaded.redo()
+    assert assignment(other) == {6: "生徒01"}
+    assert other.fixed_names == {}
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+import random
+
+import pymupdf
+import pytest
+from PIL import Image
+
+from seat_chart_generator.models import Student
+from seat_chart_generator.optimize import (
+    FileSaving,
+    OptimizationReport,
+    OutputOptions,
+    _replace,
+    optimize_pdf,
+    optimize_png,
+)
+from seat_chart_generator.pdf import create_seat_chart
+
+ROWS = [[1, 2, 3], [4, 5, 6]]
+
+
+@pytest.fixture
+def chart(roster, tmp_path):
+    students = [Student.from_record(r, n) for n, r in enumerate(roster, start=1)]
+    path = tmp_path / "chart.pdf"
+    create_seat_chart(students, seat_rows=ROWS, output_path=str(path), documents=["class_list"])
+    return path
+
+
+def noise_png(path, size=(300, 200)):
+    rng = random.Random(1)
+    image = Image.new("RGB", size)
+    image.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(size[0] * size[1])])
+    image.save(path)
+    return path
+
+
+def test_options_are_frozen():
+    options = OutputOptions()
+    assert (options.compress, options.dedupe, options.png_colours) == (True, True, 256)
+    with pytest.raises(AttributeError):
+        options.compress = False
+
+
+def test_pdf_gets_smaller_and_stays_valid(chart):
+    with pymupdf.open(str(chart)) as doc:
+        texts = [page.get_text() for page in doc]
+    saving = optimize_pdf(str(chart))
+    assert saving.before > saving.after == os.path.getsize(chart)
+    with pymupdf.open(str(chart)) as doc:
+        assert [page.get_text() for page in doc] == texts
+
+
+def test_nothing_to_do(chart):
+    size = os.path.getsize(chart)
+    saving = optimize_pdf(str(chart), OutputOptions(compress=False, dedupe=False))
+    assert (saving.before, saving.after, saving.saved) == (size, size, 0)
+
+
+def test_file_that_would_grow_is_kept(tmp_path):
+    path = tmp_path / "small.bin"
+    path.write_bytes(b"12345")
+    assert _replace(str(path), b"123456", 5).saved == 0
+    assert path.read_bytes() == b"12345"
+    assert _replace(str(path), b"123", 5).saved == 2
+    assert path.read_bytes() == b"123"
+    assert [p.name for p in tmp_path.iterdir()] == ["small.bin"]
+
+
+def test_png_is_downscaled_to_fit(tmp_path):
+    path = noise_png(tmp_path / "chart.png")
+    before = os.path.getsize(path)
+    saving = optimize_png(str(path), OutputOptions(png_colours=16, png_max_bytes=before // 10))
+    assert saving.after == os.path.getsize(path) <= before // 10
+    with Image.open(path) as image:
+        image.load()
+        assert image.format == "PNG" and image.mode == "P"
+        assert image.width < 300 and image.height < 200
+
+
+def test_png_downscaling_stops_at_the_smallest_scale(tmp_path):
+    path = noise_png(tmp_path / "chart.png")
+    optimize_png(str(path), OutputOptions(png_colours=None, png_max_bytes=1))
+    with Image.open(path) as image:
+        assert image.width >= 300 * 0.25 and image.mode == "RGB"
+
+
+def test_summary():
+    report = OptimizationReport([FileSaving("a.pdf", 2000, 500)])
+    report.extend(OptimizationReport([FileSaving("a.png", 1000, 500)]))
+    assert report.saved == 2000
+    assert report.summary() == "2ファイル 3,000 → 1,000 バイト（2,000 バイト削減、67%）"
+    assert OptimizationReport().summary() == "0ファイル 0 → 0 バイト（0 バイト削減、0%）"
+
+
+def test_create_seat_chart_reports_savings(roster, tmp_path):
+    students = [Student.from_record(r, n) for n, r in enumerate(roster, start=1)]
+    plain, small = tmp_path / "plain.pdf", tmp_path / "small.pdf"
+    assert create_seat_chart(students, seat_rows=ROWS, output_path=str(plain)) is None
+    report = create_seat_chart(
+        students,
+        seat_rows=ROWS,
+        output_path=str(small),
+        image_path=str(tmp_path / "small.png"),
+        optimize=OutputOptions(),
+    )
+    assert [os.path.basename(f.path) for f in report.files] == ["small.pdf", "small.png"]
+    assert report.saved > 0
+    assert os.path.getsize(small) < os.path.getsize(plain)
+    with pymupdf.open(str(small)) as doc:
+        assert "生徒01" in doc[0].get_text()
+    with Image.open(tmp_path / "small.png") as image:
+        image.verify()
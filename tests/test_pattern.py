@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import random
+from collections import Counter
+
+import pytest
+
+from seat_chart_generator.pattern import (
+    ANY,
+    _max_flow,
+    mismatches,
+    pattern_shuffle,
+    seat_labels,
+)
+
+GRID = [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]]
+
+
+def test_named_patterns():
+    assert [seat_labels(GRID, "checkerboard")[s] for s in (1, 2, 5, 6)] == ["M", "F", "F", "M"]
+    assert [seat_labels(GRID, "columns")[s] for s in (1, 2, 5)] == ["M", "F", "M"]
+    assert [seat_labels(GRID, "rows")[s] for s in (1, 2, 5)] == ["M", "M", "F"]
+    assert seat_labels(GRID, "市松", swap=True)[1] == "F"
+    with pytest.raises(ValueError):
+        seat_labels(GRID, "diagonal")
+
+
+def test_custom_pattern_rows():
+    labels = seat_labels([[1, None, 2], [3, 4]], ["男*女", "fx"])
+    assert labels == {1: "M", 2: "F", 3: "F", 4: ANY}
+    # Positions outside the pattern take anyone.
+    assert seat_labels([[1, 2]], ["M"]) == {1: "M", 2: ANY}
+
+
+def best_match(supply, capacity):
+    """Brute force: try every number of boys on ``*`` seats."""
+    boys, girls = supply.get("M", 0), supply.get("F", 0)
+    free = capacity.get(ANY, 0)
+    best = 0
+    for x in range(min(boys, free) + 1):
+        matched = min(boys - x, capacity.get("M", 0)) + x
+        matched += min(girls, capacity.get("F", 0) + free - x)
+        best = max(best, matched)
+    return best
+
+
+def test_max_flow_is_optimal_and_feasible():
+    rng = random.Random(5)
+    for _ in range(300):
+        supply = {"M": rng.randrange(8), "F": rng.randrange(8)}
+        capacity = {label: rng.randrange(8) for label in ("M", "F", ANY)}
+        flow = _max_flow(supply, capacity)
+        assert sum(flow.values()) == best_match(supply, capacity)
+        for gender, count in supply.items():
+            assert sum(v for (g, _), v in flow.items() if g == gender) <= count
+        for label, count in capacity.items():
+            assert sum(v for (_, l), v in flow.items() if l == label) <= count
+        assert all(label in (gender, ANY) for gender, label in flow)
+
+
+def by_seat(students):
+    return {s.seat_number: s for s in students}
+
+
+def test_feasible_checkerboard_is_met(make_roster):
+    roster = make_roster(12)
+    for seed in range(10):
+        students = pattern_shuffle(roster, GRID, "checkerboard", seed=seed)
+        assert mismatches(students, GRID, "checkerboard") == 0
+        assert sorted(by_seat(students)) == list(range(1, 13))
+
+
+def test_orientation_follows_the_majority(make_roster):
+    roster = make_roster(7)  # four boys, three girls
+    grid = [[1, 2, 3, 4], [5, 6, 7, None]]
+    students = pattern_shuffle(roster, grid, "checkerboard", seed=1)
+    assert Counter(seat_labels(grid, "checkerboard").values()) == {"M": 3, "F": 4}
+    # Only the swapped orientation, with four M seats, fits everyone.
+    assert mismatches(students, grid, "checkerboard") == 0
+    assert by_seat(students)[1].gender == "F"
+
+
+def test_infeasible_pattern_gets_closest_result(make_roster):
+    roster = make_roster(6)
+    for record in roster:
+        record["gender"] = "M"
+    students = pattern_shuffle(roster, [[1, 2, 3], [4, 5, 6]], "columns", seed=2)
+    assert mismatches(students, [[1, 2, 3], [4, 5, 6]], "columns") == 2
+
+
+def test_pins_empty_seats_and_leave(make_roster):
+    roster = make_roster(10)
+    roster[9]["status"] = "休学"
+    students = pattern_shuffle(
+        roster, GRID, "rows", fixed={"生徒01": 12}, empty_seats=[5], seed=3
+    )
+    seats = by_seat(students)
+    assert seats[12].name_kanji == "生徒01"
+    assert 5 not in seats
+    assert "生徒10" not in {s.name_kanji for s in students}
+    assert len(students) == 9
+
+
+def test_same_seed_same_result(make_roster):
+    roster = make_roster(12)
+    first = pattern_shuffle(roster, GRID, seed=4)
+    again = pattern_shuffle(roster, GRID, seed=4)
+    assert [(s.seat_number, s.name_kanji) for s in first] == [
+        (s.seat_number, s.name_kanji) for s in again
+    ]
+
+
+def test_balanced_spreads_genders_over_rows(make_roster):
+    roster = make_roster(12)
+    for record in roster[:4]:
+        record["gender"] = "F"
+    for record in roster[4:]:
+        record["gender"] = "M"
+    students = pattern_shuffle(roster, GRID, "balanced", seed=6)
+    per_row = Counter(((s.seat_number - 1) // 4, s.gender) for s in students)
+    # 8 boys and 4 girls over three rows of four.
+    assert sorted(per_row[(r, "F")] for r in range(3)) == [1, 1, 2]
+    assert all(abs(per_row[(r, "M")] - 8 / 3) < 1 for r in range(3))
+    assert mismatches(students, GRID, "balanced") == 0
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import pytest
+
+from seat_chart_generator.picker import StudentSearch, normalize
+
+ROSTER = [
+    {"serial": 1, "student_id": "A1001", "name_kanji": "山田 太郎", "name_kana": "ヤマダ タロウ"},
+    {"serial": 2, "student_id": "A1002", "name_kanji": "山本 花子", "name_kana": "やまもと はなこ"},
+    {"serial": 12, "student_id": "B2012", "name_kanji": "田中 一郎", "name_kana": "タナカ イチロウ"},
+    {"serial": 21, "student_id": "B2021", "name_kanji": "佐藤 次郎", "name_kana": "さとう じろう"},
+]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("ヤマダ タロウ", "やまだたろう"),
+        ("ﾔﾏﾀﾞ", "やまだ"),  # half-width katakana with a voiced mark
+        ("Ａ１００１", "a1001"),  # full-width letters and digits
+        ("　山田　太郎 ", "山田太郎"),
+        ("ヴ", "ゔ"),
+        (12, "12"),
+    ],
+)
+def test_normalize(text, expected):
+    assert normalize(text) == expected
+
+
+@pytest.fixture(scope="module")
+def search():
+    return StudentSearch(ROSTER)
+
+
+def names(search, query):
+    return [search.records[i]["name_kanji"] for i in search.search(query)]
+
+
+def test_empty_query_lists_everyone(search):
+    assert len(search) == 4
+    assert search.search("") == search.search("　") == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("山", ["山田 太郎", "山本 花子"]),
+        ("山田太", ["山田 太郎"]),
+        ("太郎", ["山田 太郎"]),  # given name on its own
+        ("やまだ", ["山田 太郎"]),  # hiragana finds katakana
+        ("ハナ", ["山本 花子"]),  # katakana finds hiragana
+        ("ﾀﾅｶ", ["田中 一郎"]),
+        ("やま", ["山田 太郎", "山本 花子"]),
+        ("1", ["山田 太郎", "田中 一郎"]),  # serial prefix
+        ("２１", ["佐藤 次郎"]),
+        ("b20", ["田中 一郎", "佐藤 次郎"]),  # student ID, any case
+        ("a1002", ["山本 花子"]),
+        ("郎", []),  # prefixes only, not substrings
+        ("鈴木", []),
+    ],
+)
+def test_prefix_search(search, query, expected):
+    assert names(search, query) == expected
+
+
+def test_results_keep_roster_order_without_duplicates():
+    records = [
+        {"serial": 2, "student_id": "X", "name_kanji": "あい", "name_kana": "あい"},
+        {"serial": 1, "student_id": "Y", "name_kanji": "アイコ", "name_kana": "あいこ"},
+    ]
+    search = StudentSearch(records)
+    # The first record matches through both its name and its kana.
+    assert search.search("あい") == [0, 1]
+
+
+def test_missing_fields_are_ignored():
+    search = StudentSearch([{"name_kanji": "鈴木"}])
+    assert search.search("すずき") == []
+    assert search.search("鈴") == [0]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+import pymupdf
+import pytest
+
+from seat_chart_generator import raster
+from seat_chart_generator.errors import RasterError
+from seat_chart_generator.geometry import build_chart_geometry
+from seat_chart_generator.models import Student
+
+DEJAVU = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+@pytest.fixture
+def japanese_font(tmp_path):
+    """The Japanese font bundled with PyMuPDF, written to a file."""
+    path = tmp_path / "japan.otf"
+    path.write_bytes(pymupdf.Font("japan").buffer)
+    return str(path)
+
+
+@pytest.fixture
+def no_fonts(monkeypatch):
+    monkeypatch.delenv("SEAT_CHART_FONT", raising=False)
+    monkeypatch.setattr(raster, "FONT_CANDIDATES", [])
+
+
+def test_font_path_then_environment_then_candidates(no_fonts, monkeypatch, japanese_font):
+    other = str(Path(japanese_font).with_name("other.otf"))
+    shutil.copy(japanese_font, other)
+    assert raster.find_font() is None
+    monkeypatch.setattr(raster, "FONT_CANDIDATES", ["/no/such/font.ttf", other])
+    assert raster.find_font() == other
+    monkeypatch.setenv("SEAT_CHART_FONT", japanese_font)
+    assert raster.find_font() == japanese_font
+    assert raster.find_font(other) == other
+
+
+def test_render_sizes(japanese_font):
+    students = [Student(1, 1, "S0001", "生徒01", "せいと01")]
+    geometry = build_chart_geometry(students, [[1, 2], [3, 4]])
+    image = raster.render_geometry(geometry, dpi=72, font_path=japanese_font)
+    assert image.size == (round(geometry.page_width), round(geometry.page_height))
+    images = raster.render_chart_images(
+        geometry, {"big": 72, "thumb": 36}, mode="P", font_path=japanese_font
+    )
+    assert images["thumb"].size == (round(image.width / 2), round(image.height / 2))
+    assert images["big"].mode == "P"
+    # Something besides the white page was drawn.
+    assert image.convert("L").getextrema()[0] < 128
+
+
+def test_missing_font_is_an_error(no_fonts, tmp_path):
+    missing = str(tmp_path / "missing.ttf")
+    with pytest.raises(RasterError, match="がありません"):
+        raster.require_font(missing)
+    with pytest.raises(RasterError, match="日本語フォントが見つかりません"):
+        raster.require_font()
+
+
+@pytest.mark.skipif(not Path(DEJAVU).is_file(), reason="DejaVu Sans not installed")
+def test_font_without_japanese_glyphs_is_skipped(no_fonts, monkeypatch, japanese_font):
+    assert not raster.has_japanese_glyphs(DEJAVU)
+    with pytest.raises(RasterError, match="日本語の文字がありません"):
+        raster.require_font(DEJAVU)
+    monkeypatch.setattr(raster, "FONT_CANDIDATES", [DEJAVU, japanese_font])
+    assert raster.find_font() == japanese_font
+    monkeypatch.setenv("SEAT_CHART_FONT", DEJAVU)
+    assert raster.find_font() == japanese_font
+
+
+def test_japanese_font_is_used(no_fonts, japanese_font):
+    assert raster.has_japanese_glyphs(japanese_font)
+    assert raster.require_font(japanese_font) == japanese_font
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz
+import pytest
+
+from seat_chart_generator import rasterize
+from seat_chart_generator.rasterize import _output_stems, rasterize_pdfs
+
+
+def make_pdf(path, *sizes):
+    """Write a PDF with one page per ``(width, height)``."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with fitz.open() as doc:
+        for width, height in sizes:
+            doc.new_page(width=width, height=height)
+        doc.save(str(path))
+    return str(path)
+
+
+def image_sizes(images):
+    return {(image.path or image.page): (image.width, image.height) for image in images}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_images_are_named_after_the_pdf(tmp_path, workers):
+    first = make_pdf(tmp_path / "one.pdf", (100, 50))
+    second = make_pdf(tmp_path / "two.pdf", (60, 80), (60, 40))
+    out = tmp_path / "png"
+    images = list(rasterize_pdfs([first, second], out, zoom=1, workers=workers))
+    assert image_sizes(images) == {
+        str(out / "one.png"): (100, 50),
+        str(out / "two_001.png"): (60, 80),
+        str(out / "two_002.png"): (60, 40),
+    }
+    assert len(list(out.iterdir())) == 3
+
+
+def test_output_stems_tell_same_names_apart():
+    stems = _output_stems(["a/chart.pdf", "B/Chart.pdf", "c/other.pdf", "x/a/chart.pdf"])
+    assert stems["c/other.pdf"] == "other"
+    assert stems["B/Chart.pdf"] == "B_Chart"
+    assert {stems["a/chart.pdf"], stems["x/a/chart.pdf"]} == {"a_chart", "a_chart_2"}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_same_file_name_in_two_directories(tmp_path, workers):
+    first = make_pdf(tmp_path / "a" / "chart.pdf", (100, 50))
+    second = make_pdf(tmp_path / "b" / "chart.pdf", (60, 80), (60, 40))
+    out = tmp_path / "png"
+    images = list(rasterize_pdfs([first, second, first], out, zoom=1, workers=workers))
+    assert image_sizes(images) == {
+        str(out / "a_chart.png"): (100, 50),
+        str(out / "b_chart_001.png"): (60, 80),
+        str(out / "b_chart_002.png"): (60, 40),
+    }
+    assert len(list(out.iterdir())) == 3
+
+
+def test_images_in_memory(tmp_path):
+    pdf = make_pdf(tmp_path / "chart.pdf", (30, 20))
+    [image] = rasterize_pdfs([pdf], zoom=2)
+    assert image.path is None and image.data.startswith(b"\x89PNG")
+    assert (image.width, image.height) == (60, 40)
+
+
+class CountingPool(ThreadPoolExecutor):
+    """Thread pool that records how many pages were in flight at once."""
+
+    outstanding = 0
+    most = 0
+    lock = threading.Lock()
+
+    def __init__(self, max_workers=None):
+        super().__init__(max_workers)
+
+    def submit(self, fn, *args):
+        def run():
+            time.sleep(0.02)
+            try:
+                return fn(*args)
+            finally:
+                with self.lock:
+                    type(self).outstanding -= 1
+
+        with self.lock:
+            type(self).outstanding += 1
+            type(self).most = max(type(self).most, type(self).outstanding)
+        return super().submit(run)
+
+
+@pytest.mark.parametrize("memory_mb, most", [(1, 1), (3, 2), (512, 8)])
+def test_memory_budget_limits_pages_in_flight(tmp_path, monkeypatch, memory_mb, most):
+    monkeypatch.setattr(rasterize, "ProcessPoolExecutor", CountingPool)
+    monkeypatch.setattr(CountingPool, "most", 0)
+    # A 500x500 pt page at zoom 1 is estimated at 1.5 million bytes, so a
+    # budget of 3 MB holds two pages; without a tight budget the pool is
+    # kept at twice the number of workers.
+    pdf = make_pdf(tmp_path / "chart.pdf", *[(500, 500)] * 10)
+    images = list(rasterize_pdfs([pdf], tmp_path, zoom=1, workers=4, max_memory_mb=memory_mb))
+    assert len(images) == 10
+    assert CountingPool.most == most
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+from seat_chart_generator.layout import load_layout
+from seat_chart_generator.room import (
+    CACHE_MIN_SEATS,
+    RoomCache,
+    RoomLayout,
+    SeatInfo,
+    cache_path,
+    cached_seat_rows,
+    load_room,
+    save_room,
+)
+
+
+def hall(rows: int = 20, cols: int = 20) -> RoomLayout:
+    """A room with enough seats to be cached, with zones and attributes."""
+    room = RoomLayout.from_rows(
+        [[r * cols + c + 1 for c in range(cols)] for r in range(rows)], name="体育館"
+    )
+    for seat in room.seats.values():
+        if seat.row == 0:
+            seat.zone = "front"
+        if seat.col == 0:
+            seat.attributes = ("accessible",)
+    room.seats[5].attributes = ("broken",)
+    room.seats[6].attributes = ("accessible", "broken")
+    return room
+
+
+def test_version_2_round_trip():
+    room = hall(3, 4)
+    room.seats[2].x = 1.25
+    again = RoomLayout.from_json(json.loads(json.dumps(room.to_json())))
+    # Positions are written to the millimetre.
+    assert again.to_json() == room.to_json()
+    assert again.seats[4].x == 1.8
+    assert again.seats[2].x == 1.25
+    assert again.seats[6].attributes == ("accessible", "broken")
+    assert again.zone("front") == [1, 2, 3, 4]
+    assert sorted(again.with_attribute("broken")) == [5, 6]
+
+
+def test_version_1_grid_keeps_seat_numbers_as_ids():
+    room = RoomLayout.from_json([[3, None, 1], [2]])
+    assert room.seat_rows == [[3, None, 1], [2, None, None]]
+    assert (room.seats[2].row, room.seats[2].col) == (1, 0)
+    assert room.distance(3, 1) == pytest.approx(2 * room.pitch[0])
+    assert room.distance(3, 2) == pytest.approx(room.pitch[1])
+
+
+def test_broken_seats_are_not_usable():
+    room = hall(2, 4)
+    assert room.seat_rows[1][0] == 5
+    assert room.usable_rows()[1][:2] == [None, None]
+    assert room.seats[6].broken and room.seats[6].accessible
+
+
+@pytest.mark.parametrize(
+    "seats",
+    [
+        {1: SeatInfo(1, 0, 0), 2: SeatInfo(2, 0, 0)},  # same position
+        {1: SeatInfo(1, 5, 0)},  # outside
+        {1: SeatInfo(2, 0, 0)},  # key and ID differ
+    ],
+)
+def test_invalid_rooms_are_rejected(seats):
+    with pytest.raises(ValueError):
+        RoomLayout(2, 2, seats)
+
+
+def test_unknown_format_and_duplicate_ids():
+    with pytest.raises(ValueError):
+        RoomLayout.from_json({"version": 3})
+    with pytest.raises(ValueError):
+        RoomLayout.from_rows([[1, 1]])
+
+
+def test_cache_matches_the_json(tmp_path):
+    room = hall()
+    assert len(room.seats) >= CACHE_MIN_SEATS
+    path = tmp_path / "hall.json"
+    save_room(room, path)
+    assert cache_path(path).exists()
+    with RoomCache(cache_path(path)) as cache:
+        assert cache.to_room() == room
+        assert cache.seat(0) == room.seats[1]
+    assert load_room(path) == room
+    assert cached_seat_rows(path) == room.usable_rows()
+    assert cached_seat_rows(path, usable=False) == room.seat_rows
+    assert load_layout(path) == room.usable_rows()
+
+
+def test_stale_or_broken_cache_is_ignored(tmp_path):
+    room = hall()
+    path = tmp_path / "hall.json"
+    save_room(room, path)
+    data = room.to_json()
+    data["name"] = "講堂"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    assert cached_seat_rows(path) is None
+    assert load_room(path).name == "講堂"
+    # Loading the JSON refreshed the cache.
+    assert cached_seat_rows(path) == room.usable_rows()
+
+    cache_path(path).write_bytes(b"SEAT")
+    assert cached_seat_rows(path) is None
+    assert load_room(path, cache=False).name == "講堂"
+
+
+def test_mtime_change_invalidates_cache(tmp_path):
+    path = tmp_path / "hall.json"
+    save_room(hall(), path)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cached_seat_rows(path) is None
+
+
+def test_small_rooms_drop_their_cache(tmp_path):
+    path = tmp_path / "room.json"
+    save_room(hall(), path)
+    save_room(hall(2, 3), path)
+    assert not cache_path(path).exists()
+    assert load_room(path) == hall(2, 3)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import pytest
+
+from seat_chart_generator.rotation import adjacency, plan_rotation, repeated_pairs
+from seat_chart_generator.validate import WARNING
+
+
+def square(size: int):
+    return [[r * size + c + 1 for c in range(size)] for r in range(size)]
+
+
+def names(session):
+    return sorted(s.name_kanji for s in session)
+
+
+def seatings(plan):
+    return [sorted((s.seat_number, s.name_kanji) for s in session) for session in plan.sessions]
+
+
+def test_adjacency_respects_aisles_and_diagonals():
+    rows = [[1, None, 2], [3, 4, 5]]
+    neighbours = adjacency(rows)
+    assert sorted(neighbours[1]) == [3]
+    assert sorted(neighbours[4]) == [3, 5]
+    assert sorted(neighbours[2]) == [5]
+    assert sorted(adjacency(rows, diagonal=True)[1]) == [3, 4]
+
+
+def test_no_repeats_when_the_room_allows(make_roster):
+    roster = make_roster(36)
+    rows = square(6)
+    plan = plan_rotation(roster, rows, sessions=3, seed=1)
+    assert len(plan.sessions) == 3
+    for session in plan.sessions:
+        assert names(session) == names(plan.sessions[0])
+        assert len({s.seat_number for s in session}) == len(session)
+    assert plan.repeats == 0
+    assert repeated_pairs(plan.sessions, rows) == []
+
+
+def test_repeats_are_reported_as_warnings(make_roster):
+    plan = plan_rotation(make_roster(2), [[1, 2]], sessions=3, seed=0)
+    assert plan.conflicts[0] == []
+    assert plan.repeats == 2
+    conflict = plan.conflicts[2][0]
+    assert conflict.code == "repeat_neighbour" and conflict.severity == WARNING
+    assert "第1回" in conflict.message
+    assert repeated_pairs(plan.sessions, [[1, 2]]) == [("生徒01", "生徒02")]
+
+
+def test_reported_repeats_match_an_independent_count(make_roster):
+    rows = square(3)
+    plan = plan_rotation(make_roster(9), rows, sessions=5, seed=2, diagonal=True)
+    pairs = repeated_pairs(plan.sessions, rows, diagonal=True)
+    assert pairs
+    assert plan.repeats >= len(pairs)
+    reported = {c.student for conflicts in plan.conflicts for c in conflicts}
+    assert reported <= {name for pair in pairs for name in pair}
+
+
+def test_pins_and_empty_seats_hold_in_every_session(make_roster):
+    roster = make_roster(14)
+    roster[13]["status"] = "休学"
+    plan = plan_rotation(
+        roster, square(4), sessions=3, fixed={"生徒01": 16}, empty_seats=[6, 7], seed=3
+    )
+    for session in plan.sessions:
+        seats = {s.seat_number: s.name_kanji for s in session}
+        assert seats[16] == "生徒01"
+        assert 6 not in seats and 7 not in seats
+        assert "生徒14" not in seats.values()
+        assert len(seats) == 13
+
+
+def test_same_seed_same_plan(make_roster):
+    roster = make_roster(16)
+    first = plan_rotation(roster, square(4), sessions=2, seed=9)
+    again = plan_rotation(roster, square(4), sessions=2, seed=9)
+    assert seatings(first) == seatings(again)
+
+
+def test_at_least_one_session(make_roster):
+    with pytest.raises(ValueError):
+        plan_rotation(make_roster(2), [[1, 2]], sessions=0)
+
+
+
+def test_pinned_neighbours_are_not_repeats(make_roster):
+    # 生徒01 and 生徒02 are pinned side by side; 3 and 4 are across the aisle.
+    plan = plan_rotation(
+        make_roster(4), [[1, 2, None, 3, 4]], sessions=3, fixed={"生徒01": 1, "生徒02": 2}
+    )
+    assert plan.repeats == 2
+    for conflicts in plan.conflicts[1:]:
+        assert [c.student for c in conflicts] in (["生徒03"], ["生徒04"])
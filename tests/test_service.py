@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from seat_chart_generator import service
+from seat_chart_generator.service import ChartService, JobError, check_job, make_server
+
+ROSTER = [
+    {
+        "serial": n,
+        "student_id": f"S{n:04d}",
+        "name_kanji": f"生徒{n:02d}",
+        "name_kana": f"せいと{n:02d}",
+    }
+    for n in range(1, 5)
+]
+LAYOUT = [[1, 2], [3, 4]]
+run_job = service.run_job
+
+
+def slow_or_crashing_job(kind, job):
+    """Runs in a worker: ``sleep`` delays the job, ``crash`` kills it."""
+    time.sleep(job.get("sleep", 0))
+    if job.get("crash"):
+        os._exit(1)
+    return run_job(kind, job)
+
+
+@pytest.fixture
+def start(monkeypatch):
+    monkeypatch.setattr(service, "run_job", slow_or_crashing_job)
+    servers = []
+
+    def start(**kwargs):
+        chart_service = ChartService(ROSTER, workers=1, image_dpi=36, **kwargs)
+        server = make_server(chart_service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+
+
+def post(server, path, job):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=30)
+    body = json.dumps(job).encode("utf-8") if not isinstance(job, bytes) else job
+    conn.request("POST", path, body, {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response.status, response, data
+
+
+def test_check_job_rejects_wrong_types():
+    check_job({"layout": LAYOUT, "fixed": {"1": "生徒01"}, "seed": 3, "format": "png"})
+    for job in (
+        {"layout": [[1, "2"]]},
+        {"fixed": {"a": "生徒01"}},
+        {"seed": "3"},
+        {"shuffle": 1},
+        {"empty": {"1": ["教卓"]}},
+    ):
+        with pytest.raises(JobError) as info:
+            check_job(job)
+        assert info.value.status == 400
+
+
+def test_bad_requests(start):
+    server = start()
+    assert post(server, "/render", b"{not json")[0] == 400
+    assert post(server, "/render", [1, 2])[0] == 400
+    assert post(server, "/render", {"seed": "x"})[0] == 400
+    assert post(server, "/render", {"layout": LAYOUT, "fixed": {"9": "生徒01"}})[0] == 400
+    assert post(server, "/render", {"layout": LAYOUT, "fixed": {"1": "転校生"}})[0] == 400
+    assert post(server, "/nothing", {})[0] == 404
+
+
+def test_unsatisfiable_job_is_422(start):
+    server = start()
+    status, _, data = post(server, "/shuffle", {"layout": [[1, 2]], "shuffle": True})
+    assert status == 422
+    assert json.loads(data)["error"]
+
+
+def test_shuffle_and_cached_render(start):
+    server = start()
+    job = {"layout": LAYOUT, "shuffle": True, "seed": 1, "fixed": {"4": "生徒01"}}
+    status, _, data = post(server, "/shuffle", job)
+    assert status == 200
+    seats = json.loads(data)["seats"]
+    assert seats["4"] == "生徒01" and sorted(seats) == ["1", "2", "3", "4"]
+
+    first = post(server, "/render", job)
+    second = post(server, "/render", job)
+    assert first[0] == second[0] == 200
+    assert first[1].getheader("Content-Type") == "application/pdf"
+    assert first[2].startswith(b"%PDF") and first[2] == second[2]
+    metrics = server.service.metrics()
+    assert metrics["cache"]["hits"] == 1
+    # A shuffle without a seed is different every time and never cached.
+    post(server, "/render", {"layout": LAYOUT, "shuffle": True})
+    post(server, "/render", {"layout": LAYOUT, "shuffle": True})
+    assert server.service.metrics()["cache"]["hits"] == 1
+
+
+def test_full_queue_is_503(start):
+    server = start(max_queue=1)
+    slow = threading.Thread(target=post, args=(server, "/shuffle", {"sleep": 1}))
+    slow.start()
+    deadline = time.monotonic() + 5
+    while server.service.in_flight == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    status, response, _ = post(server, "/shuffle", {})
+    assert status == 503
+    assert response.getheader("Retry-After") == "1"
+    slow.join()
+    assert post(server, "/shuffle", {})[0] == 200
+    assert server.service.metrics()["rejected"] == 1
+
+
+def test_timed_out_job_keeps_its_slot_until_it_ends(start):
+    server = start(max_queue=1, job_timeout=0.2)
+    assert post(server, "/shuffle", {"sleep": 1.5})[0] == 504
+    # The job still runs in the worker, so the queue is still full.
+    assert server.service.health()["queue_depth"] == 1
+    assert post(server, "/shuffle", {})[0] == 503
+    deadline = time.monotonic() + 10
+    while server.service.in_flight and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert post(server, "/shuffle", {})[0] == 200
+    assert server.service.health()["queue_depth"] == 0
+
+
+def test_recovers_from_a_crashed_worker(start):
+    server = start()
+    status, _, data = post(server, "/shuffle", {"crash": True})
+    assert status == 500
+    assert post(server, "/shuffle", {"layout": LAYOUT})[0] == 200
+    metrics = server.service.metrics()
+    assert metrics["pool_restarts"] == 1
+    assert metrics["queue_depth"] == 0
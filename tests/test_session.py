@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from seat_chart_generator.session import (
+    SessionJournal,
+    journal_path,
+    layout_fingerprint,
+    load_session,
+)
+from seat_chart_generator.state import ClassroomState
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "session.json"
+
+
+@pytest.fixture
+def state(seat_rows, roster):
+    return ClassroomState(seat_rows, roster)
+
+
+def seating(state):
+    return (
+        {seat: s.name_kanji for seat, s in state.assignments.items()},
+        dict(state.fixed_names),
+        dict(state.empty),
+    )
+
+
+def journal_lines(path):
+    return journal_path(path).read_text(encoding="utf-8").splitlines()
+
+
+def test_journal_is_replayed_after_the_snapshot(path, state, roster):
+    state.place_name(1, "生徒01")
+    journal = SessionJournal(path, fsync=False)
+    journal.attach(state, {"title": "1組"})
+    state.place_name(2, "生徒02")
+    state.set_text(3, "教卓", "blue")
+    state.place_name(4, "生徒01")
+    journal.set_meta(title="2組")
+    # The snapshot only has 生徒01 on seat 1; the rest is in the journal.
+    assert list(json.loads(path.read_text(encoding="utf-8"))["cells"]) == ["1"]
+    assert len(journal_lines(path)) == 4
+
+    loaded, meta = load_session(path, roster)
+    assert seating(loaded) == seating(state)
+    assert loaded.seat_of_name("生徒01") == 4
+    assert meta["title"] == "2組"
+    assert meta["seq"] == journal.seq
+    journal.close()
+
+
+def test_torn_last_line_is_ignored(path, state, roster):
+    journal = SessionJournal(path, fsync=False)
+    journal.attach(state)
+    state.place_name(1, "生徒01")
+    state.place_name(2, "生徒02")
+    journal.close()
+    lines = journal_lines(path)
+    journal_path(path).write_text(lines[0] + "\n" + lines[1][:10], encoding="utf-8")
+
+    loaded, _ = load_session(path, roster)
+    assert seating(loaded)[0] == {1: "生徒01"}
+
+
+def test_compact_skips_records_older_than_the_snapshot(path, state, roster):
+    journal = SessionJournal(path, compact_every=3, fsync=False)
+    journal.attach(state)
+    state.place_name(1, "生徒01")
+    state.vacate(1)
+    old = journal_lines(path)
+    assert json.loads(old[-1])["changes"] == {"1": None}
+    state.place_name(1, "生徒01")  # third record: compacted
+    assert journal_lines(path) == []
+    state.place_name(2, "生徒02")
+    state.place_name(3, "生徒03")
+    journal.close()
+    # A crash between writing the snapshot and truncating the journal
+    # leaves the old records in front of the new ones.
+    journal_path(path).write_text(
+        "\n".join(old + journal_lines(path)) + "\n", encoding="utf-8"
+    )
+    loaded, _ = load_session(path, roster)
+    assert seating(loaded)[0] == {1: "生徒01", 2: "生徒02", 3: "生徒03"}
+
+
+def test_layout_change_compacts(path, state, roster):
+    journal = SessionJournal(path, fsync=False)
+    journal.attach(state)
+    state.reset([[1, 2], [3, 4]])
+    state.place_name(4, "生徒01")
+    loaded, _ = load_session(path, roster)
+    assert loaded.seat_rows == [[1, 2], [3, 4]]
+    assert seating(loaded)[0] == {4: "生徒01"}
+    journal.close()
+
+
+def test_layout_fingerprint(seat_rows):
+    assert layout_fingerprint(seat_rows) == layout_fingerprint([tuple(r) for r in seat_rows])
+    assert layout_fingerprint(seat_rows) != layout_fingerprint([[1, 2, 3], [4, 5, 6]])
+
+
+def test_fingerprint_decides_whether_to_ask(monkeypatch, seat_rows, roster):
+    import seat_chart_app
+
+    asked = []
+    monkeypatch.setattr(
+        seat_chart_app.messagebox, "askyesno", lambda *a: asked.append(a) or False
+    )
+    state = ClassroomState(seat_rows, roster)
+    keep = seat_chart_app.SeatApp._keep_session
+    assert keep((state, {"layout": layout_fingerprint(seat_rows)}), seat_rows)
+    assert not asked
+    edited = [[1, 2, 3], [4, 5, 6]]
+    assert not keep((state, {"layout": layout_fingerprint(seat_rows)}), edited)
+    # Sessions saved before fingerprints compare the layouts themselves.
+    assert keep((state, {}), seat_rows)
+    assert not keep((state, {}), edited)
+    assert len(asked) == 2
+
+
+@pytest.mark.parametrize("content", ["{not json", '{"cells": {}}'])
+def test_unreadable_session_is_set_aside(monkeypatch, path, content):
+    import seat_chart_app
+
+    shown = []
+    monkeypatch.setattr(seat_chart_app.messagebox, "showerror", lambda *a: shown.append(a))
+    path.write_text(content, encoding="utf-8")
+    journal_path(path).write_text('{"seq": 2}\n', encoding="utf-8")
+
+    session, journal_to = seat_chart_app.SeatApp._resume_session(str(path))
+    assert session is None and journal_to == str(path)
+    assert not path.exists() and not journal_path(path).exists()
+    broken = path.with_name("session.json.broken")
+    assert broken.read_text(encoding="utf-8") == content
+    assert journal_path(broken).read_text(encoding="utf-8") == '{"seq": 2}\n'
+    assert len(shown) == 1 and "読み込めません" in shown[0][1]
+
+
+def test_session_is_not_journaled_when_it_cannot_be_set_aside(monkeypatch, path):
+    import seat_chart_app
+
+    def fail(path):
+        raise PermissionError(path)
+
+    shown = []
+    monkeypatch.setattr(seat_chart_app.messagebox, "showerror", lambda *a: shown.append(a))
+    monkeypatch.setattr(seat_chart_app, "set_aside", fail)
+    path.write_text("{not json", encoding="utf-8")
+    assert seat_chart_app.SeatApp._resume_session(str(path)) == (None, None)
+    assert path.read_text(encoding="utf-8") == "{not json"
+    assert "保存されません" in shown[0][1]
+
+
+def test_missing_session_starts_fresh(path):
+    import seat_chart_app
+
+    assert seat_chart_app.SeatApp._resume_session(str(path)) == (None, str(path))
+    assert seat_chart_app.SeatApp._resume_session(None) == (None, None)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import pytest
+
+from seat_chart_generator.shuffle import simple_shuffle
+from seat_chart_generator.state import ClassroomState
+
+
+@pytest.fixture
+def state(seat_rows, roster):
+    return ClassroomState(seat_rows, roster)
+
+
+@pytest.fixture
+def changes(state):
+    seen = []
+    state.subscribe(seen.append)
+    return seen
+
+
+def test_place_indexes_both_directions(state, changes):
+    student = state.place_name(3, "生徒01")
+    assert state.student_at(3) is student
+    assert state.seat_of_name("生徒01") == 3
+    assert state.fixed_names == {"生徒01": 3}
+    assert 3 in state.fixed
+    assert changes == [{3}]
+
+
+def test_moving_a_student_frees_the_old_seat(state, changes):
+    state.place_name(1, "生徒01")
+    state.place_name(7, "生徒01")
+    assert state.student_at(1) is None
+    assert 1 not in state.fixed
+    assert state.seat_of == {"生徒01": 7}
+    assert state.fixed_names == {"生徒01": 7}
+    assert changes[-1] == {1, 7}
+
+
+def test_unpinned_placement_is_not_fixed(state):
+    state.place_name(2, "生徒02", fixed=False)
+    assert state.seat_of_name("生徒02") == 2
+    assert 2 not in state.fixed
+    assert state.fixed_names == {}
+
+
+def test_text_seat_replaces_student(state):
+    state.place_name(4, "生徒01")
+    state.set_text(4, "教卓", "red")
+    assert state.student_at(4) is None
+    assert state.seat_of_name("生徒01") is None
+    assert state.fixed_names == {}
+    assert state.empty == {4: ("教卓", "red")}
+    assert 4 in state.fixed
+
+
+def test_vacate_and_release(state, changes):
+    state.vacate(5)
+    assert changes == []  # nothing on the seat, nothing to report
+    state.place_name(5, "生徒03")
+    state.vacate(5)
+    assert state.student_at(5) is None and state.seat_of_name("生徒03") is None
+    assert 5 not in state.fixed
+    state.set_text(5)
+    state.release(5)
+    assert 5 not in state.empty and 5 not in state.fixed
+
+
+def test_clear_all_reports_every_touched_seat(state, changes):
+    state.place_name(1, "生徒01")
+    state.set_text(2, "補助机")
+    state.clear_all()
+    assert changes[-1] == {1, 2}
+    assert not (state.assignments or state.seat_of or state.fixed or state.empty)
+
+
+def test_shuffle_keeps_pins_and_empty_seats(state, roster):
+    state.place_name(8, "生徒06")
+    state.set_text(1, "教卓")
+    state.apply_shuffle(simple_shuffle(roster, state=state, seed=3))
+    assert state.seat_of_name("生徒06") == 8
+    assert state.student_at(1) is None
+    assert state.fixed == {1, 8}
+    assert sorted(state.seat_of) == sorted(r["name_kanji"] for r in roster)
+    assert all(state.student_at(seat).name_kanji == name for name, seat in state.seat_of.items())
+
+
+def test_reset_drops_everything_for_a_new_layout(state, changes):
+    state.place_name(1, "生徒01")
+    state.set_text(2)
+    state.reset([[10, 11]])
+    assert state.total_seats == 2
+    assert not state.has_seat(1)
+    assert not (state.assignments or state.fixed or state.empty or state.fixed_names)
+    assert len(state.cells) == 0
+    assert changes[-1] == {1, 2, 3, 4, 5, 6, 7, 8}
+
+
+def test_snapshot_mirror_follows_edits(state):
+    state.place_name(1, "生徒01")
+    state.set_text(2, "教卓", "blue")
+    cells = state.cells
+    assert cells.get(1)[0] == "student" and cells.get(1)[2] is True
+    assert cells.get(2) == ("empty", "教卓", "blue")
+    assert 3 not in cells
+    state.release(2)
+    assert 2 not in state.cells
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import pytest
+
+from seat_chart_generator.stream import (
+    iter_room_charts,
+    iter_room_records,
+    stream_seat_charts,
+)
+
+ROWS = [[1, 2], [3, 4]]
+
+
+@pytest.fixture
+def records(make_roster):
+    return make_roster(10)
+
+
+def test_rooms_are_filled_in_roster_order(records):
+    records[1]["status"] = "休学"
+    rooms = list(iter_room_records(records, 4))
+    assert [[r["serial"] for r in room] for room in rooms] == [[1, 3, 4, 5], [6, 7, 8, 9], [10]]
+    with pytest.raises(ValueError):
+        list(iter_room_records(records, 0))
+
+
+def test_one_chart_per_room(records, tmp_path):
+    report = stream_seat_charts(records, ROWS, tmp_path, seed=1, measure_memory=True)
+    assert [room.students for room in report.rooms] == [4, 4, 2]
+    assert report.students == 10
+    assert [room.path for room in report.rooms] == [
+        str(tmp_path / f"seat_chart_{n:03}.pdf") for n in (1, 2, 3)
+    ]
+    for room in report.rooms:
+        with open(room.path, "rb") as fh:
+            assert fh.read(4) == b"%PDF"
+    assert report.peak_bytes > 0
+
+
+def rendered(report):
+    return [room.room for room in report.rendered]
+
+
+def moves(report):
+    """``(moved, unchanged)`` against the previous run, ``None`` without one."""
+    if report.moves is None:
+        return None
+    return report.moves.moved, report.moves.unchanged
+
+
+def test_unchanged_run_reuses_every_room(records, tmp_path):
+    first = stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    assert rendered(first) == [1, 2, 3] and moves(first) is None
+    stamps = [(tmp_path / f"seat_chart_{n:03}.pdf").stat().st_mtime_ns for n in (1, 2, 3)]
+    second = stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    assert rendered(second) == []
+    assert all(room.reused for room in second.rooms)
+    assert [(tmp_path / f"seat_chart_{n:03}.pdf").stat().st_mtime_ns for n in (1, 2, 3)] == stamps
+    assert moves(second) == (0, 10)
+
+
+def test_roster_change_renders_only_the_affected_room(records, tmp_path):
+    stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    records[5]["name_kana"] = "かいめい"  # 生徒06 sits in room 2
+    report = stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    assert rendered(report) == [2]
+    # A different seed reseats every room and moves students.
+    report = stream_seat_charts(records, ROWS, tmp_path, seed=2)
+    assert rendered(report) == [1, 2, 3]
+    assert moves(report)[0] > 0
+
+
+def test_without_reuse_every_room_is_rendered(records, tmp_path):
+    stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    assert rendered(stream_seat_charts(records, ROWS, tmp_path, seed=1, reuse=False)) == [1, 2, 3]
+
+
+def manifest_files(tmp_path):
+    return sorted(p.name for p in tmp_path.glob("seat_chart.manifest*"))
+
+
+def failing_after(records, count):
+    for index, record in enumerate(records):
+        if index == count:
+            raise RuntimeError("roster read failed")
+        yield record
+
+
+def test_interrupted_run_leaves_a_readable_manifest(records, tmp_path):
+    stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    with pytest.raises(RuntimeError):
+        # Room 1 is reseated and rendered, then reading the roster fails.
+        stream_seat_charts(failing_after(records, 6), ROWS, tmp_path, seed=2)
+    assert manifest_files(tmp_path) == ["seat_chart.manifest.jsonl"]
+    # Room 1's PDF no longer matches the manifest, so only it is redone.
+    report = stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    assert rendered(report) == [1]
+    assert moves(report) is not None
+
+
+def test_stopping_early_keeps_the_previous_manifest(records, tmp_path):
+    stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    charts = iter_room_charts(records, ROWS, tmp_path, seed=1)
+    assert next(charts).reused
+    charts.close()
+    assert manifest_files(tmp_path) == ["seat_chart.manifest.jsonl"]
+    assert rendered(stream_seat_charts(records, ROWS, tmp_path, seed=1)) == []
+
+
+def test_leftover_prev_manifest_forces_a_full_render(records, tmp_path):
+    stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    manifest = tmp_path / "seat_chart.manifest.jsonl"
+    # A crash mid-run leaves the previous manifest set aside as .prev.
+    manifest.rename(tmp_path / "seat_chart.manifest.jsonl.prev")
+    (tmp_path / "seat_chart.manifest.jsonl.tmp").write_text('{"room": 1', encoding="utf-8")
+    report = stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    assert rendered(report) == [1, 2, 3]
+    # The seating is still compared with the previous run.
+    assert moves(report) == (0, 10)
+    assert manifest_files(tmp_path) == ["seat_chart.manifest.jsonl"]
+    assert rendered(stream_seat_charts(records, ROWS, tmp_path, seed=1)) == []
+
+
+def test_prev_next_to_a_new_manifest_is_dropped(records, tmp_path):
+    stream_seat_charts(records, ROWS, tmp_path, seed=1)
+    manifest = tmp_path / "seat_chart.manifest.jsonl"
+    # The crash came after the new manifest was in place.
+    (tmp_path / "seat_chart.manifest.jsonl.prev").write_bytes(manifest.read_bytes())
+    assert rendered(stream_seat_charts(records, ROWS, tmp_path, seed=1)) == []
+    assert manifest_files(tmp_path) == ["seat_chart.manifest.jsonl"]
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import pytest
+
+from seat_chart_generator import transform
+
+GRID = [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+
+
+def assert_permutation(moves):
+    assert sorted(moves) == sorted(moves.values())
+
+
+def test_rotate_rows_wraps_per_column():
+    moves = transform.rotate_rows(GRID)
+    assert moves == {1: 4, 4: 7, 7: 1, 2: 5, 5: 8, 8: 2, 3: 6, 6: 9, 9: 3}
+    assert transform.rotate_rows(GRID, steps=3) == {}
+
+
+def test_shift_columns_wraps_per_row():
+    assert transform.shift_columns(GRID, steps=-1)[1] == 3
+    assert transform.shift_columns(GRID)[3] == 1
+
+
+def test_mirror_and_rotate_180():
+    assert transform.mirror(GRID) == {1: 3, 3: 1, 4: 6, 6: 4, 7: 9, 9: 7}
+    assert transform.mirror(GRID, horizontal=False) == {1: 7, 7: 1, 2: 8, 8: 2, 3: 9, 9: 3}
+    assert transform.rotate_180(GRID) == {1: 9, 9: 1, 2: 8, 8: 2, 3: 7, 7: 3, 4: 6, 6: 4}
+
+
+def test_rotation_steps_over_pinned_seats():
+    moves = transform.rotate_rows(GRID, fixed={4})
+    # Column 1 is the cycle 1 -> 4 -> 7 -> 1; with 4 pinned, 1 goes to 7.
+    assert moves[1] == 7 and moves[7] == 1
+    assert 4 not in moves and 4 not in moves.values()
+    assert_permutation(moves)
+
+
+def test_mirror_keeps_students_whose_image_is_pinned():
+    moves = transform.mirror(GRID, fixed={3})
+    assert 1 not in moves and 3 not in moves
+
+
+def test_missing_cells_are_skipped():
+    rows = [[1, None, 2], [3, 4]]
+    moves = transform.shift_columns(rows)
+    assert moves == {1: 2, 2: 1, 3: 4, 4: 3}
+    assert_permutation(transform.rotate_180(rows))
+
+
+def test_swap_blocks():
+    moves = transform.swap_blocks(GRID, (0, 0, 1, 2), (2, 1, 1, 2))
+    assert moves == {1: 8, 8: 1, 2: 9, 9: 2}
+    pinned = transform.swap_blocks(GRID, (0, 0, 1, 2), (2, 1, 1, 2), fixed={9})
+    assert pinned == {1: 8, 8: 1}
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ((0, 0, 1, 2), (0, 0, 2, 1)),  # sizes differ
+        ((0, 0, 2, 2), (2, 2, 2, 2)),  # outside
+        ((0, 0, 2, 2), (1, 1, 2, 2)),  # overlap
+    ],
+)
+def test_swap_blocks_rejects_bad_blocks(first, second):
+    with pytest.raises(ValueError):
+        transform.swap_blocks(GRID, first, second)
+
+
+def test_moves_apply_to_state(seat_rows, roster):
+    from seat_chart_generator.state import ClassroomState
+
+    state = ClassroomState(seat_rows, roster)
+    for seat, record in zip((1, 2, 3), roster):
+        state.place_name(seat, record["name_kanji"], fixed=False)
+    state.place_name(6, roster[3]["name_kanji"])
+    state.move_students(transform.rotate_rows(seat_rows, fixed=state.fixed))
+    # Column 0 holds seats 1, 4, 6; 6 is pinned, so 1 goes to 4.
+    assert state.seat_of_name("生徒01") == 4
+    assert state.seat_of_name("生徒04") == 6
+    assert len(state.assignments) == 4
+
+
+def test_move_students_in_one_step(seat_rows, roster):
+    from seat_chart_generator.state import ClassroomState
+
+    state = ClassroomState(seat_rows, roster)
+    state.place_name(1, "生徒01", fixed=False)
+    state.place_name(2, "生徒02")
+    state.place_name(3, "生徒03", fixed=False)
+    changes = []
+    state.subscribe(changes.append)
+    state.move_students({1: 3, 3: 1, 5: 5})
+    assert state.seat_of_name("生徒01") == 3
+    assert state.seat_of_name("生徒03") == 1
+    assert state.seat_of_name("生徒02") == 2
+    assert state.student_at(3).seat_number == 3
+    assert changes == [{1, 3}]
+
+
+@pytest.mark.parametrize(
+    "moves",
+    [
+        {1: 2, 2: 3, 3: 1},  # a cycle through the pinned seat 2
+        {1: 3},  # not a permutation: seat 3 would hold two students
+    ],
+)
+def test_bad_moves_leave_the_state_unchanged(seat_rows, roster, moves):
+    from seat_chart_generator.state import ClassroomState
+
+    state = ClassroomState(seat_rows, roster)
+    for seat, record in zip((1, 2, 3), roster):
+        state.place_name(seat, record["name_kanji"], fixed=seat == 2)
+    with pytest.raises(ValueError):
+        state.move_students(moves)
+    assert {seat: s.name_kanji for seat, s in state.assignments.items()} == {
+        1: "生徒01",
+        2: "生徒02",
+        3: "生徒03",
+    }
+    assert state.seat_of == {"生徒01": 1, "生徒02": 2, "生徒03": 3}
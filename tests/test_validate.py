@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import pytest
+
+from seat_chart_generator.assignment import assign_students_to_seats
+from seat_chart_generator.errors import ValidationError
+from seat_chart_generator.geometry import build_chart_geometry
+from seat_chart_generator.models import Student
+from seat_chart_generator.shuffle import simple_shuffle
+from seat_chart_generator.state import ClassroomState
+from seat_chart_generator.validate import (
+    ERROR,
+    WARNING,
+    check,
+    errors,
+    validate_request,
+    validate_state,
+    validate_students,
+)
+
+
+def codes(conflicts):
+    return sorted(c.code for c in conflicts)
+
+
+def seated(roster, seats):
+    return [Student.from_record(record, seat) for record, seat in zip(roster, seats)]
+
+
+def test_valid_request_has_no_conflicts(roster, seat_rows):
+    assert validate_request(roster, seat_rows, {"生徒01": 1}, [2]) == []
+
+
+def test_every_conflict_is_reported_at_once(roster, seat_rows):
+    fixed = {"生徒01": 99, "生徒02": 3, "生徒03": 3, "転校生": 1, "生徒04": 2}
+    conflicts = validate_request(roster, seat_rows, fixed, empty=[2, 42])
+    assert codes(conflicts) == [
+        "duplicate_pin",
+        "pinned_empty",
+        "unknown_empty_seat",
+        "unknown_seat",
+        "unknown_student",
+    ]
+    by_code = {c.code: c for c in conflicts}
+    assert by_code["duplicate_pin"].seat == 3 and by_code["duplicate_pin"].student == "生徒03"
+    assert by_code["duplicate_pin"].position == (0, 2)
+    assert by_code["unknown_empty_seat"].severity == WARNING
+
+
+def test_capacity_counts_free_seats_only(make_roster, seat_rows):
+    roster = make_roster(8)
+    assert validate_request(roster, seat_rows) == []
+    conflicts = validate_request(roster, seat_rows, empty=[1])
+    assert codes(conflicts) == ["capacity"]
+    # Students on leave need no seat unless pinned.
+    roster[0]["status"] = "休学"
+    assert validate_request(roster, seat_rows, empty=[1]) == []
+    warnings = validate_request(roster, seat_rows, {"生徒01": 2})
+    assert [(c.code, c.severity) for c in warnings] == [("on_leave_pinned", WARNING)]
+
+
+def test_duplicate_seat_numbers_and_names(roster):
+    dup = roster + [dict(roster[0], student_id="S9999")]
+    conflicts = validate_request(dup, [[1, 2, 1], [3, 4, 5, 6, 7, 8]])
+    assert codes(conflicts) == ["duplicate_name", "duplicate_seat"]
+    assert {c.code: c.severity for c in conflicts}["duplicate_name"] == WARNING
+    pinned = validate_request(dup, [[1, 2, 3, 4, 5, 6, 7, 8]], {"生徒01": 1})
+    assert [c.severity for c in pinned if c.code == "duplicate_name"] == [ERROR]
+
+
+def test_reserved_seats(roster, seat_rows):
+    conflicts = validate_request(
+        roster,
+        seat_rows,
+        {"生徒02": 1, "生徒03": 6},
+        empty=[2],
+        reserved_students=["生徒01", "生徒03", "誰か"],
+        reserved_seat_numbers=[1, 2, 77],
+    )
+    assert codes(conflicts) == [
+        "reserved_capacity",
+        "reserved_pinned",
+        "reserved_seat_empty",
+        "reserved_seat_taken",
+        "unknown_reserved_seat",
+        "unknown_student",
+    ]
+
+
+def test_check_raises_for_errors_only(roster, seat_rows):
+    warnings = validate_request(roster, seat_rows, empty=[42])
+    assert check(warnings) == warnings
+    conflicts = validate_request(roster, seat_rows, {"生徒01": 99}, empty=[42])
+    with pytest.raises(ValidationError) as info:
+        check(conflicts)
+    assert info.value.conflicts == errors(conflicts)
+    assert isinstance(info.value, ValueError)
+
+
+def test_validate_state_uses_the_state_indexes(roster, seat_rows):
+    state = ClassroomState(seat_rows, roster)
+    state.place_name(1, "生徒01")
+    state.set_text(1, "教卓")
+    state.place_name(2, "生徒02")
+    assert validate_state(state) == []
+    for seat in range(3, 9):
+        state.set_text(seat)
+    assert codes(validate_state(state)) == ["capacity"]
+
+
+def test_shuffle_validates_only_when_asked(roster, seat_rows):
+    fixed = {"生徒01": 99}
+    assert len(simple_shuffle(roster, seat_rows, fixed, seed=1)) == len(roster)
+    with pytest.raises(ValidationError):
+        simple_shuffle(roster, seat_rows, fixed, seed=1, validate=True)
+
+
+def test_students_on_one_seat(roster, seat_rows):
+    students = seated(roster, [1, 1, 99])
+    assert codes(validate_students(students, seat_rows)) == ["duplicate_pin", "unknown_seat"]
+    # Charts are drawn as before unless validation is asked for.
+    build_chart_geometry(students, seat_rows)
+    with pytest.raises(ValidationError):
+        build_chart_geometry(seated(roster, [1, 1, 99]), seat_rows, validate=True)
+
+
+@pytest.mark.parametrize(
+    "seats, special, reserved, reserved_seats, blocked",
+    [
+        # Seat 1 (the first seat of the layout) is held by 生徒01.
+        ([1, 2, 3], [], ["生徒03"], None, {"生徒03"}),
+        ([2, 3, 4], [], ["生徒03"], None, set()),
+        # Students already marked special_needs are moved as well.
+        ([1, 5, 6], ["生徒02"], [], None, {"生徒02"}),
+        ([1, 5, 6], ["生徒02"], ["生徒03"], [5, 1], {"生徒03"}),
+        # 生徒02 leaves seat 1 for seat 4 first, so 生徒01 can take it.
+        ([5, 1, 2], ["生徒02"], ["生徒01"], [4, 1], set()),
+    ],
+)
+def test_validator_agrees_with_assignment(
+    roster, seat_rows, seats, special, reserved, reserved_seats, blocked
+):
+    students = seated(roster, seats)
+    for s in students:
+        s.special_needs = s.name_kanji in special
+    conflicts = validate_students(students, seat_rows, reserved, reserved_seats)
+    assert {c.student for c in conflicts} == blocked
+    assert {c.code for c in conflicts} <= {"reserved_seat_taken"}
+    before = {s.name_kanji: s.seat_number for s in students}
+    assignments = assign_students_to_seats(students, seat_rows, reserved, reserved_seats)
+    queue = reserved_seats or [n for row in seat_rows for n in row if n is not None]
+    for s in students:
+        if s.special_needs and s.name_kanji not in blocked:
+            assert s.seat_number in queue
+        elif s.name_kanji in blocked:
+            assert s.seat_number == before[s.name_kanji]
+    assert all(assignments[s.seat_number] is s for s in students)
+    # A clean request draws with validation switched on.
+    if not blocked:
+        again = seated(roster, seats)
+        for s in again:
+            s.special_needs = s.name_kanji in special
+        build_chart_geometry(again, seat_rows, reserved, reserved_seats, validate=True)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from reportlab.lib import colors
+
+from seat_chart_generator.models import Student
+from seat_chart_generator.view import SeatView, build_views, diff_views, seat_view
+
+BG = "SystemButtonFace"
+
+
+def student(serial: int, seat: int) -> Student:
+    return Student(seat, serial, f"S{serial:04d}", f"生徒{serial:02d}", f"せいと{serial:02d}")
+
+
+def test_seat_views():
+    s = student(1, 1)
+    assert seat_view(s, False, None, BG) == SeatView(
+        "1\nS0001\n生徒01\nせいと01", "black", "white", "solid", 2, "center", "center"
+    )
+    assert seat_view(s, True, None, BG).borderwidth == 4
+    assert seat_view(None, False, None, BG).text == ""
+    s.color = colors.red
+    on_leave = seat_view(s, False, None, BG)
+    assert (on_leave.fg, on_leave.bg, on_leave.relief) == ("red", BG, "flat")
+
+
+def test_empty_seat_views():
+    desk = seat_view(None, False, ("教卓", "blue"), BG)
+    assert (desk.fg, desk.bg, desk.relief, desk.borderwidth) == ("blue", "white", "solid", 2)
+    note = seat_view(student(1, 1), False, ("欠席", "green"), BG)
+    assert (note.text, note.fg, note.anchor, note.justify) == ("欠席", "green", "w", "left")
+    blank = seat_view(None, True, ("", "green"), BG)
+    assert blank == SeatView("", "black", BG, "flat", 0, "center", "center")
+
+
+def test_build_views_uses_fixed_and_empty_seats():
+    views = build_views([1, 2, 3], {1: student(1, 1), 2: student(2, 2)}, [2], {3: ("", "")}, BG)
+    assert sorted(views) == [1, 2, 3]
+    assert (views[1].borderwidth, views[2].borderwidth) == (2, 4)
+    assert views[3].relief == "flat"
+
+
+def test_diff_views_reports_only_changed_options():
+    old = build_views([1, 2, 3], {1: student(1, 1), 2: student(2, 2)}, [], {}, BG)
+    assert diff_views(old, old) == {}
+    # Swap two students and pin seat 3.
+    new = build_views([1, 2, 3, 4], {1: student(2, 1), 2: student(1, 2)}, [3], {}, BG)
+    changes = diff_views(old, new)
+    assert sorted(changes) == [1, 2, 3, 4]
+    assert changes[1] == {"text": new[1].text}
+    assert changes[2] == {"text": new[2].text}
+    assert changes[3] == {"borderwidth": 4}
+    # A seat new to the GUI gets every option.
+    assert changes[4] == new[4]._asdict()